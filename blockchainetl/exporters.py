@@ -38,6 +38,8 @@ from json import JSONEncoder
 import decimal
 import six
 
+from blockchainetl.json_codec import json_dumps_bytes
+
 
 class BaseItemExporter(object):
 
@@ -171,11 +173,16 @@ class JsonLinesItemExporter(BaseItemExporter):
         kwargs.setdefault('ensure_ascii', not self.encoding)
         # kwargs.setdefault('default', EncodeDecimal)
         self.encoder = JSONEncoder(default=EncodeDecimal, **kwargs)
+        # json_dumps_bytes produces the same output as an encoder with the default formatting options
+        self._use_json_codec = kwargs == {'ensure_ascii': True}
 
     def export_item(self, item):
         itemdict = dict(self._get_serialized_fields(item))
-        data = self.encoder.encode(itemdict) + '\n'
-        self.file.write(to_bytes(data, self.encoding))
+        if self._use_json_codec:
+            self.file.write(json_dumps_bytes(itemdict, self.encoder) + b'\n')
+        else:
+            data = self.encoder.encode(itemdict) + '\n'
+            self.file.write(to_bytes(data, self.encoding))
 
 
 def to_native_str(text, encoding=None, errors='strict'):
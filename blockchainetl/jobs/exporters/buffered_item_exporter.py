@@ -0,0 +1,61 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import threading
+
+DEFAULT_BUFFER_SIZE = 1000
+
+
+# Passes items to the item exporter in chunks of up to buffer_size items as they are exported, so that only
+# buffer_size items are held in memory and sinks that write in bulk, e.g. Postgres, are not called for every item.
+# Items are passed to the item exporter by one thread at a time.
+class BufferedItemExporter:
+    def __init__(self, item_exporter, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.item_exporter = item_exporter
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def open(self):
+        self.item_exporter.open()
+
+    def export_items(self, items):
+        for item in items:
+            self.export_item(item)
+
+    def export_item(self, item):
+        with self._lock:
+            self._buffer.append(item)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            items = self._buffer
+            self._buffer = []
+            self.item_exporter.export_items(items)
+
+    def close(self):
+        with self._lock:
+            self._flush()
+        self.item_exporter.close()
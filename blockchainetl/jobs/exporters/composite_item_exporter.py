@@ -35,6 +35,8 @@ class CompositeItemExporter:
         self.file_mapping = {}
         self.exporter_mapping = {}
         self.counter_mapping = {}
+        # The number of exported items of each type, set on close
+        self.item_counts = {}
 
         self.converter = CompositeItemConverter(converters)
 
@@ -76,4 +78,5 @@ class CompositeItemExporter:
             close_silently(file)
             counter = self.counter_mapping[item_type]
             if counter is not None:
-                self.logger.info('{} items exported: {}'.format(item_type, counter.increment() - 1))
+                self.item_counts[item_type] = counter.increment() - 1
+                self.logger.info('{} items exported: {}'.format(item_type, self.item_counts[item_type]))
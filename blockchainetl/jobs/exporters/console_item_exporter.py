@@ -20,7 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import json
+from blockchainetl.json_codec import json_dumps
 
 
 class ConsoleItemExporter:
@@ -32,7 +32,7 @@ class ConsoleItemExporter:
             self.export_item(item)
 
     def export_item(self, item):
-        print(json.dumps(item))
+        print(json_dumps(item))
 
     def close(self):
         pass
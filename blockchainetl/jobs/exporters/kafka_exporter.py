@@ -1,10 +1,10 @@
 import collections
-import json
 import logging
 
 from kafka import KafkaProducer
 
 from blockchainetl.jobs.exporters.converters.composite_item_converter import CompositeItemConverter
+from blockchainetl.json_codec import json_dumps_bytes
 
 
 class KafkaItemExporter:
@@ -26,13 +26,17 @@ class KafkaItemExporter:
         pass
 
     def export_items(self, items):
-        for item in items:
-            self.export_item(item)
+        futures = [self.export_item(item) for item in items]
+        # The items are delivered when export_items returns, so the streamer can save the last synced block
+        self.producer.flush()
+        for future in futures:
+            if future is not None:
+                future.get()
 
     def export_item(self, item):
         item_type = item.get('type')
         if item_type is not None and item_type in self.item_type_to_topic_mapping:
-            data = json.dumps(item).encode('utf-8')
+            data = json_dumps_bytes(item)
             print(data)
             return self.producer.send(self.item_type_to_topic_mapping[item_type], value=data)
         else:
@@ -0,0 +1,258 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import re
+from json import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_DEFAULT_ENCODER = JSONEncoder()
+_SIMPLE_TYPES = frozenset([str, int, bool, type(None)])
+_SIMPLE_TYPES_AND_LIST = _SIMPLE_TYPES | {list}
+
+
+# JSON encoding and decoding that uses orjson when it is installed and the stdlib json module otherwise.
+# json_dumps output is identical to json.dumps, orjson is used only for the values where it produces the same bytes.
+
+
+def json_loads(data):
+    """Accepts str, bytes or bytearray"""
+    if orjson is not None and not _may_contain_large_integer(data):
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_loads_rpc_response(data):
+    """JSON RPC quantities are hex encoded strings so integer literals in responses fit in 64 bits,
+    which is what orjson supports, and the check for large integers done by json_loads can be skipped"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj, encoder=_DEFAULT_ENCODER):
+    """Same output as encoder.encode(obj). The encoder must have the default separators and ensure_ascii"""
+    data = _orjson_dumps_flat_dict(obj)
+    if data is not None:
+        return data.decode('ascii')
+    return encoder.encode(obj)
+
+
+def json_dumps_bytes(obj, encoder=_DEFAULT_ENCODER):
+    """Same output as encoder.encode(obj).encode('utf-8'). The encoder must have the default separators and ensure_ascii"""
+    data = _orjson_dumps_flat_dict(obj)
+    if data is not None:
+        return data
+    return encoder.encode(obj).encode('utf-8')
+
+
+def json_dumps_compact(obj):
+    """For JSON consumed by machines only, e.g. JSON RPC requests. Output has no whitespace when orjson is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except orjson.JSONEncodeError:
+            # e.g. integers larger than 64 bits
+            pass
+    return json.dumps(obj)
+
+
+# orjson decodes integers that don't fit in 64 bits to floats. Integer literals with 19 digits or more fall back to json
+_LARGE_INTEGER = re.compile(r'[:\[,]\s*-?\d{19}')
+_LARGE_INTEGER_BYTES = re.compile(rb'[:\[,]\s*-?\d{19}')
+
+
+def _may_contain_large_integer(data):
+    if isinstance(data, str):
+        return _LARGE_INTEGER.search(data) is not None
+    return _LARGE_INTEGER_BYTES.search(data) is not None
+
+
+# Exported items are flat dicts. For them json.dumps output only differs from orjson output by the spaces
+# after the separators, which can be added back when no key or string value contains a separator.
+def _orjson_dumps_flat_dict(item):
+    if orjson is None or type(item) is not dict:
+        return None
+
+    commas = len(item) - 1 if item else 0
+    value_types = set(map(type, item.values()))
+    if not value_types <= _SIMPLE_TYPES:
+        if not value_types <= _SIMPLE_TYPES_AND_LIST:
+            return None
+        for value in item.values():
+            if type(value) is list:
+                if not set(map(type, value)) <= _SIMPLE_TYPES:
+                    return None
+                if len(value) > 1:
+                    commas += len(value) - 1
+
+    try:
+        data = orjson.dumps(item)
+    except orjson.JSONEncodeError:
+        # e.g. integers larger than 64 bits or non-string keys
+        return None
+
+    if not data.isascii() or b'\x7f' in data:
+        # json.dumps escapes non-ASCII characters and DEL
+        return None
+    result = data.replace(b',', b', ').replace(b':', b': ')
+    # Separators inside keys or strings would get a space too
+    if len(result) - len(data) != len(item) + commas:
+        return None
+    return result
+
+
+# Everything up to the next bracket that is not in a string. It stops at the quote of an incomplete string
+_SKIP_TO_BRACKET = re.compile(rb'(?:[^\[\]{}"]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_STRING_END = re.compile(rb'["\\]')
+_ITEM_START = re.compile(rb'[^\s,]')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_LITERAL = re.compile(rb'[^\s,\]]+')
+_BACKSLASH = ord('\\')
+_QUOTE = ord('"')
+_OPENING_BRACKETS = frozenset(b'[{')
+
+
+# Incremental decoder for documents that are a JSON array, e.g. JSON RPC batch responses. Items are decoded
+# as soon as they are received, so only one item has to be held in memory instead of the whole document.
+# Everything but brackets is skipped with a regex, so bytes are not looked at one by one in Python code.
+# A document that is not an array, e.g. an error response to a batch request, is decoded as a single item.
+class JsonArrayItemDecoder(object):
+    def __init__(self, loads=json_loads_rpc_response):
+        self._loads = loads
+        self._buffer = bytearray()
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._item_start = None
+        self._is_array = None
+        self._is_done = False
+
+    def feed(self, data):
+        """Accepts str or bytes and returns the list of items that were completed by the data"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._buffer.extend(data)
+        if self._is_array is None:
+            match = _ITEM_START.search(self._buffer)
+            if match is None:
+                return []
+            self._is_array = self._buffer[match.start()] == ord('[')
+            if self._is_array:
+                self._depth = 1
+                self._position = match.end()
+        if not self._is_array or self._is_done:
+            return []
+
+        items = []
+        self._scan(items)
+        self._compact()
+        return items
+
+    def close(self):
+        """Returns the item of a document that is not an array"""
+        if self._is_array is None:
+            return []
+        if not self._is_array:
+            return [self._loads(bytes(self._buffer))]
+        if not self._is_done:
+            raise ValueError('The JSON array is truncated')
+        return []
+
+    def _scan(self, items):
+        buffer = self._buffer
+        while True:
+            if self._in_string:
+                match = _STRING_END.search(buffer, self._position)
+                if match is None:
+                    self._position = len(buffer)
+                    return
+                if buffer[match.start()] == _BACKSLASH:
+                    if match.end() >= len(buffer):
+                        # the escaped character hasn't been received yet
+                        self._position = match.start()
+                        return
+                    self._position = match.end() + 1
+                    continue
+                self._position = match.end()
+                self._in_string = False
+                continue
+
+            if self._item_start is None:
+                match = _ITEM_START.search(buffer, self._position)
+                if match is None:
+                    self._position = len(buffer)
+                    return
+                if buffer[match.start()] == ord(']'):
+                    self._is_done = True
+                    return
+                self._item_start = match.start()
+                self._position = match.start()
+                if buffer[match.start()] not in _OPENING_BRACKETS:
+                    scalar = _STRING if buffer[match.start()] == _QUOTE else _LITERAL
+                    match = scalar.match(buffer, self._position)
+                    if match is None or match.end() == len(buffer):
+                        # the end of the item hasn't been received yet
+                        self._item_start = None
+                        return
+                    items.append(self._loads(bytes(buffer[self._item_start:match.end()])))
+                    self._item_start = None
+                    self._position = match.end()
+                    continue
+
+            self._position = _SKIP_TO_BRACKET.match(buffer, self._position).end()
+            if self._position == len(buffer):
+                return
+            character = buffer[self._position]
+            self._position += 1
+            if character == _QUOTE:
+                self._in_string = True
+            elif character in _OPENING_BRACKETS:
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 1:
+                    items.append(self._loads(bytes(buffer[self._item_start:self._position])))
+                    self._item_start = None
+
+    def _compact(self):
+        consumed = self._position if self._item_start is None else self._item_start
+        if consumed > 0:
+            del self._buffer[:consumed]
+            self._position -= consumed
+            if self._item_start is not None:
+                self._item_start = 0
+
+
+def iter_json_array_items(chunks, loads=json_loads_rpc_response):
+    """Yields the items of a JSON array document received in chunks of str or bytes"""
+    decoder = JsonArrayItemDecoder(loads)
+    for chunk in chunks:
+        for item in decoder.feed(chunk):
+            yield item
+    for item in decoder.close():
+        yield item
@@ -0,0 +1,71 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from collections import deque
+
+
+# (number, hash, parent_hash) of the most recently synced blocks, with consecutive numbers.
+# A block whose parent hash is not the hash of the synced block before it means the chain was reorganized.
+class BlockHashRingBuffer:
+    def __init__(self, size):
+        self.size = size
+        self._blocks = deque(maxlen=size)
+
+    def get_hash(self, block_number):
+        """Returns None if the block is not in the buffer"""
+        if not self._blocks:
+            return None
+        index = block_number - self._blocks[0][0]
+        if 0 <= index < len(self._blocks):
+            return self._blocks[index][1]
+        return None
+
+    def get_block_numbers(self):
+        return [block[0] for block in self._blocks]
+
+    def is_continued_by(self, blocks):
+        """Returns False if the first of the blocks is not a child of the buffered block before it"""
+        if not blocks:
+            return True
+        number, _, parent_hash = blocks[0]
+        buffered_parent_hash = self.get_hash(number - 1)
+        return buffered_parent_hash is None or buffered_parent_hash == parent_hash
+
+    def add_blocks(self, blocks):
+        """Blocks that are in the buffer already are replaced"""
+        if not blocks:
+            return
+        self.rewind(blocks[0][0] - 1)
+        if self._blocks and self._blocks[-1][0] != blocks[0][0] - 1:
+            # The hashes of the blocks in between are unknown
+            self._blocks.clear()
+        self._blocks.extend(blocks)
+
+    def rewind(self, block_number):
+        """Removes the blocks after block_number and returns them"""
+        removed_blocks = []
+        while self._blocks and self._blocks[-1][0] > block_number:
+            removed_blocks.append(self._blocks.pop())
+        return list(reversed(removed_blocks))
+
+    def __len__(self):
+        return len(self._blocks)
@@ -1,3 +1,4 @@
+from sqlalchemy import bindparam, delete
 from sqlalchemy.dialects.postgresql import insert
 
 
@@ -15,3 +16,10 @@ def create_insert_statement_for_table(table):
         )
 
     return insert_stmt
+
+
+def create_delete_statements_for_block_hash(blocks_table, tables):
+    """Statements that delete a block and the rows of the tables with its block_hash, executed with block_hash"""
+    delete_stmts = [delete(table).where(table.c.block_hash == bindparam('block_hash')) for table in tables]
+    delete_stmts.append(delete(blocks_table).where(blocks_table.c.hash == bindparam('block_hash')))
+    return delete_stmts
@@ -0,0 +1,4 @@
+# The chain was reorganized deeper than the block hashes kept by the streamer, so the orphaned blocks can't be
+# retracted. Retrying doesn't help, the stream is stopped even if errors are retried
+class ReorgTooDeepError(ValueError):
+    pass
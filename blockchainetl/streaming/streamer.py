@@ -24,7 +24,10 @@
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from blockchainetl.streaming.block_hash_ring_buffer import BlockHashRingBuffer
+from blockchainetl.streaming.reorg_too_deep_error import ReorgTooDeepError
 from blockchainetl.streaming.streamer_adapter_stub import StreamerAdapterStub
 from blockchainetl.file_utils import smart_open
 
@@ -40,7 +43,9 @@ class Streamer:
             period_seconds=10,
             block_batch_size=10,
             retry_errors=True,
-            pid_file=None):
+            pid_file=None,
+            pipeline=False,
+            max_reorg_depth=0):
         self.blockchain_streamer_adapter = blockchain_streamer_adapter
         self.last_synced_block_file = last_synced_block_file
         self.lag = lag
@@ -50,6 +55,10 @@ class Streamer:
         self.block_batch_size = block_batch_size
         self.retry_errors = retry_errors
         self.pid_file = pid_file
+        # Fetch the next block range while the previous one is exported
+        self.pipeline = pipeline
+        # The hashes of the last max_reorg_depth synced blocks are kept to detect chain reorganizations
+        self.block_hashes = BlockHashRingBuffer(max_reorg_depth) if max_reorg_depth > 0 else None
 
         if self.start_block is not None or not os.path.isfile(self.last_synced_block_file):
             init_last_synced_block_file((self.start_block or 0) - 1, self.last_synced_block_file)
@@ -62,7 +71,10 @@ class Streamer:
                 logging.info('Creating pid file {}'.format(self.pid_file))
                 write_to_file(self.pid_file, str(os.getpid()))
             self.blockchain_streamer_adapter.open()
-            self._do_stream()
+            if self.pipeline:
+                self._do_stream_pipelined()
+            else:
+                self._do_stream()
         finally:
             self.blockchain_streamer_adapter.close()
             if self.pid_file is not None:
@@ -75,6 +87,8 @@ class Streamer:
 
             try:
                 synced_blocks = self._sync_cycle()
+            except ReorgTooDeepError:
+                raise
             except Exception as e:
                 # https://stackoverflow.com/a/4992124/1580227
                 logging.exception('An exception occurred while syncing block data.')
@@ -95,13 +109,114 @@ class Streamer:
             current_block, target_block, self.last_synced_block, blocks_to_sync))
 
         if blocks_to_sync != 0:
-            self.blockchain_streamer_adapter.export_all(self.last_synced_block + 1, target_block)
+            if self.block_hashes is None:
+                self.blockchain_streamer_adapter.export_all(self.last_synced_block + 1, target_block)
+            else:
+                items = self._fetch_all(self.last_synced_block + 1, target_block)
+                self.blockchain_streamer_adapter.export_items(items)
             logging.info('Writing last synced block {}'.format(target_block))
             write_last_synced_block(self.last_synced_block_file, target_block)
             self.last_synced_block = target_block
 
         return blocks_to_sync
 
+    def _do_stream_pipelined(self):
+        # The blocks up to last_fetched_block are fetched, the last of them are being exported by export_executor
+        self._last_fetched_block = self.last_synced_block
+        self._export_future = None
+        self._export_target_block = None
+        with ThreadPoolExecutor(max_workers=1) as export_executor:
+            while self.end_block is None or self._last_fetched_block < self.end_block:
+                fetched_blocks = 0
+
+                try:
+                    fetched_blocks = self._pipelined_sync_cycle(export_executor)
+                except ReorgTooDeepError:
+                    raise
+                except Exception as e:
+                    logging.exception('An exception occurred while syncing block data.')
+                    # The blocks that are not being exported are fetched again
+                    self._last_fetched_block = self._export_target_block \
+                        if self._export_future is not None else self.last_synced_block
+                    if not self.retry_errors:
+                        raise e
+
+                if fetched_blocks <= 0:
+                    logging.info('Nothing to sync. Sleeping for {} seconds...'.format(self.period_seconds))
+                    time.sleep(self.period_seconds)
+
+            self._wait_for_export()
+
+    def _pipelined_sync_cycle(self, export_executor):
+        current_block = self.blockchain_streamer_adapter.get_current_block_number()
+
+        target_block = self._calculate_target_block(current_block, self._last_fetched_block)
+        blocks_to_sync = max(target_block - self._last_fetched_block, 0)
+
+        logging.info('Current block {}, target block {}, last fetched block {}, last synced block {}, '
+                     'blocks to sync {}'.format(current_block, target_block, self._last_fetched_block,
+                                                self.last_synced_block, blocks_to_sync))
+
+        items = None
+        if blocks_to_sync != 0:
+            items = self._fetch_all(self._last_fetched_block + 1, target_block)
+
+        # Block ranges are exported one at a time and in order, so the last synced block is written
+        # only when all the blocks before it are exported
+        self._wait_for_export()
+
+        if items is not None:
+            self._export_future = export_executor.submit(self.blockchain_streamer_adapter.export_items, items)
+            self._export_target_block = target_block
+            self._last_fetched_block = target_block
+
+        return blocks_to_sync
+
+    def _wait_for_export(self):
+        if self._export_future is None:
+            return
+        export_future = self._export_future
+        self._export_future = None
+        export_future.result()
+        logging.info('Writing last synced block {}'.format(self._export_target_block))
+        write_last_synced_block(self.last_synced_block_file, self._export_target_block)
+        self.last_synced_block = self._export_target_block
+
+    def _fetch_all(self, start_block, end_block):
+        """If the chain was reorganized after the blocks before start_block were fetched, the items of the blocks
+        from the fork block are returned, preceded by the retraction items for the orphaned blocks"""
+        if self.block_hashes is None:
+            return self.blockchain_streamer_adapter.fetch_all(start_block, end_block)
+
+        retraction_items = []
+        while True:
+            items = self.blockchain_streamer_adapter.fetch_all(start_block, end_block)
+            blocks = get_blocks(items)
+            check_blocks_are_chained(blocks)
+            if self.block_hashes.is_continued_by(blocks):
+                self.block_hashes.add_blocks(blocks)
+                return retraction_items + items
+
+            fork_block = self._find_fork_block()
+            if fork_block == start_block - 1:
+                # The synced blocks are still in the chain, the fetched ones are not
+                raise ValueError('Blocks {}-{} were fetched from an orphaned branch'.format(start_block, end_block))
+            orphaned_blocks = self.block_hashes.rewind(fork_block)
+            logging.warning('Chain reorganization detected at block {}, blocks {}-{} are orphaned'.format(
+                start_block, fork_block + 1, orphaned_blocks[-1][0]))
+            retraction_items.extend(self.blockchain_streamer_adapter.create_block_retraction_items(orphaned_blocks))
+            start_block = fork_block + 1
+
+    def _find_fork_block(self):
+        """Returns the last synced block that is still in the chain"""
+        block_numbers = self.block_hashes.get_block_numbers()
+        current_hashes = self.blockchain_streamer_adapter.get_block_hashes(block_numbers)
+        for block_number in reversed(block_numbers):
+            if current_hashes.get(block_number) == self.block_hashes.get_hash(block_number):
+                return block_number
+        raise ReorgTooDeepError('The chain was reorganized deeper than the last {} synced blocks'.format(
+            self.block_hashes.size))
+
     def _calculate_target_block(self, current_block, last_synced_block):
         target_block = current_block - self.lag
         target_block = min(target_block, last_synced_block + self.block_batch_size)
@@ -109,6 +224,19 @@ class Streamer:
         return target_block
 
 
+def get_blocks(items):
+    """Returns (number, hash, parent_hash) of the block items sorted by number"""
+    blocks = [(item['number'], item['hash'], item['parent_hash']) for item in items if item.get('type') == 'block']
+    return sorted(blocks)
+
+
+def check_blocks_are_chained(blocks):
+    for parent, child in zip(blocks, blocks[1:]):
+        if child[0] != parent[0] + 1 or child[2] != parent[1]:
+            raise ValueError('The chain was reorganized while blocks {}-{} were fetched'.format(
+                blocks[0][0], blocks[-1][0]))
+
+
 def delete_file(file):
     try:
         os.remove(file)
@@ -7,7 +7,20 @@ class StreamerAdapterStub:
         return 0
 
     def export_all(self, start_block, end_block):
+        self.export_items(self.fetch_all(start_block, end_block))
+
+    def fetch_all(self, start_block, end_block):
+        return []
+
+    def export_items(self, items):
         pass
 
+    def get_block_hashes(self, block_numbers):
+        return {}
+
+    def create_block_retraction_items(self, blocks):
+        return [{'type': 'block_retraction', 'block_number': number, 'block_hash': block_hash}
+                for number, block_hash, _ in blocks]
+
     def close(self):
         pass
@@ -31,6 +31,7 @@ from ethereumetl.web3_utils import build_web3
 
 from ethereumetl.jobs.export_all_common import export_all_common
 from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.service.block_timestamp_index import BlockTimestampIndex
 from ethereumetl.service.eth_service import EthService
 from ethereumetl.utils import check_classic_provider_uri
 
@@ -55,7 +56,7 @@ def is_block_range(start, end):
             end.isdigit() and 0 <= int(end) <= 99999999)
 
 
-def get_partitions(start, end, partition_batch_size, provider_uri):
+def get_partitions(start, end, partition_batch_size, provider_uri, rpc_cache_dir=None, block_timestamp_index_file=None):
     """Yield partitions based on input data type."""
     if is_date_range(start, end) or is_unix_time_range(start, end):
         if is_date_range(start, end):
@@ -72,19 +73,29 @@ def get_partitions(start, end, partition_batch_size, provider_uri):
                 end_date = datetime.utcfromtimestamp(int(end) / 1e3).date()
 
         day = timedelta(days=1)
-
-        provider = get_provider_from_uri(provider_uri)
-        web3 = build_web3(provider)
-        eth_service = EthService(web3)
-
+        dates = []
         while start_date <= end_date:
-            batch_start_block, batch_end_block = eth_service.get_block_range_for_date(
-                start_date)
-            partition_dir = '/date={start_date!s}/'.format(
-                start_date=start_date)
-            yield batch_start_block, batch_end_block, partition_dir
+            dates.append(start_date)
             start_date += day
 
+        provider = get_provider_from_uri(provider_uri, rpc_cache_dir=rpc_cache_dir)
+        web3 = build_web3(provider)
+        batch_web3_provider = get_provider_from_uri(provider_uri, batch=True, rpc_cache_dir=rpc_cache_dir)
+        block_timestamp_index = None
+        if block_timestamp_index_file:
+            block_timestamp_index = BlockTimestampIndex(block_timestamp_index_file).open()
+        eth_service = EthService(web3, batch_web3_provider, block_timestamp_index)
+
+        try:
+            block_ranges = eth_service.get_block_ranges_for_dates(dates)
+            for date, (batch_start_block, batch_end_block) in zip(dates, block_ranges):
+                partition_dir = '/date={date!s}/'.format(
+                    date=date)
+                yield batch_start_block, batch_end_block, partition_dir
+        finally:
+            if block_timestamp_index is not None:
+                block_timestamp_index.close()
+
     elif is_block_range(start, end):
         start_block = int(start)
         end_block = int(end)
@@ -121,9 +132,26 @@ def get_partitions(start, end, partition_batch_size, provider_uri):
 @click.option('-B', '--export-batch-size', default=100, show_default=True, type=int, help='The number of requests in JSON RPC batches.')
 @click.option('--skip-geth-traces', default=False, show_default=True, type=bool, help='Whether to skip using geth traces to get contracts')
 @click.option('-c', '--chain', default='ethereum', show_default=True, type=str, help='The chain network to connect to.')
+@click.option('--rpc-cache-dir', default=None, show_default=True, type=str,
+              help='The directory where JSON RPC results for finalized blocks are cached. '
+                   'Repeated requests are served from the cache.')
+@click.option('--max-concurrent-partitions', default=1, show_default=True, type=int,
+              help='The number of partitions to export at the same time.')
+@click.option('--partition-processes', is_flag=True, default=False, show_default=True,
+              help='Export concurrent partitions in separate processes instead of threads.')
+@click.option('--block-timestamp-index-file', default=None, show_default=True, type=str,
+              help='The file where the timestamps of the blocks requested to find the block ranges for dates are saved. '
+                   'The block ranges are found without requests to the node when they are run again.')
+@click.option('--resume/--no-resume', default=True, show_default=True,
+              help='Whether to skip the partitions and stages that were completed by a previous run, '
+                   'as recorded in the _manifests subdirectory of the output directory.')
 def export_all(start, end, partition_batch_size, provider_uri, output_dir, postgres_connection_string, max_workers, export_batch_size,
-               chain='ethereum', skip_geth_traces=False):
+               chain='ethereum', skip_geth_traces=False, rpc_cache_dir=None, max_concurrent_partitions=1,
+               partition_processes=False, block_timestamp_index_file=None, resume=True):
     """Exports all data for a range of blocks."""
     provider_uri = check_classic_provider_uri(chain, provider_uri)
-    export_all_common(get_partitions(start, end, partition_batch_size, provider_uri),
-                      output_dir, postgres_connection_string, provider_uri, max_workers, export_batch_size, skip_geth_traces)
+    export_all_common(get_partitions(start, end, partition_batch_size, provider_uri, rpc_cache_dir,
+                                     block_timestamp_index_file),
+                      output_dir, postgres_connection_string, provider_uri, max_workers, export_batch_size, skip_geth_traces,
+                      rpc_cache_dir=rpc_cache_dir, max_concurrent_partitions=max_concurrent_partitions,
+                      partition_processes=partition_processes, resume=resume)
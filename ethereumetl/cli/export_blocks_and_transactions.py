@@ -26,7 +26,7 @@ import click
 from ethereumetl.jobs.export_blocks_job import ExportBlocksJob
 from ethereumetl.jobs.exporters.blocks_and_transactions_item_exporter import blocks_and_transactions_item_exporter
 from blockchainetl.logging_utils import logging_basic_config
-from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.providers.auto import get_async_provider_from_uri, get_provider_from_uri
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
 from ethereumetl.utils import check_classic_provider_uri
 
@@ -47,10 +47,18 @@ logging_basic_config()
               help='The output file for transactions. '
                    'If not provided transactions will not be exported. Use "-" for stdout')
 @click.option('-c', '--chain', default='ethereum', show_default=True, type=str, help='The chain network to connect to.')
+@click.option('--async', 'use_async', is_flag=True, default=False,
+              help='Use the asyncio JSON RPC engine instead of worker threads. '
+                   '--max-workers is then the number of batch requests in flight.')
+@click.option('--rpc-cache-dir', default=None, show_default=True, type=str,
+              help='The directory where JSON RPC results for finalized blocks are cached. '
+                   'Repeated requests are served from the cache.')
 def export_blocks_and_transactions(start_block, end_block, batch_size, provider_uri, max_workers, blocks_output,
-                                   transactions_output, chain='ethereum'):
+                                   transactions_output, chain='ethereum', use_async=False, rpc_cache_dir=None):
     """Exports blocks and transactions."""
     provider_uri = check_classic_provider_uri(chain, provider_uri)
+    if use_async and rpc_cache_dir is not None:
+        raise click.BadOptionUsage('--rpc-cache-dir', '--rpc-cache-dir is not supported with --async')
     if blocks_output is None and transactions_output is None:
         raise ValueError('Either --blocks-output or --transactions-output options must be provided')
 
@@ -58,7 +66,8 @@ def export_blocks_and_transactions(start_block, end_block, batch_size, provider_
         start_block=start_block,
         end_block=end_block,
         batch_size=batch_size,
-        batch_web3_provider=ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
+        batch_web3_provider=get_async_provider_from_uri(provider_uri, max_connections=max_workers) if use_async
+            else ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True, rpc_cache_dir=rpc_cache_dir)),
         max_workers=max_workers,
         item_exporter=blocks_and_transactions_item_exporter(blocks_output, transactions_output),
         export_blocks=blocks_output is not None,
@@ -26,7 +26,7 @@ import click
 from ethereumetl.jobs.export_geth_traces_job import ExportGethTracesJob
 from ethereumetl.jobs.exporters.geth_traces_item_exporter import geth_traces_item_exporter
 from blockchainetl.logging_utils import logging_basic_config
-from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.providers.auto import get_async_provider_from_uri, get_provider_from_uri
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
 
 logging_basic_config()
@@ -42,13 +42,23 @@ logging_basic_config()
 @click.option('-p', '--provider-uri', required=True, type=str,
               help='The URI of the web3 provider e.g. '
                    'file://$HOME/Library/Ethereum/geth.ipc or http://localhost:8545/')
-def export_geth_traces(start_block, end_block, batch_size, output, max_workers, provider_uri):
+@click.option('--async', 'use_async', is_flag=True, default=False,
+              help='Use the asyncio JSON RPC engine instead of worker threads. '
+                   '--max-workers is then the number of batch requests in flight.')
+@click.option('--rpc-cache-dir', default=None, show_default=True, type=str,
+              help='The directory where JSON RPC results for finalized blocks are cached. '
+                   'Repeated requests are served from the cache.')
+def export_geth_traces(start_block, end_block, batch_size, output, max_workers, provider_uri, use_async=False,
+                       rpc_cache_dir=None):
     """Exports traces from geth node."""
+    if use_async and rpc_cache_dir is not None:
+        raise click.BadOptionUsage('--rpc-cache-dir', '--rpc-cache-dir is not supported with --async')
     job = ExportGethTracesJob(
         start_block=start_block,
         end_block=end_block,
         batch_size=batch_size,
-        batch_web3_provider=ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
+        batch_web3_provider=get_async_provider_from_uri(provider_uri, max_connections=max_workers) if use_async
+            else ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True, rpc_cache_dir=rpc_cache_dir)),
         max_workers=max_workers,
         item_exporter=geth_traces_item_exporter(output))
 
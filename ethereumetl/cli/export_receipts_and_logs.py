@@ -28,7 +28,7 @@ from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
 from ethereumetl.jobs.exporters.receipts_and_logs_item_exporter import receipts_and_logs_item_exporter
 from blockchainetl.logging_utils import logging_basic_config
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
-from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.providers.auto import get_async_provider_from_uri, get_provider_from_uri
 from ethereumetl.utils import check_classic_provider_uri
 
 logging_basic_config()
@@ -36,8 +36,12 @@ logging_basic_config()
 
 @click.command(context_settings=dict(help_option_names=['-h', '--help']))
 @click.option('-b', '--batch-size', default=100, show_default=True, type=int, help='The number of receipts to export at a time.')
-@click.option('-t', '--transaction-hashes', required=True, type=str,
+@click.option('-t', '--transaction-hashes', default=None, type=str,
               help='The file containing transaction hashes, one per line.')
+@click.option('-s', '--start-block', default=None, type=int,
+              help='Start block, used instead of --transaction-hashes to export receipts for a block range.')
+@click.option('-e', '--end-block', default=None, type=int,
+              help='End block, used instead of --transaction-hashes to export receipts for a block range.')
 @click.option('-p', '--provider-uri', default='https://mainnet.infura.io', show_default=True, type=str,
               help='The URI of the web3 provider e.g. '
                    'file://$HOME/Library/Ethereum/geth.ipc or https://mainnet.infura.io')
@@ -48,15 +52,43 @@ logging_basic_config()
               help='The output file for receipt logs. '
                    'aIf not provided receipt logs will not be exported. Use "-" for stdout')
 @click.option('-c', '--chain', default='ethereum', show_default=True, type=str, help='The chain network to connect to.')
-def export_receipts_and_logs(batch_size, transaction_hashes, provider_uri, max_workers, receipts_output, logs_output,
-                             chain='ethereum'):
+@click.option('--async', 'use_async', is_flag=True, default=False,
+              help='Use the asyncio JSON RPC engine instead of worker threads. '
+                   '--max-workers is then the number of batch requests in flight.')
+@click.option('--rpc-cache-dir', default=None, show_default=True, type=str,
+              help='The directory where JSON RPC results for finalized blocks are cached. '
+                   'Repeated requests are served from the cache.')
+def export_receipts_and_logs(batch_size, transaction_hashes, start_block, end_block, provider_uri, max_workers,
+                             receipts_output, logs_output, chain='ethereum', use_async=False, rpc_cache_dir=None):
     """Exports receipts and logs."""
     provider_uri = check_classic_provider_uri(chain, provider_uri)
+    if use_async and rpc_cache_dir is not None:
+        raise click.BadOptionUsage('--rpc-cache-dir', '--rpc-cache-dir is not supported with --async')
+    batch_web3_provider = get_async_provider_from_uri(provider_uri, max_connections=max_workers) if use_async \
+        else ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True, rpc_cache_dir=rpc_cache_dir))
+    if transaction_hashes is None:
+        if start_block is None or end_block is None:
+            raise click.UsageError('Either --transaction-hashes or --start-block and --end-block must be provided')
+        # Uses eth_getBlockReceipts when the node supports it
+        job = ExportReceiptsJob(
+            transaction_hashes_iterable=None,
+            start_block=start_block,
+            end_block=end_block,
+            batch_size=batch_size,
+            batch_web3_provider=batch_web3_provider,
+            max_workers=max_workers,
+            item_exporter=receipts_and_logs_item_exporter(receipts_output, logs_output),
+            export_receipts=receipts_output is not None,
+            export_logs=logs_output is not None)
+
+        job.run()
+        return
+
     with smart_open(transaction_hashes, 'r') as transaction_hashes_file:
         job = ExportReceiptsJob(
             transaction_hashes_iterable=(transaction_hash.strip() for transaction_hash in transaction_hashes_file),
             batch_size=batch_size,
-            batch_web3_provider=ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
+            batch_web3_provider=batch_web3_provider,
             max_workers=max_workers,
             item_exporter=receipts_and_logs_item_exporter(receipts_output, logs_output),
             export_receipts=receipts_output is not None,
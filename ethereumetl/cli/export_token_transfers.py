@@ -23,8 +23,6 @@
 
 import click
 
-from ethereumetl.web3_utils import build_web3
-
 from ethereumetl.jobs.export_token_transfers_job import ExportTokenTransfersJob
 from ethereumetl.jobs.exporters.token_transfers_item_exporter import token_transfers_item_exporter
 from blockchainetl.logging_utils import logging_basic_config
@@ -43,13 +41,18 @@ logging_basic_config()
 @click.option('-p', '--provider-uri', required=True, type=str,
               help='The URI of the web3 provider e.g. file://$HOME/Library/Ethereum/geth.ipc or http://localhost:8545/')
 @click.option('-t', '--tokens', default=None, show_default=True, type=str, multiple=True, help='The list of token addresses to filter by.')
-def export_token_transfers(start_block, end_block, batch_size, output, max_workers, provider_uri, tokens):
+@click.option('--rpc-cache-dir', default=None, show_default=True, type=str,
+              help='The directory where JSON RPC results for finalized blocks are cached. '
+                   'Repeated requests are served from the cache.')
+def export_token_transfers(start_block, end_block, batch_size, output, max_workers, provider_uri, tokens,
+                           rpc_cache_dir=None):
     """Exports ERC20/ERC721 transfers."""
     job = ExportTokenTransfersJob(
         start_block=start_block,
         end_block=end_block,
         batch_size=batch_size,
-        web3=ThreadLocalProxy(lambda: build_web3(get_provider_from_uri(provider_uri))),
+        batch_web3_provider=ThreadLocalProxy(
+            lambda: get_provider_from_uri(provider_uri, batch=True, rpc_cache_dir=rpc_cache_dir)),
         item_exporter=token_transfers_item_exporter(output),
         max_workers=max_workers,
         tokens=tokens)
@@ -23,14 +23,13 @@
 
 import click
 
-from ethereumetl.web3_utils import build_web3
-
 from blockchainetl.file_utils import smart_open
 from ethereumetl.jobs.export_tokens_job import ExportTokensJob
 from ethereumetl.jobs.exporters.tokens_item_exporter import tokens_item_exporter
 from blockchainetl.logging_utils import logging_basic_config
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
 from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.service.token_metadata_cache import get_token_metadata_cache
 from ethereumetl.utils import check_classic_provider_uri
 
 logging_basic_config()
@@ -40,19 +39,24 @@ logging_basic_config()
 @click.option('-t', '--token-addresses', required=True, type=str,
               help='The file containing token addresses, one per line.')
 @click.option('-o', '--output', default='-', show_default=True, type=str, help='The output file. If not specified stdout is used.')
+@click.option('-b', '--batch-size', default=100, show_default=True, type=int, help='The number of tokens to resolve at a time.')
+@click.option('--token-cache-file', default=None, show_default=True, type=str,
+              help='The SQLite file where resolved token metadata is cached. Cached tokens are not requested again.')
 @click.option('-w', '--max-workers', default=5, show_default=True, type=int, help='The maximum number of workers.')
 @click.option('-p', '--provider-uri', default='https://mainnet.infura.io', show_default=True, type=str,
               help='The URI of the web3 provider e.g. '
                    'file://$HOME/Library/Ethereum/geth.ipc or https://mainnet.infura.io')
 @click.option('-c', '--chain', default='ethereum', show_default=True, type=str, help='The chain network to connect to.')
-def export_tokens(token_addresses, output, max_workers, provider_uri, chain='ethereum'):
+def export_tokens(token_addresses, output, batch_size, token_cache_file, max_workers, provider_uri, chain='ethereum'):
     """Exports ERC20/ERC721 tokens."""
     provider_uri = check_classic_provider_uri(chain, provider_uri)
     with smart_open(token_addresses, 'r') as token_addresses_file:
         job = ExportTokensJob(
             token_addresses_iterable=(token_address.strip() for token_address in token_addresses_file),
-            web3=ThreadLocalProxy(lambda: build_web3(get_provider_from_uri(provider_uri))),
+            batch_web3_provider=ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
             item_exporter=tokens_item_exporter(output),
-            max_workers=max_workers)
+            max_workers=max_workers,
+            batch_size=batch_size,
+            token_metadata_cache=get_token_metadata_cache(token_cache_file) if token_cache_file else None)
 
         job.run()
@@ -23,8 +23,7 @@
 
 import click
 
-from ethereumetl.web3_utils import build_web3
-
+from ethereumetl.enumeration.trace_mode import TraceMode
 from ethereumetl.jobs.export_traces_job import ExportTracesJob
 from blockchainetl.logging_utils import logging_basic_config
 from ethereumetl.providers.auto import get_provider_from_uri
@@ -47,8 +46,14 @@ logging_basic_config()
 @click.option('--daofork-traces/--no-daofork-traces', default=False, show_default=True, help='Whether to include daofork traces')
 @click.option('-t', '--timeout', default=60, show_default=True, type=int, help='IPC or HTTP request timeout.')
 @click.option('-c', '--chain', default='ethereum', show_default=True, type=str, help='The chain network to connect to.')
+@click.option('--trace-mode', default=None, show_default=True, type=click.Choice(TraceMode.ALL),
+              help='How traces are requested: batched trace_block requests, trace_filter requests for block ranges '
+                   'or one trace_block request at a time. If not specified the node is probed for the supported mode.')
+@click.option('--rpc-cache-dir', default=None, show_default=True, type=str,
+              help='The directory where JSON RPC results for finalized blocks are cached. '
+                   'Repeated requests are served from the cache.')
 def export_traces(start_block, end_block, batch_size, output, max_workers, provider_uri,
-                  genesis_traces, daofork_traces, timeout=60, chain='ethereum'):
+                  genesis_traces, daofork_traces, timeout=60, chain='ethereum', trace_mode=None, rpc_cache_dir=None):
     """Exports traces from parity node."""
     if chain == 'classic' and daofork_traces == True:
         raise ValueError(
@@ -57,10 +62,12 @@ def export_traces(start_block, end_block, batch_size, output, max_workers, provi
         start_block=start_block,
         end_block=end_block,
         batch_size=batch_size,
-        web3=ThreadLocalProxy(lambda: build_web3(get_provider_from_uri(provider_uri, timeout=timeout))),
+        batch_web3_provider=ThreadLocalProxy(lambda: get_provider_from_uri(
+            provider_uri, timeout=timeout, batch=True, rpc_cache_dir=rpc_cache_dir)),
         item_exporter=traces_item_exporter(output),
         max_workers=max_workers,
         include_genesis_traces=genesis_traces,
-        include_daofork_traces=daofork_traces)
+        include_daofork_traces=daofork_traces,
+        trace_mode=trace_mode)
 
     job.run()
@@ -22,18 +22,18 @@
 
 
 import csv
-import json
 
 import click
 from blockchainetl.csv_utils import set_max_field_size_limit
 from blockchainetl.file_utils import smart_open
+from blockchainetl.json_codec import json_loads
 from blockchainetl.jobs.exporters.converters.int_to_string_item_converter import IntToStringItemConverter
 from ethereumetl.jobs.exporters.tokens_item_exporter import tokens_item_exporter
 from ethereumetl.jobs.extract_tokens_job import ExtractTokensJob
 from blockchainetl.logging_utils import logging_basic_config
 from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.service.token_metadata_cache import get_token_metadata_cache
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
-from ethereumetl.web3_utils import build_web3
 
 logging_basic_config()
 
@@ -44,23 +44,29 @@ logging_basic_config()
               help='The URI of the web3 provider e.g. '
                    'file://$HOME/Library/Ethereum/geth.ipc or https://mainnet.infura.io')
 @click.option('-o', '--output', default='-', show_default=True, type=str, help='The output file. If not specified stdout is used.')
+@click.option('-b', '--batch-size', default=100, show_default=True, type=int, help='The number of tokens to resolve at a time.')
+@click.option('--token-cache-file', default=None, show_default=True, type=str,
+              help='The SQLite file where resolved token metadata is cached. Cached tokens are not requested again.')
 @click.option('-w', '--max-workers', default=5, show_default=True, type=int, help='The maximum number of workers.')
 @click.option('--values-as-strings', default=False, show_default=True, is_flag=True, help='Whether to convert values to strings.')
-def extract_tokens(contracts, provider_uri, output, max_workers, values_as_strings=False):
+def extract_tokens(contracts, provider_uri, output, batch_size, token_cache_file, max_workers,
+                   values_as_strings=False):
     """Extracts tokens from contracts file."""
 
     set_max_field_size_limit()
 
     with smart_open(contracts, 'r') as contracts_file:
         if contracts.endswith('.json'):
-            contracts_iterable = (json.loads(line) for line in contracts_file)
+            contracts_iterable = (json_loads(line) for line in contracts_file)
         else:
             contracts_iterable = csv.DictReader(contracts_file)
         converters = [IntToStringItemConverter(keys=['decimals', 'total_supply'])] if values_as_strings else []
         job = ExtractTokensJob(
             contracts_iterable=contracts_iterable,
-            web3=ThreadLocalProxy(lambda: build_web3(get_provider_from_uri(provider_uri))),
+            batch_web3_provider=ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
             max_workers=max_workers,
+            batch_size=batch_size,
+            token_metadata_cache=get_token_metadata_cache(token_cache_file) if token_cache_file else None,
             item_exporter=tokens_item_exporter(output, converters))
 
         job.run()
@@ -28,4 +28,7 @@ class EthContract(object):
         self.function_sighashes = []
         self.is_erc20 = False
         self.is_erc721 = False
+        self.is_erc1155 = False
+        self.is_erc4626 = False
+        self.is_proxy = False
         self.block_number = None
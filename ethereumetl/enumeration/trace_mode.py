@@ -0,0 +1,9 @@
+class TraceMode:
+    # A single trace_filter request for a range of blocks
+    FILTER = 'filter'
+    # A batch of trace_block requests, one for each block
+    BLOCK = 'block'
+    # One trace_block request at a time, for nodes that can't handle batched trace requests
+    SINGLE = 'single'
+
+    ALL = [FILTER, BLOCK, SINGLE]
@@ -0,0 +1,124 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import asyncio
+import logging
+
+from ethereumetl.executors.batch_work_executor import BatchWorkExecutor, RETRY_EXCEPTIONS
+from ethereumetl.utils import dynamic_batch_iterator
+
+
+# Executes the given coroutine work handler in batches on a single event loop, keeping up to max_concurrency
+# batches in flight. Batch size adaptation and retries are the same as in BatchWorkExecutor.
+class AsyncBatchWorkExecutor(BatchWorkExecutor):
+    def __init__(self, starting_batch_size, max_concurrency, retry_exceptions=None, max_retries=5,
+                 closeables=()):
+        """retry_exceptions=None retries the sync executor exceptions, asyncio timeouts and aiohttp errors"""
+        super().__init__(starting_batch_size, max_concurrency,
+                         retry_exceptions=retry_exceptions or get_async_retry_exceptions(), max_retries=max_retries)
+        # Async resources e.g. providers, closed on the event loop in shutdown()
+        self.closeables = closeables
+
+    def _create_executor(self):
+        return asyncio.new_event_loop()
+
+    def execute(self, work_iterable, work_handler, total_items=None):
+        self.progress_logger.start(total_items=total_items)
+        self.executor.run_until_complete(self._execute(work_iterable, work_handler))
+
+    async def _execute(self, work_iterable, work_handler):
+        semaphore = asyncio.Semaphore(self.max_workers)
+        tasks = set()
+        try:
+            for batch in dynamic_batch_iterator(work_iterable, lambda: self.batch_size):
+                await semaphore.acquire()
+                # Fail fast in case of errors
+                check_completed_tasks(tasks)
+                task = asyncio.ensure_future(self._fail_safe_execute(work_handler, batch))
+                task.add_done_callback(lambda _: semaphore.release())
+                tasks.add(task)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _fail_safe_execute(self, work_handler, batch):
+        try:
+            await work_handler(batch)
+            self._try_increase_batch_size(len(batch))
+        except self.retry_exceptions:
+            self.logger.exception('An exception occurred while executing work_handler.')
+            self._try_decrease_batch_size(len(batch))
+            self.logger.info('The batch of size {} will be retried one item at a time.'.format(len(batch)))
+            for item in batch:
+                await execute_with_retries_async(work_handler, [item],
+                                                 max_retries=self.max_retries, retry_exceptions=self.retry_exceptions)
+
+        self.progress_logger.track(len(batch))
+
+    def shutdown(self):
+        for closeable in self.closeables:
+            self.executor.run_until_complete(closeable.close())
+        self.executor.close()
+        self.progress_logger.finish()
+
+
+def check_completed_tasks(tasks):
+    for task in [task for task in tasks if task.done()]:
+        # Will throw an exception here if the task failed
+        task.result()
+        tasks.remove(task)
+
+
+async def execute_with_retries_async(func, *args, max_retries=5, retry_exceptions=None, sleep_seconds=1):
+    retry_exceptions = retry_exceptions or get_async_retry_exceptions()
+    for i in range(max_retries):
+        try:
+            return await func(*args)
+        except retry_exceptions:
+            logging.exception('An exception occurred while executing execute_with_retries_async. Retry #{}'.format(i))
+            if i < max_retries - 1:
+                logging.info('The request will be retried after {} seconds. Retry #{}'.format(sleep_seconds, i))
+                await asyncio.sleep(sleep_seconds)
+                continue
+            else:
+                raise
+
+
+def get_async_retry_exceptions():
+    # aiohttp is imported here so that the sync code paths don't require it, it comes with the async extra
+    from aiohttp import ClientError
+    return RETRY_EXCEPTIONS + (asyncio.TimeoutError, ClientError)
+
+
+def is_async_provider(provider):
+    return hasattr(provider, 'make_batch_request_async')
+
+
+def create_batch_work_executor(batch_size, max_workers, batch_web3_provider):
+    """Returns AsyncBatchWorkExecutor for async providers, BatchWorkExecutor otherwise"""
+    if is_async_provider(batch_web3_provider):
+        return AsyncBatchWorkExecutor(batch_size, max_workers, closeables=[batch_web3_provider])
+    return BatchWorkExecutor(batch_size, max_workers)
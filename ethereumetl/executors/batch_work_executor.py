@@ -45,13 +45,16 @@ class BatchWorkExecutor:
         self.max_batch_size = starting_batch_size
         self.latest_batch_size_change_time = None
         self.max_workers = max_workers
-        # Using bounded executor prevents unlimited queue growth
-        # and allows monitoring in-progress futures and failing fast in case of errors.
-        self.executor = FailSafeExecutor(BoundedExecutor(1, self.max_workers))
+        self.executor = self._create_executor()
         self.retry_exceptions = retry_exceptions
         self.max_retries = max_retries
         self.progress_logger = ProgressLogger()
-        self.logger = logging.getLogger('BatchWorkExecutor')
+        self.logger = logging.getLogger(type(self).__name__)
+
+    def _create_executor(self):
+        # Using bounded executor prevents unlimited queue growth
+        # and allows monitoring in-progress futures and failing fast in case of errors.
+        return FailSafeExecutor(BoundedExecutor(1, self.max_workers))
 
     def execute(self, work_iterable, work_handler, total_items=None):
         self.progress_logger.start(total_items=total_items)
@@ -22,63 +22,43 @@
 
 
 import csv
+import functools
 import logging
 import os
-import shutil
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from time import time
 
 from requests import HTTPError
 
+from blockchainetl.jobs.exporters.buffered_item_exporter import BufferedItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
 from blockchainetl.jobs.exporters.postgres_item_exporter import PostgresItemExporter
-from blockchainetl.file_utils import smart_open
 from blockchainetl.jobs.exporters.multi_item_exporter import MultiItemExporter
 from blockchainetl.streaming.postgres_utils import create_insert_statement_for_table
-from ethereumetl.csv_utils import set_max_field_size_limit
 from ethereumetl.jobs.export_blocks_job import ExportBlocksJob
 from ethereumetl.jobs.export_geth_traces_job import ExportGethTracesJob
-from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
 from ethereumetl.jobs.export_token_transfers_job import ExportTokenTransfersJob
+from ethereumetl.jobs.partition_manifest import PartitionManifest
 from ethereumetl.jobs.export_tokens_job import ExportTokensJob
 from ethereumetl.jobs.export_contracts_job import ExportContractsJob
 from ethereumetl.jobs.exporters.blocks_and_transactions_item_exporter import blocks_and_transactions_item_exporter
 from ethereumetl.jobs.exporters.contracts_item_exporter import contracts_item_exporter
+from ethereumetl.jobs.exporters.geth_trace_contracts_item_exporter import GethTraceContractsItemExporter
 from ethereumetl.jobs.exporters.receipts_and_logs_item_exporter import receipts_and_logs_item_exporter
 from ethereumetl.jobs.exporters.token_transfers_item_exporter import token_transfers_item_exporter
 from ethereumetl.jobs.exporters.tokens_item_exporter import tokens_item_exporter
-from ethereumetl.jobs.extract_contracts_job import ExtractContractsJob
 from ethereumetl.providers.auto import get_provider_from_uri
-from ethereumetl.streaming.enrich import enrich_contracts, enrich_logs, enrich_tokens
+from ethereumetl.streaming.enrich import enrich_contracts, enrich_log, enrich_tokens, ItemIndex
 from ethereumetl.streaming.postgres_tables import BLOCKS, TRANSACTIONS, LOGS, TOKEN_TRANSFERS, CONTRACT_CREATIONS, TOKENS
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
-from ethereumetl.web3_utils import build_web3
 from ethereumetl.misc.historical_stata_unavailable_error import HistoricalStateUnavailableError
 
 
 logger = logging.getLogger('export_all')
 
 
-def is_log_filter_supported(provider_uri):
-    return 'infura' not in provider_uri
-
-
-def extract_csv_column_unique(input_path, output, column, other_columns = None):
-    set_max_field_size_limit()
-    with smart_open(input_path, 'r') as input_file, smart_open(output, 'w') as output_file:
-        reader = csv.DictReader(input_file)
-        seen = set()  # set for fast O(1) amortized lookup
-        for row in reader:
-            if row[column] in seen:
-                continue
-            seen.add(row[column])
-
-            output = row[column]
-            if other_columns:
-                for other_column in other_columns:
-                    output = output + "," + row[other_column]
-            output_file.write(output + '\n')
-
-
 def get_multi_item_exporter(item_exporters: list):
     valid_item_exporters = []
 
@@ -89,46 +69,185 @@ def get_multi_item_exporter(item_exporters: list):
     return MultiItemExporter(valid_item_exporters)
 
 
-def export_all_common(partitions, output_dir, postgres_connection_string, provider_uri, max_workers, batch_size, skip_geth_traces):
-
-    for batch_start_block, batch_end_block, partition_dir in partitions:
-        # # # start # # #
-
-        start_time = time()
-
-        padded_batch_start_block = str(batch_start_block).zfill(8)
-        padded_batch_end_block = str(batch_end_block).zfill(8)
-        block_range = '{padded_batch_start_block}-{padded_batch_end_block}'.format(
-            padded_batch_start_block=padded_batch_start_block,
-            padded_batch_end_block=padded_batch_end_block,
+# Passes blocks, transactions, receipts and logs to the item exporters as they are exported by ExportBlocksJob
+# instead of keeping all the items of a partition in memory. Only what the later stages need is kept:
+# the block fields that items are enriched with and the block numbers of the created contracts.
+class BlocksStageItemExporter:
+    def __init__(self, blocks_and_transactions_exporter, receipts_and_logs_exporter):
+        self.blocks_and_transactions_exporter = blocks_and_transactions_exporter
+        self.receipts_and_logs_exporter = receipts_and_logs_exporter
+        self.blocks = {}
+        self.contract_block_numbers = OrderedDict()
+        # ExportBlocksJob exports the blocks of a batch before their logs, so logs wait for their blocks only
+        # if the job changes
+        self._logs_without_blocks = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def open(self):
+        self.blocks_and_transactions_exporter.open()
+        self.receipts_and_logs_exporter.open()
+
+    def export_items(self, items):
+        for item in items:
+            self.export_item(item)
+
+    def export_item(self, item):
+        with self._lock:
+            item_type = item.get('type')
+            if item_type == 'block':
+                self.blocks[item['number']] = {
+                    'number': item['number'], 'timestamp': item.get('timestamp'), 'hash': item.get('hash')}
+                self.blocks_and_transactions_exporter.export_item(item)
+                for log in self._logs_without_blocks.pop(item['number'], []):
+                    self.receipts_and_logs_exporter.export_item(enrich_log(self.blocks[item['number']], log))
+            elif item_type == 'transaction':
+                contract_address = item.get('receipt_contract_address')
+                if contract_address:
+                    self.contract_block_numbers.setdefault(contract_address, item['block_number'])
+                self.blocks_and_transactions_exporter.export_item(item)
+            elif item_type == 'log':
+                block = self.blocks.get(item['block_number'])
+                if block is None:
+                    self._logs_without_blocks[item['block_number']].append(item)
+                else:
+                    self.receipts_and_logs_exporter.export_item(enrich_log(block, item))
+            else:
+                self.receipts_and_logs_exporter.export_item(item)
+
+    def close(self):
+        if self._logs_without_blocks:
+            raise ValueError('The blocks of logs are not found {}'.format(list(self._logs_without_blocks.keys())))
+        self.blocks_and_transactions_exporter.close()
+        self.receipts_and_logs_exporter.close()
+
+
+def export_all_common(partitions, output_dir, postgres_connection_string, provider_uri, max_workers, batch_size, skip_geth_traces,
+                      rpc_cache_dir=None, max_concurrent_partitions=1, partition_processes=False, resume=True):
+    """Exports max_concurrent_partitions partitions at a time, in threads or with partition_processes in processes.
+    With resume the stages of partitions that were completed by a previous run are skipped"""
+    export_partition_with_options = functools.partial(
+        export_partition,
+        output_dir=output_dir,
+        postgres_connection_string=postgres_connection_string,
+        provider_uri=provider_uri,
+        max_workers=max_workers,
+        batch_size=batch_size,
+        skip_geth_traces=skip_geth_traces,
+        rpc_cache_dir=rpc_cache_dir,
+        resume=resume,
+    )
+
+    if max_concurrent_partitions <= 1:
+        for batch_start_block, batch_end_block, partition_dir in partitions:
+            export_partition_with_options(batch_start_block, batch_end_block, partition_dir)
+        return
+
+    executor_class = ProcessPoolExecutor if partition_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_concurrent_partitions) as executor:
+        running = set()
+        for batch_start_block, batch_end_block, partition_dir in partitions:
+            # Partitions are submitted lazily, the partitions for dates are resolved with requests to the node
+            if len(running) >= max_concurrent_partitions:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            running.add(executor.submit(
+                export_partition_with_options, batch_start_block, batch_end_block, partition_dir))
+
+        for future in wait(running)[0]:
+            future.result()
+
+
+def export_partition(batch_start_block, batch_end_block, partition_dir, output_dir, postgres_connection_string,
+                     provider_uri, max_workers, batch_size, skip_geth_traces, rpc_cache_dir=None, resume=True):
+    """Stages that don't depend on each other run concurrently: blocks with receipts, token transfers and
+    geth traces. Contracts are exported when the stages they depend on are finished.
+    Completed stages are recorded in the partition manifest and skipped when the partition is exported again"""
+    # # # start # # #
+
+    start_time = time()
+
+    padded_batch_start_block = str(batch_start_block).zfill(8)
+    padded_batch_end_block = str(batch_end_block).zfill(8)
+    block_range = '{padded_batch_start_block}-{padded_batch_end_block}'.format(
+        padded_batch_start_block=padded_batch_start_block,
+        padded_batch_end_block=padded_batch_end_block,
+    )
+    file_name_suffix = '{padded_batch_start_block}_{padded_batch_end_block}'.format(
+        padded_batch_start_block=padded_batch_start_block,
+        padded_batch_end_block=padded_batch_end_block,
+    )
+
+    manifest_file = '{output_dir}/_manifests{partition_dir}/manifest_{file_name_suffix}.json'.format(
+        output_dir=output_dir,
+        partition_dir=partition_dir,
+        file_name_suffix=file_name_suffix,
+    )
+    manifest = PartitionManifest(manifest_file, output_dir)
+    if resume:
+        manifest.load()
+
+    def get_batch_web3_provider():
+        return ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True, rpc_cache_dir=rpc_cache_dir))
+
+    postgres_exporter = None
+    if postgres_connection_string:
+        postgres_exporter = PostgresItemExporter(
+            postgres_connection_string, item_type_to_insert_stmt_mapping={
+                'block': create_insert_statement_for_table(BLOCKS),
+                'transaction': create_insert_statement_for_table(TRANSACTIONS),
+                'log': create_insert_statement_for_table(LOGS),
+                'token_transfer': create_insert_statement_for_table(TOKEN_TRANSFERS),
+                'contract': create_insert_statement_for_table(CONTRACT_CREATIONS),
+            },
         )
-        file_name_suffix = '{padded_batch_start_block}_{padded_batch_end_block}'.format(
-            padded_batch_start_block=padded_batch_start_block,
-            padded_batch_end_block=padded_batch_end_block,
-        )
-
-        # # # blocks_and_transactions # # #
-
-        blocks_output_dir = '{output_dir}/blocks{partition_dir}'.format(
-            output_dir=output_dir,
-            partition_dir=partition_dir,
-        )
-        os.makedirs(os.path.dirname(blocks_output_dir), exist_ok=True)
 
-        transactions_output_dir = '{output_dir}/transactions{partition_dir}'.format(
-            output_dir=output_dir,
-            partition_dir=partition_dir,
-        )
-        os.makedirs(os.path.dirname(transactions_output_dir), exist_ok=True)
-
-        blocks_file = '{blocks_output_dir}/blocks_{file_name_suffix}.csv'.format(
-            blocks_output_dir=blocks_output_dir,
-            file_name_suffix=file_name_suffix,
-        )
-        transactions_file = '{transactions_output_dir}/transactions_{file_name_suffix}.csv'.format(
-            transactions_output_dir=transactions_output_dir,
-            file_name_suffix=file_name_suffix,
-        )
+    # # # blocks_and_transactions # # #
+
+    blocks_output_dir = '{output_dir}/blocks{partition_dir}'.format(
+        output_dir=output_dir,
+        partition_dir=partition_dir,
+    )
+    os.makedirs(os.path.dirname(blocks_output_dir), exist_ok=True)
+
+    transactions_output_dir = '{output_dir}/transactions{partition_dir}'.format(
+        output_dir=output_dir,
+        partition_dir=partition_dir,
+    )
+    os.makedirs(os.path.dirname(transactions_output_dir), exist_ok=True)
+
+    blocks_file = '{blocks_output_dir}/blocks_{file_name_suffix}.csv'.format(
+        blocks_output_dir=blocks_output_dir,
+        file_name_suffix=file_name_suffix,
+    )
+    transactions_file = '{transactions_output_dir}/transactions_{file_name_suffix}.csv'.format(
+        transactions_output_dir=transactions_output_dir,
+        file_name_suffix=file_name_suffix,
+    )
+
+    receipts_output_dir = '{output_dir}/receipts{partition_dir}'.format(
+        output_dir=output_dir,
+        partition_dir=partition_dir,
+    )
+    os.makedirs(os.path.dirname(receipts_output_dir), exist_ok=True)
+
+    logs_output_dir = '{output_dir}/logs{partition_dir}'.format(
+        output_dir=output_dir,
+        partition_dir=partition_dir,
+    )
+    os.makedirs(os.path.dirname(logs_output_dir), exist_ok=True)
+
+    receipts_file = '{receipts_output_dir}/receipts_{file_name_suffix}.csv'.format(
+        receipts_output_dir=receipts_output_dir,
+        file_name_suffix=file_name_suffix,
+    )
+    logs_file = '{logs_output_dir}/logs_{file_name_suffix}.csv'.format(
+        logs_output_dir=logs_output_dir,
+        file_name_suffix=file_name_suffix,
+    )
+
+    def export_blocks_and_receipts():
+        """Returns the block fields the other items are enriched with and the block numbers of created contracts"""
         logger.info('Exporting blocks {block_range} to {blocks_file}'.format(
             block_range=block_range,
             blocks_file=blocks_file,
@@ -137,262 +256,205 @@ def export_all_common(partitions, output_dir, postgres_connection_string, provid
             block_range=block_range,
             transactions_file=transactions_file,
         ))
+        logger.info('Exporting receipts and logs from blocks {block_range} to {receipts_file} and {logs_file}'.format(
+            block_range=block_range,
+            receipts_file=receipts_file,
+            logs_file=logs_file,
+        ))
 
         blocks_and_transactions_file_exporter = blocks_and_transactions_item_exporter(
             blocks_file, transactions_file)
-
-        postgres_exporter = None
-        if postgres_connection_string:
-            postgres_exporter = PostgresItemExporter(
-                postgres_connection_string, item_type_to_insert_stmt_mapping={
-                    'block': create_insert_statement_for_table(BLOCKS),
-                    'transaction': create_insert_statement_for_table(TRANSACTIONS),
-                    'log': create_insert_statement_for_table(LOGS),
-                    'token_transfer': create_insert_statement_for_table(TOKEN_TRANSFERS),
-                    'contract': create_insert_statement_for_table(CONTRACT_CREATIONS),
-                },
-            )
-
-        inmemory_exporter = InMemoryItemExporter(item_types=[
-            'block', 'transaction', 'log', 'token_transfer', 'contract', 'receipt', 'geth_trace'])
-
+        blocks_and_transactions_exporters = BufferedItemExporter(get_multi_item_exporter(
+            [blocks_and_transactions_file_exporter, postgres_exporter]))
+        # Receipts and logs are fetched together with blocks and transactions
+        receipts_and_logs_file_exporter = receipts_and_logs_item_exporter(
+            receipts_file, logs_file)
+        receipts_and_logs_exporters = BufferedItemExporter(get_multi_item_exporter(
+            [receipts_and_logs_file_exporter, postgres_exporter]))
+
+        blocks_stage_exporter = BlocksStageItemExporter(blocks_and_transactions_exporters, receipts_and_logs_exporters)
         job = ExportBlocksJob(
             start_block=batch_start_block,
             end_block=batch_end_block,
             batch_size=batch_size,
-            batch_web3_provider=ThreadLocalProxy(
-                lambda: get_provider_from_uri(provider_uri, batch=True)),
+            batch_web3_provider=get_batch_web3_provider(),
             max_workers=max_workers,
-            item_exporter=inmemory_exporter,
+            item_exporter=blocks_stage_exporter,
             export_blocks=blocks_file is not None,
-            export_transactions=transactions_file is not None)
+            export_transactions=transactions_file is not None,
+            export_receipts=receipts_file is not None,
+            export_logs=logs_file is not None)
         job.run()
-        blocks = inmemory_exporter.get_items('block')
-        transactions = inmemory_exporter.get_items('transaction')
-        # transactions = enrich_transactions(blocks, transactions)
-        blocks_and_transactions_exporters = get_multi_item_exporter(
-            [blocks_and_transactions_file_exporter, postgres_exporter])
-        blocks_and_transactions_exporters.open()
-        blocks_and_transactions_exporters.export_items(blocks)
-        blocks_and_transactions_exporters.export_items(transactions)
-        blocks_and_transactions_exporters.close()
-
-        # # # token_transfers # # #
-
-        token_transfers_file = None
-        if is_log_filter_supported(provider_uri):
-            token_transfers_output_dir = '{output_dir}/token_transfers{partition_dir}'.format(
-                output_dir=output_dir,
-                partition_dir=partition_dir,
-            )
-            os.makedirs(os.path.dirname(
-                token_transfers_output_dir), exist_ok=True)
-
-            token_transfers_file = '{token_transfers_output_dir}/token_transfers_{file_name_suffix}.csv'.format(
-                token_transfers_output_dir=token_transfers_output_dir,
-                file_name_suffix=file_name_suffix,
-            )
-            logger.info('Exporting ERC20 transfers from blocks {block_range} to {token_transfers_file}'.format(
-                block_range=block_range,
-                token_transfers_file=token_transfers_file,
-            ))
-
-            token_transfers_file_exporter = token_transfers_item_exporter(
-                token_transfers_file)
-
-            job = ExportTokenTransfersJob(
-                start_block=batch_start_block,
-                end_block=batch_end_block,
-                batch_size=batch_size,
-                web3=ThreadLocalProxy(lambda: build_web3(
-                    get_provider_from_uri(provider_uri))),
-                item_exporter=inmemory_exporter,
-                max_workers=max_workers)
-            job.run()
-            token_transfers = inmemory_exporter.get_items('token_transfer')
-            # token_transfers = enrich_token_transfers(blocks, token_transfers)
-            token_transfers_exporters = get_multi_item_exporter(
-                [token_transfers_file_exporter, postgres_exporter])
-            token_transfers_exporters.open()
-            token_transfers_exporters.export_items(token_transfers)
-            token_transfers_exporters.close()
-
-        # # # receipts_and_logs # # #
-
-        cache_output_dir = '{output_dir}/.tmp{partition_dir}'.format(
-            output_dir=output_dir,
-            partition_dir=partition_dir,
-        )
-        os.makedirs(os.path.dirname(cache_output_dir), exist_ok=True)
+        manifest.complete_stage(
+            'blocks_and_receipts', [blocks_file, transactions_file, receipts_file, logs_file],
+            dict(blocks_and_transactions_file_exporter.item_counts, **receipts_and_logs_file_exporter.item_counts))
 
-        transaction_hashes_file = '{cache_output_dir}/transaction_hashes_{file_name_suffix}.csv'.format(
-            cache_output_dir=cache_output_dir,
-            file_name_suffix=file_name_suffix,
-        )
-        logger.info('Extracting hash column from transaction file {transactions_file}'.format(
-            transactions_file=transactions_file,
+        # The index is shared by the enrichments that join on the blocks
+        blocks_index = ItemIndex(blocks_stage_exporter.blocks.values(), 'number')
+        return blocks_index, blocks_stage_exporter.contract_block_numbers
+
+    def read_blocks_and_receipts():
+        """Returns the same as export_blocks_and_receipts from the files of the completed stage"""
+        logger.info('Reading blocks and receipts {block_range} exported by a previous run'.format(
+            block_range=block_range,
+        ))
+        with open(blocks_file) as file:
+            blocks = [{'number': int(row['number']), 'timestamp': int(row['timestamp']), 'hash': row['hash']}
+                      for row in csv.DictReader(file)]
+        contract_block_numbers = OrderedDict()
+        with open(receipts_file) as file:
+            for row in csv.DictReader(file):
+                if row['contract_address']:
+                    contract_block_numbers.setdefault(row['contract_address'], int(row['block_number']))
+        return ItemIndex(blocks, 'number'), contract_block_numbers
+
+    # # # token_transfers # # #
+
+    token_transfers_output_dir = '{output_dir}/token_transfers{partition_dir}'.format(
+        output_dir=output_dir,
+        partition_dir=partition_dir,
+    )
+    os.makedirs(os.path.dirname(
+        token_transfers_output_dir), exist_ok=True)
+
+    token_transfers_file = '{token_transfers_output_dir}/token_transfers_{file_name_suffix}.csv'.format(
+        token_transfers_output_dir=token_transfers_output_dir,
+        file_name_suffix=file_name_suffix,
+    )
+
+    def export_token_transfers():
+        logger.info('Exporting ERC20 transfers from blocks {block_range} to {token_transfers_file}'.format(
+            block_range=block_range,
+            token_transfers_file=token_transfers_file,
         ))
-        extract_csv_column_unique(
-            transactions_file, transaction_hashes_file, 'hash')
 
-        receipts_output_dir = '{output_dir}/receipts{partition_dir}'.format(
-            output_dir=output_dir,
-            partition_dir=partition_dir,
-        )
-        os.makedirs(os.path.dirname(receipts_output_dir), exist_ok=True)
+        # Token transfers are not enriched, so they are written as they are exported
+        token_transfers_file_exporter = token_transfers_item_exporter(
+            token_transfers_file)
+        token_transfers_exporters = BufferedItemExporter(get_multi_item_exporter(
+            [token_transfers_file_exporter, postgres_exporter]))
+        job = ExportTokenTransfersJob(
+            start_block=batch_start_block,
+            end_block=batch_end_block,
+            batch_size=batch_size,
+            batch_web3_provider=get_batch_web3_provider(),
+            item_exporter=token_transfers_exporters,
+            max_workers=max_workers)
+        job.run()
+        manifest.complete_stage('token_transfers', [token_transfers_file], token_transfers_file_exporter.item_counts)
 
-        logs_output_dir = '{output_dir}/logs{partition_dir}'.format(
-            output_dir=output_dir,
-            partition_dir=partition_dir,
-        )
-        os.makedirs(os.path.dirname(logs_output_dir), exist_ok=True)
+    # # # geth traces # # #
 
-        receipts_file = '{receipts_output_dir}/receipts_{file_name_suffix}.csv'.format(
-            receipts_output_dir=receipts_output_dir,
-            file_name_suffix=file_name_suffix,
-        )
-        logs_file = '{logs_output_dir}/logs_{file_name_suffix}.csv'.format(
-            logs_output_dir=logs_output_dir,
-            file_name_suffix=file_name_suffix,
-        )
-        logger.info('Exporting receipts and logs from blocks {block_range} to {receipts_file} and {logs_file}'.format(
-            block_range=block_range,
-            receipts_file=receipts_file,
-            logs_file=logs_file,
+    def export_geth_trace_contracts():
+        """Returns None if geth traces are not available"""
+        logger.info('Exporting geth traces from blocks {block_range}'.format(
+            block_range=block_range
         ))
 
-        with smart_open(transaction_hashes_file, 'r') as transaction_hashes:
-
-            receipts_and_logs_file_exporter = receipts_and_logs_item_exporter(
-                receipts_file, logs_file)
-
-            job = ExportReceiptsJob(
-                transaction_hashes_iterable=(
-                    transaction_hash.strip() for transaction_hash in transaction_hashes),
-                batch_size=batch_size,
-                batch_web3_provider=ThreadLocalProxy(
-                    lambda: get_provider_from_uri(provider_uri, batch=True)),
-                max_workers=max_workers,
-                item_exporter=inmemory_exporter,
-                export_receipts=receipts_file is not None,
-                export_logs=logs_file is not None)
-            job.run()
-            logs = inmemory_exporter.get_items('log')
-
-            logs = enrich_logs(blocks, logs)
-            receipts_and_logs_exporters = get_multi_item_exporter(
-                [receipts_and_logs_file_exporter, postgres_exporter])
-            receipts_and_logs_exporters.open()
-            receipts_and_logs_exporters.export_items(
-                inmemory_exporter.get_items('receipt'))
-            receipts_and_logs_exporters.export_items(logs)
-            receipts_and_logs_exporters.close()
-
-        # # # geth traces # # #
-
-        geth_traces_available = False
-        if not skip_geth_traces:
-            logger.info('Exporting geth traces from blocks {block_range}'.format(
-                block_range=block_range
-            ))
-
-            geth_traces_available = True
-            job = ExportGethTracesJob(
-                start_block=batch_start_block,
-                end_block=batch_end_block,
-                batch_size=batch_size,
-                batch_web3_provider=ThreadLocalProxy(
-                        lambda: get_provider_from_uri(provider_uri, batch=True)),
-                max_workers=max_workers,
-                item_exporter=inmemory_exporter
-            )
-            try:
-                job.run()
-            except HistoricalStateUnavailableError:
-                geth_traces_available = False
-            except HTTPError:
-                geth_traces_available = False
-
-        contracts_output_dir = '{output_dir}/contracts{partition_dir}'.format(
-            output_dir=output_dir,
-            partition_dir=partition_dir,
+        # Contracts are extracted from the traces of each block as soon as they are received
+        geth_contracts_exporter = InMemoryItemExporter(item_types=['contract'])
+        job = ExportGethTracesJob(
+            start_block=batch_start_block,
+            end_block=batch_end_block,
+            batch_size=batch_size,
+            batch_web3_provider=get_batch_web3_provider(),
+            max_workers=max_workers,
+            item_exporter=GethTraceContractsItemExporter(geth_contracts_exporter)
         )
-        os.makedirs(os.path.dirname(contracts_output_dir), exist_ok=True)
+        try:
+            job.run()
+        except HistoricalStateUnavailableError:
+            return None
+        except HTTPError:
+            return None
+        return geth_contracts_exporter.get_items('contract')
+
+    # # # contracts # # #
+
+    contracts_output_dir = '{output_dir}/contracts{partition_dir}'.format(
+        output_dir=output_dir,
+        partition_dir=partition_dir,
+    )
+    os.makedirs(os.path.dirname(contracts_output_dir), exist_ok=True)
+
+    contracts_file = '{contracts_output_dir}/contracts_{file_name_suffix}.csv'.format(
+        contracts_output_dir=contracts_output_dir,
+        file_name_suffix=file_name_suffix,
+    )
+
+    def export_receipt_contracts(contract_block_numbers):
+        # # # contracts (no-geth traces) # # #
+        logger.info('Exporting contracts from receipts of blocks {block_range}'.format(
+            block_range=block_range
+        ))
 
-        contracts_file = '{contracts_output_dir}/contracts_{file_name_suffix}.csv'.format(
-            contracts_output_dir=contracts_output_dir,
-            file_name_suffix=file_name_suffix,
-        )
+        inmemory_exporter = InMemoryItemExporter(item_types=['contract'])
+        job = ExportContractsJob(
+            contract_addresses_iterable=list(contract_block_numbers.keys()),
+            batch_size=batch_size,
+            batch_web3_provider=get_batch_web3_provider(),
+            item_exporter=inmemory_exporter,
+            max_workers=max_workers)
+        job.run()
+        contracts = inmemory_exporter.get_items('contract')
+        for contract in contracts:
+            contract['block_number'] = contract_block_numbers[contract['address']]
+        return contracts
+
+    def export_contracts(blocks_index, contracts):
         logger.info('Exporting contracts from blocks {block_range} to {contracts_file}'.format(
             block_range=block_range,
             contracts_file=contracts_file,
         ))
-
-        if geth_traces_available:
-            # # # contracts (geth traces) # # #
-            contracts_file_exporter = contracts_item_exporter(contracts_file)
-
-            geth_traces = inmemory_exporter.get_items('geth_trace')
-
-            job = ExtractContractsJob(
-                traces_iterable=geth_traces,
-                batch_size=batch_size,
-                item_exporter=inmemory_exporter,
-                max_workers=max_workers)
-            job.run()
-            contracts = inmemory_exporter.get_items('contract')
-            contracts = enrich_contracts(blocks, contracts)
-            contracts_exporters = get_multi_item_exporter(
-                [contracts_file_exporter, postgres_exporter])
-            contracts_exporters.open()
-            contracts_exporters.export_items(contracts)
-            contracts_exporters.close()
-
-        else:
-            # # # contracts (no-geth traces) # # #
-            contract_addresses_file = '{cache_output_dir}/contract_addresses_{file_name_suffix}.csv'.format(
-                cache_output_dir=cache_output_dir,
-                file_name_suffix=file_name_suffix,
-            )
-            logger.info('Extracting contract_address from receipt file {receipts_file}'.format(
-                receipts_file=receipts_file
-            ))
-            extract_csv_column_unique(
-                receipts_file, contract_addresses_file, 'contract_address')
-
-            with smart_open(contract_addresses_file, 'r') as contract_addresses_file:
-                contracts_file_exporter = contracts_item_exporter(contracts_file)
-
-                contract_addresses = (contract_address.strip() for contract_address in contract_addresses_file
-                                    if contract_address.strip())
-
-                job = ExportContractsJob(
-                    contract_addresses_iterable=contract_addresses,
-                    batch_size=batch_size,
-                    batch_web3_provider=ThreadLocalProxy(
-                        lambda: get_provider_from_uri(provider_uri, batch=True)),
-                    item_exporter=inmemory_exporter,
-                    max_workers=max_workers)
-                job.run()
-                contracts = inmemory_exporter.get_items('contract')
-                for contract in contracts:
-                    contract_block_number = next((transaction["block_number"]
-                                                for transaction in transactions if transaction["receipt_contract_address"] == contract["address"]))
-                    contract['block_number'] = contract_block_number
-                contracts = enrich_contracts(blocks, contracts)
-                contracts_exporters = get_multi_item_exporter(
-                    [contracts_file_exporter, postgres_exporter])
-                contracts_exporters.open()
-                contracts_exporters.export_items(contracts)
-                contracts_exporters.close()
-
-        inmemory_exporter.close()
-
-        # # # finish # # #
-        shutil.rmtree(os.path.dirname(cache_output_dir), ignore_errors=True)
-        end_time = time()
-        time_diff = round(end_time - start_time, 5)
-        logger.info('Exporting blocks {block_range} took {time_diff} seconds'.format(
+        contracts_file_exporter = contracts_item_exporter(contracts_file)
+        contracts = enrich_contracts(blocks_index, contracts)
+        contracts_exporters = get_multi_item_exporter(
+            [contracts_file_exporter, postgres_exporter])
+        contracts_exporters.open()
+        contracts_exporters.export_items(contracts)
+        contracts_exporters.close()
+        manifest.complete_stage('contracts', [contracts_file], contracts_file_exporter.item_counts)
+
+    blocks_complete = manifest.is_stage_complete('blocks_and_receipts')
+    token_transfers_complete = manifest.is_stage_complete('token_transfers')
+    contracts_complete = manifest.is_stage_complete('contracts')
+    if blocks_complete and token_transfers_complete and contracts_complete:
+        logger.info('Skipping blocks {block_range}, they were exported by a previous run'.format(
             block_range=block_range,
-            time_diff=time_diff,
         ))
+        return
+
+    with ThreadPoolExecutor(max_workers=3) as stage_executor:
+        blocks_future = None
+        if not blocks_complete:
+            blocks_future = stage_executor.submit(export_blocks_and_receipts)
+        token_transfers_future = None
+        if not token_transfers_complete:
+            token_transfers_future = stage_executor.submit(export_token_transfers)
+        geth_contracts_future = None
+        if not skip_geth_traces and not contracts_complete:
+            geth_contracts_future = stage_executor.submit(export_geth_trace_contracts)
+
+        if blocks_future is not None:
+            blocks_index, contract_block_numbers = blocks_future.result()
+        elif not contracts_complete:
+            blocks_index, contract_block_numbers = read_blocks_and_receipts()
+
+        if not contracts_complete:
+            geth_contracts = geth_contracts_future.result() if geth_contracts_future is not None else None
+            if geth_contracts is not None:
+                # # # contracts (geth traces) # # #
+                export_contracts(blocks_index, geth_contracts)
+            else:
+                export_contracts(blocks_index, export_receipt_contracts(contract_block_numbers))
+
+        if token_transfers_future is not None:
+            token_transfers_future.result()
+
+    # # # finish # # #
+    end_time = time()
+    time_diff = round(end_time - start_time, 5)
+    logger.info('Exporting blocks {block_range} took {time_diff} seconds'.format(
+        block_range=block_range,
+        time_diff=time_diff,
+    ))
@@ -21,19 +21,20 @@
 # SOFTWARE.
 
 
-import json
-
 from blockchainetl.jobs.base_job import BaseJob
+from blockchainetl.json_codec import json_dumps_compact
 from ethereumetl.domain.block import EthBlock
-from ethereumetl.executors.batch_work_executor import BatchWorkExecutor
-from ethereumetl.json_rpc_requests import generate_get_block_by_number_json_rpc, generate_get_receipt_json_rpc
+from ethereumetl.executors.async_batch_work_executor import create_batch_work_executor, is_async_provider
+from ethereumetl.json_rpc_requests import generate_get_block_by_number_json_rpc
 from ethereumetl.mappers.block_mapper import EthBlockMapper
+from ethereumetl.mappers.receipt_log_mapper import EthReceiptLogMapper
 from ethereumetl.mappers.receipt_mapper import EthReceiptMapper
 from ethereumetl.mappers.transaction_mapper import EthTransactionMapper
+from ethereumetl.service.eth_receipt_service import EthReceiptService, DEFAULT_RECEIPTS_BATCH_SIZE
 from ethereumetl.utils import rpc_response_batch_to_results, validate_range
 
 
-# Exports blocks and transactions
+# Exports blocks and transactions, and optionally the receipts and logs fetched along the way
 class ExportBlocksJob(BaseJob):
     def __init__(
             self,
@@ -44,24 +45,34 @@ class ExportBlocksJob(BaseJob):
             max_workers,
             item_exporter,
             export_blocks=True,
-            export_transactions=True):
+            export_transactions=True,
+            export_receipts=False,
+            export_logs=False,
+            receipts_batch_size=DEFAULT_RECEIPTS_BATCH_SIZE,
+            use_block_receipts=None):
         validate_range(start_block, end_block)
         self.start_block = start_block
         self.end_block = end_block
 
         self.batch_web3_provider = batch_web3_provider
 
-        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
+        self.batch_work_executor = create_batch_work_executor(batch_size, max_workers, batch_web3_provider)
         self.item_exporter = item_exporter
 
         self.export_blocks = export_blocks
         self.export_transactions = export_transactions
-        if not self.export_blocks and not self.export_transactions:
+        self.export_receipts = export_receipts
+        self.export_logs = export_logs
+        if not self.export_blocks and not self.export_transactions and not self.export_receipts \
+                and not self.export_logs:
             raise ValueError(
-                'At least one of export_blocks or export_transactions must be True')
+                'At least one of export_blocks, export_transactions, export_receipts or export_logs must be True')
 
         self.block_mapper = EthBlockMapper()
         self.receipt_mapper = EthReceiptMapper()
+        self.receipt_log_mapper = EthReceiptLogMapper()
+        self.receipt_service = EthReceiptService(
+            batch_web3_provider, receipts_batch_size=receipts_batch_size, use_block_receipts=use_block_receipts)
 
     def _start(self):
         self.item_exporter.open()
@@ -69,30 +80,50 @@ class ExportBlocksJob(BaseJob):
     def _export(self):
         self.batch_work_executor.execute(
             range(self.start_block, self.end_block + 1),
-            self._export_batch,
+            self._export_batch_async if is_async_provider(self.batch_web3_provider) else self._export_batch,
             total_items=self.end_block - self.start_block + 1
         )
 
     def _export_batch(self, block_number_batch):
         blocks_rpc = list(generate_get_block_by_number_json_rpc(
-            block_number_batch, self.export_transactions))
+            block_number_batch, self._include_transactions()))
         response = self.batch_web3_provider.make_batch_request(
-            json.dumps(blocks_rpc))
-        results = rpc_response_batch_to_results(response)
-        blocks = []
-        for result in results:
-            if 'transactions' in result:
-                # Getting receipts to inform effective gas price
-                receipts_rpc = list(generate_get_receipt_json_rpc([tx['hash'] for tx in result['transactions']]))
-                response = self.batch_web3_provider.make_batch_request(json.dumps(receipts_rpc))
-                transaction_results = rpc_response_batch_to_results(response)
-                for transaction, transaction_dict in zip(result['transactions'], transaction_results):
-                    transaction['receipt'] = transaction_dict
-            blocks.append(self.block_mapper.json_dict_to_block(result))
+            json_dumps_compact(blocks_rpc))
+        results = list(rpc_response_batch_to_results(response))
+        receipts = []
+        if self._include_transactions():
+            # Getting receipts to inform effective gas price.
+            # Receipts for the whole block batch are fetched together rather than one batch request per block
+            receipts = self.receipt_service.get_transaction_receipts(results)
+        self._export_results(results, receipts)
+
+    async def _export_batch_async(self, block_number_batch):
+        blocks_rpc = list(generate_get_block_by_number_json_rpc(
+            block_number_batch, self._include_transactions()))
+        response = await self.batch_web3_provider.make_batch_request_async(
+            json_dumps_compact(blocks_rpc))
+        results = list(rpc_response_batch_to_results(response))
+        receipts = []
+        if self._include_transactions():
+            receipts = await self.receipt_service.get_transaction_receipts_async(results)
+        self._export_results(results, receipts)
+
+    def _include_transactions(self):
+        return self.export_transactions or self.export_receipts or self.export_logs
 
+    def _export_results(self, block_results, receipts):
+        transactions = [tx for result in block_results for tx in result.get('transactions', []) if isinstance(tx, dict)]
+        for transaction, receipt in zip(transactions, receipts):
+            transaction['receipt'] = receipt
+
+        blocks = [self.block_mapper.json_dict_to_block(result) for result in block_results]
         for block in blocks:
             self._export_block(block)
 
+        if self.export_receipts or self.export_logs:
+            for receipt in receipts:
+                self._export_receipt(self.receipt_mapper.json_dict_to_receipt(receipt))
+
     def _export_block(self, block: EthBlock):
         if self.export_blocks:
             self.item_exporter.export_item(
@@ -101,6 +132,13 @@ class ExportBlocksJob(BaseJob):
             for transaction in block.transactions:
                 self.item_exporter.export_item(EthTransactionMapper.transaction_to_dict(transaction))
 
+    def _export_receipt(self, receipt):
+        if self.export_receipts:
+            self.item_exporter.export_item(self.receipt_mapper.receipt_to_dict(receipt))
+        if self.export_logs:
+            for log in receipt.logs:
+                self.item_exporter.export_item(self.receipt_log_mapper.receipt_log_to_dict(log))
+
     def _end(self):
         self.batch_work_executor.shutdown()
         self.item_exporter.close()
@@ -21,10 +21,9 @@
 # SOFTWARE.
 
 
-import json
-
 from ethereumetl.executors.batch_work_executor import BatchWorkExecutor
 from blockchainetl.jobs.base_job import BaseJob
+from blockchainetl.json_codec import json_dumps_compact
 from ethereumetl.json_rpc_requests import generate_get_code_json_rpc
 from ethereumetl.mappers.contract_mapper import EthContractMapper
 
@@ -58,7 +57,7 @@ class ExportContractsJob(BaseJob):
 
     def _export_contracts(self, contract_addresses):
         contracts_code_rpc = list(generate_get_code_json_rpc(contract_addresses))
-        response_batch = self.batch_web3_provider.make_batch_request(json.dumps(contracts_code_rpc))
+        response_batch = self.batch_web3_provider.make_batch_request(json_dumps_compact(contracts_code_rpc))
 
         contracts = []
         for response in response_batch:
@@ -79,8 +78,8 @@ class ExportContractsJob(BaseJob):
         function_sighashes = self.contract_service.get_function_sighashes(bytecode)
 
         contract.function_sighashes = function_sighashes
-        contract.is_erc20 = self.contract_service.is_erc20_contract(function_sighashes)
-        contract.is_erc721 = self.contract_service.is_erc721_contract(function_sighashes)
+        for flag, value in self.contract_service.classify_contract(function_sighashes, bytecode).items():
+            setattr(contract, flag, value)
 
         return contract
 
@@ -20,12 +20,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import json
+import threading
 
-from ethereumetl.executors.batch_work_executor import BatchWorkExecutor
+from ethereumetl.executors.async_batch_work_executor import create_batch_work_executor, is_async_provider
 from ethereumetl.json_rpc_requests import generate_trace_block_by_number_json_rpc
 from blockchainetl.jobs.base_job import BaseJob
+from blockchainetl.json_codec import json_dumps_compact
 from ethereumetl.mappers.geth_trace_mapper import EthGethTraceMapper
+from ethereumetl.providers.rpc import make_batch_request_iter
 from ethereumetl.utils import validate_range, rpc_response_to_result
 
 
@@ -45,10 +47,13 @@ class ExportGethTracesJob(BaseJob):
 
         self.batch_web3_provider = batch_web3_provider
 
-        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
+        self.batch_work_executor = create_batch_work_executor(batch_size, max_workers, batch_web3_provider)
         self.item_exporter = item_exporter
 
         self.geth_trace_mapper = EthGethTraceMapper()
+        # A batch that fails after some of its blocks were exported is retried, the exported blocks are skipped
+        self._exported_block_numbers = set()
+        self._exported_block_numbers_lock = threading.Lock()
 
     def _start(self):
         self.item_exporter.open()
@@ -56,16 +61,27 @@ class ExportGethTracesJob(BaseJob):
     def _export(self):
         self.batch_work_executor.execute(
             range(self.start_block, self.end_block + 1),
-            self._export_batch,
+            self._export_batch_async if is_async_provider(self.batch_web3_provider) else self._export_batch,
             total_items=self.end_block - self.start_block + 1
         )
 
     def _export_batch(self, block_number_batch):
         trace_block_rpc = list(generate_trace_block_by_number_json_rpc(block_number_batch))
-        response = self.batch_web3_provider.make_batch_request(json.dumps(trace_block_rpc))
+        # Responses for big blocks can be huge, the traces of each block are exported as soon as they are received
+        response = make_batch_request_iter(self.batch_web3_provider, json_dumps_compact(trace_block_rpc))
+        self._export_response(response)
 
+    async def _export_batch_async(self, block_number_batch):
+        trace_block_rpc = list(generate_trace_block_by_number_json_rpc(block_number_batch))
+        response = await self.batch_web3_provider.make_batch_request_async(json_dumps_compact(trace_block_rpc))
+        self._export_response(response)
+
+    def _export_response(self, response):
         for response_item in response:
             block_number = response_item.get('id')
+            with self._exported_block_numbers_lock:
+                if block_number in self._exported_block_numbers:
+                    continue
             result = rpc_response_to_result(response_item)
 
             geth_trace = self.geth_trace_mapper.json_dict_to_geth_trace({
@@ -74,6 +90,8 @@ class ExportGethTracesJob(BaseJob):
             })
 
             self.item_exporter.export_item(self.geth_trace_mapper.geth_trace_to_dict(geth_trace))
+            with self._exported_block_numbers_lock:
+                self._exported_block_numbers.add(block_number)
 
     def _end(self):
         self.batch_work_executor.shutdown()
@@ -21,17 +21,15 @@
 # SOFTWARE.
 
 
-import json
-
 from blockchainetl.jobs.base_job import BaseJob
-from ethereumetl.executors.batch_work_executor import BatchWorkExecutor
-from ethereumetl.json_rpc_requests import generate_get_receipt_json_rpc
+from ethereumetl.executors.async_batch_work_executor import create_batch_work_executor, is_async_provider
 from ethereumetl.mappers.receipt_log_mapper import EthReceiptLogMapper
 from ethereumetl.mappers.receipt_mapper import EthReceiptMapper
-from ethereumetl.utils import rpc_response_batch_to_results
+from ethereumetl.service.eth_receipt_service import EthReceiptService
+from ethereumetl.utils import validate_range
 
 
-# Exports receipts and logs
+# Exports receipts and logs, either for the given transaction hashes or for all transactions in a block range
 class ExportReceiptsJob(BaseJob):
     def __init__(
             self,
@@ -41,11 +39,20 @@ class ExportReceiptsJob(BaseJob):
             max_workers,
             item_exporter,
             export_receipts=True,
-            export_logs=True):
+            export_logs=True,
+            start_block=None,
+            end_block=None,
+            use_block_receipts=None):
         self.batch_web3_provider = batch_web3_provider
         self.transaction_hashes_iterable = transaction_hashes_iterable
+        self.start_block = start_block
+        self.end_block = end_block
+        if self.transaction_hashes_iterable is None:
+            if self.start_block is None or self.end_block is None:
+                raise ValueError('Either transaction_hashes_iterable or start_block and end_block must be provided')
+            validate_range(self.start_block, self.end_block)
 
-        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
+        self.batch_work_executor = create_batch_work_executor(batch_size, max_workers, batch_web3_provider)
         self.item_exporter = item_exporter
 
         self.export_receipts = export_receipts
@@ -55,17 +62,39 @@ class ExportReceiptsJob(BaseJob):
 
         self.receipt_mapper = EthReceiptMapper()
         self.receipt_log_mapper = EthReceiptLogMapper()
+        self.receipt_service = EthReceiptService(batch_web3_provider, use_block_receipts=use_block_receipts)
 
     def _start(self):
         self.item_exporter.open()
 
     def _export(self):
-        self.batch_work_executor.execute(self.transaction_hashes_iterable, self._export_receipts)
+        use_async = is_async_provider(self.batch_web3_provider)
+        if self.transaction_hashes_iterable is not None:
+            self.batch_work_executor.execute(
+                self.transaction_hashes_iterable,
+                self._export_receipts_async if use_async else self._export_receipts)
+        else:
+            self.batch_work_executor.execute(
+                range(self.start_block, self.end_block + 1),
+                self._export_block_receipts_async if use_async else self._export_block_receipts,
+                total_items=self.end_block - self.start_block + 1
+            )
 
     def _export_receipts(self, transaction_hashes):
-        receipts_rpc = list(generate_get_receipt_json_rpc(transaction_hashes))
-        response = self.batch_web3_provider.make_batch_request(json.dumps(receipts_rpc))
-        results = rpc_response_batch_to_results(response)
+        self._export_results(self.receipt_service.get_receipts(transaction_hashes))
+
+    async def _export_receipts_async(self, transaction_hashes):
+        self._export_results(await self.receipt_service.get_receipts_async(transaction_hashes))
+
+    def _export_block_receipts(self, block_numbers):
+        for results in self.receipt_service.get_block_receipts(block_numbers):
+            self._export_results(results)
+
+    async def _export_block_receipts_async(self, block_numbers):
+        for results in await self.receipt_service.get_block_receipts_async(block_numbers):
+            self._export_results(results)
+
+    def _export_results(self, results):
         receipts = [self.receipt_mapper.json_dict_to_receipt(result) for result in results]
         for receipt in receipts:
             self._export_receipt(receipt)
@@ -21,11 +21,14 @@
 # SOFTWARE.
 
 from blockchainetl.jobs.base_job import BaseJob
+from blockchainetl.json_codec import json_dumps_compact
 from ethereumetl.executors.batch_work_executor import BatchWorkExecutor
+from ethereumetl.json_rpc_requests import generate_get_block_by_number_json_rpc
 from ethereumetl.mappers.token_transfer_mapper import EthTokenTransferMapper
 from ethereumetl.mappers.receipt_log_mapper import EthReceiptLogMapper
+from ethereumetl.service.eth_log_service import EthLogService
 from ethereumetl.service.token_transfer_extractor import EthTokenTransferExtractor, TRANSFER_EVENT_TOPIC
-from ethereumetl.utils import validate_range
+from ethereumetl.utils import hex_to_dec, rpc_response_batch_to_results, validate_range
 
 
 class ExportTokenTransfersJob(BaseJob):
@@ -34,7 +37,7 @@ class ExportTokenTransfersJob(BaseJob):
             start_block,
             end_block,
             batch_size,
-            web3,
+            batch_web3_provider,
             item_exporter,
             max_workers,
             tokens=None):
@@ -42,12 +45,13 @@ class ExportTokenTransfersJob(BaseJob):
         self.start_block = start_block
         self.end_block = end_block
 
-        self.web3 = web3
+        self.batch_web3_provider = batch_web3_provider
         self.tokens = tokens
         self.item_exporter = item_exporter
 
         self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
 
+        self.eth_log_service = EthLogService(batch_web3_provider)
         self.receipt_log_mapper = EthReceiptLogMapper()
         self.token_transfer_mapper = EthTokenTransferMapper()
         self.token_transfer_extractor = EthTokenTransferExtractor()
@@ -64,27 +68,28 @@ class ExportTokenTransfersJob(BaseJob):
 
     def _export_batch(self, block_number_batch):
         assert len(block_number_batch) > 0
-        # https://github.com/ethereum/wiki/wiki/JSON-RPC#eth_getfilterlogs
-        filter_params = {
-            'fromBlock': block_number_batch[0],
-            'toBlock': block_number_batch[-1],
-            'topics': [TRANSFER_EVENT_TOPIC]
-        }
+        # https://ethereum.org/en/developers/docs/apis/json-rpc/#eth_getlogs
+        logs = self.eth_log_service.get_logs(
+            block_number_batch[0], block_number_batch[-1],
+            topics=[TRANSFER_EVENT_TOPIC],
+            addresses=list(self.tokens) if self.tokens else None)
+        if not logs:
+            return
 
-        if self.tokens is not None and len(self.tokens) > 0:
-            filter_params['address'] = self.tokens
-
-        event_filter = self.web3.eth.filter(filter_params)
-        events = event_filter.get_all_entries()
-        blocks = {block_number: self.web3.eth.getBlock(block_number) for block_number in block_number_batch}
-        for event in events:
-            log = self.receipt_log_mapper.web3_dict_to_receipt_log(event)
-            log.block_timestamp = blocks[log.block_number]['timestamp']
+        block_timestamps = self._get_block_timestamps(sorted(set(hex_to_dec(log['blockNumber']) for log in logs)))
+        for log_dict in logs:
+            log = self.receipt_log_mapper.json_dict_to_receipt_log(log_dict)
+            log.block_timestamp = block_timestamps[log.block_number]
             token_transfer = self.token_transfer_extractor.extract_transfer_from_log(log)
             if token_transfer is not None:
                 self.item_exporter.export_item(self.token_transfer_mapper.token_transfer_to_dict(token_transfer))
 
-        self.web3.eth.uninstallFilter(event_filter.filter_id)
+    def _get_block_timestamps(self, block_numbers):
+        # Block headers of all blocks with logs in a single batch request
+        blocks_rpc = list(generate_get_block_by_number_json_rpc(block_numbers, False))
+        response = self.batch_web3_provider.make_batch_request(json_dumps_compact(blocks_rpc))
+        return {hex_to_dec(block['number']): hex_to_dec(block['timestamp'])
+                for block in rpc_response_batch_to_results(response)}
 
     def _end(self):
         self.batch_work_executor.shutdown()
@@ -27,14 +27,20 @@ from ethereumetl.mappers.token_mapper import EthTokenMapper
 from ethereumetl.service.eth_token_service import EthTokenService
 
 
+# The number of tokens resolved at a time, each token takes 7 calls
+DEFAULT_TOKENS_BATCH_SIZE = 100
+
+
 class ExportTokensJob(BaseJob):
-    def __init__(self, web3, item_exporter, token_addresses_iterable, max_workers):
+    def __init__(self, batch_web3_provider, item_exporter, token_addresses_iterable, max_workers,
+                 batch_size=DEFAULT_TOKENS_BATCH_SIZE, token_metadata_cache=None):
         self.item_exporter = item_exporter
         self.token_addresses_iterable = token_addresses_iterable
-        self.batch_work_executor = BatchWorkExecutor(1, max_workers)
+        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
 
-        self.token_service = EthTokenService(web3, clean_user_provided_content)
+        self.token_service = EthTokenService(batch_web3_provider, clean_user_provided_content)
         self.token_mapper = EthTokenMapper()
+        self.token_metadata_cache = token_metadata_cache
 
     def _start(self):
         self.item_exporter.open()
@@ -43,17 +49,38 @@ class ExportTokensJob(BaseJob):
         self.batch_work_executor.execute(self.token_addresses_iterable, self._export_tokens)
 
     def _export_tokens(self, token_addresses):
+        token_addresses_and_block_numbers = []
         for token_address in token_addresses:
             if type(token_address) is dict:
-                self._export_token(token_address["token_address"], int(token_address["block_number"]))
+                token_addresses_and_block_numbers.append(
+                    (token_address["token_address"], int(token_address["block_number"])))
             else:
-                self._export_token(token_address)
+                token_addresses_and_block_numbers.append((token_address, None))
+        self._export_tokens_with_block_numbers(token_addresses_and_block_numbers)
+
+    def _export_tokens_with_block_numbers(self, token_addresses_and_block_numbers):
+        tokens = self._get_tokens(token_addresses_and_block_numbers)
+        for token, (token_address, block_number) in zip(tokens, token_addresses_and_block_numbers):
+            token.address = token_address
+            token.block_number = block_number
+            token_dict = self.token_mapper.token_to_dict(token)
+            self.item_exporter.export_item(token_dict)
+
+    def _get_tokens(self, token_addresses_and_block_numbers):
+        if self.token_metadata_cache is None:
+            return self.token_service.get_tokens(
+                [token_address for token_address, _ in token_addresses_and_block_numbers])
 
-    def _export_token(self, token_address, block_number=None):
-        token = self.token_service.get_token(token_address)
-        token.block_number = block_number
-        token_dict = self.token_mapper.token_to_dict(token)
-        self.item_exporter.export_item(token_dict)
+        tokens = self.token_metadata_cache.get_tokens(token_addresses_and_block_numbers)
+        missing_indexes = [index for index, token in enumerate(tokens) if token is None]
+        if len(missing_indexes) > 0:
+            missing_keys = [token_addresses_and_block_numbers[index] for index in missing_indexes]
+            resolved_tokens = self.token_service.get_tokens([token_address for token_address, _ in missing_keys])
+            for index, token in zip(missing_indexes, resolved_tokens):
+                tokens[index] = token
+            # Tokens without metadata are cached too, get_tokens raises unless every call succeeded or reverted
+            self.token_metadata_cache.put_tokens(list(zip(missing_keys, resolved_tokens)))
+        return tokens
 
     def _end(self):
         self.batch_work_executor.shutdown()
@@ -22,9 +22,11 @@
 
 from ethereumetl.executors.batch_work_executor import BatchWorkExecutor
 from blockchainetl.jobs.base_job import BaseJob
+from ethereumetl.enumeration.trace_mode import TraceMode
 from ethereumetl.mainnet_daofork_state_changes import DAOFORK_BLOCK_NUMBER
 from ethereumetl.mappers.trace_mapper import EthTraceMapper
 from ethereumetl.service.eth_special_trace_service import EthSpecialTraceService
+from ethereumetl.service.eth_trace_service import EthTraceService
 
 from ethereumetl.service.trace_id_calculator import calculate_trace_ids
 from ethereumetl.service.trace_status_calculator import calculate_trace_statuses
@@ -37,19 +39,22 @@ class ExportTracesJob(BaseJob):
             start_block,
             end_block,
             batch_size,
-            web3,
+            batch_web3_provider,
             item_exporter,
             max_workers,
             include_genesis_traces=False,
-            include_daofork_traces=False):
+            include_daofork_traces=False,
+            trace_mode=None):
         validate_range(start_block, end_block)
         self.start_block = start_block
         self.end_block = end_block
+        self.batch_size = batch_size
+        self.max_workers = max_workers
 
-        self.web3 = web3
+        self.trace_service = EthTraceService(batch_web3_provider, trace_mode=trace_mode)
 
-        # TODO: use batch_size when this issue is fixed https://github.com/paritytech/parity-ethereum/issues/9822
-        self.batch_work_executor = BatchWorkExecutor(1, max_workers)
+        # Created once the trace mode is known
+        self.batch_work_executor = None
         self.item_exporter = item_exporter
 
         self.trace_mapper = EthTraceMapper()
@@ -62,6 +67,11 @@ class ExportTracesJob(BaseJob):
         self.item_exporter.open()
 
     def _export(self):
+        trace_mode = self.trace_service.get_trace_mode(probe_block_number=self.start_block)
+        # Nodes that can't handle batched trace requests get one block at a time, as with
+        # https://github.com/paritytech/parity-ethereum/issues/9822
+        batch_size = 1 if trace_mode == TraceMode.SINGLE else self.batch_size
+        self.batch_work_executor = BatchWorkExecutor(batch_size, self.max_workers)
         self.batch_work_executor.execute(
             range(self.start_block, self.end_block + 1),
             self._export_batch,
@@ -69,28 +79,21 @@ class ExportTracesJob(BaseJob):
         )
 
     def _export_batch(self, block_number_batch):
-        # TODO: Change to len(block_number_batch) > 0 when this issue is fixed
-        # https://github.com/paritytech/parity-ethereum/issues/9822
-        assert len(block_number_batch) == 1
-        block_number = block_number_batch[0]
+        block_traces = self.trace_service.get_block_traces(block_number_batch)
+        for block_number, json_traces in zip(block_number_batch, block_traces):
+            self._export_block_traces(block_number, json_traces)
 
+    def _export_block_traces(self, block_number, json_traces):
         all_traces = []
 
-        if self.include_genesis_traces and 0 in block_number_batch:
+        if self.include_genesis_traces and block_number == 0:
             genesis_traces = self.special_trace_service.get_genesis_traces()
             all_traces.extend(genesis_traces)
 
-        if self.include_daofork_traces and DAOFORK_BLOCK_NUMBER in block_number_batch:
+        if self.include_daofork_traces and block_number == DAOFORK_BLOCK_NUMBER:
             daofork_traces = self.special_trace_service.get_daofork_traces()
             all_traces.extend(daofork_traces)
 
-        # TODO: Change to traceFilter when this issue is fixed
-        # https://github.com/paritytech/parity-ethereum/issues/9822
-        json_traces = self.web3.parity.traceBlock(block_number)
-
-        if json_traces is None:
-            raise ValueError('Response from the node is None. Is the node fully synced? Is the node started with tracing enabled? Is trace_block API enabled?')
-
         traces = [self.trace_mapper.json_dict_to_trace(json_trace) for json_trace in json_traces]
         all_traces.extend(traces)
 
@@ -102,7 +105,8 @@ class ExportTracesJob(BaseJob):
             self.item_exporter.export_item(self.trace_mapper.trace_to_dict(trace))
 
     def _end(self):
-        self.batch_work_executor.shutdown()
+        if self.batch_work_executor is not None:
+            self.batch_work_executor.shutdown()
         self.item_exporter.close()
 
 
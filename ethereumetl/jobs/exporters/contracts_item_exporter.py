@@ -22,6 +22,7 @@
 
 
 from blockchainetl.jobs.exporters.composite_item_exporter import CompositeItemExporter
+from ethereumetl.service.contract_standards import get_contract_standard_flags
 
 FIELDS_TO_EXPORT = [
     'address',
@@ -39,6 +40,11 @@ def contracts_item_exporter(contracts_output):
             'contract': contracts_output
         },
         field_mapping={
-            'contract': FIELDS_TO_EXPORT
+            'contract': get_fields_to_export()
         }
     )
+
+
+def get_fields_to_export():
+    # Flags of the contract standards other than ERC20 and ERC721 are added after the original columns
+    return FIELDS_TO_EXPORT + [flag for flag in get_contract_standard_flags() if flag not in FIELDS_TO_EXPORT]
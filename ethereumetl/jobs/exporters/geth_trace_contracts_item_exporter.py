@@ -0,0 +1,44 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from ethereumetl.mappers.contract_mapper import EthContractMapper
+from ethereumetl.service.geth_trace_contract_extractor import EthGethTraceContractExtractor
+
+
+# Extracts contracts from geth traces as they are exported and passes them to the item exporter,
+# so that the geth traces don't have to be kept in memory until all of them are exported
+class GethTraceContractsItemExporter(object):
+    def __init__(self, item_exporter):
+        self.item_exporter = item_exporter
+        self.contract_extractor = EthGethTraceContractExtractor()
+        self.contract_mapper = EthContractMapper()
+
+    def open(self):
+        self.item_exporter.open()
+
+    def export_item(self, item):
+        for contract in self.contract_extractor.extract_contracts(item):
+            self.item_exporter.export_item(self.contract_mapper.contract_to_dict(contract))
+
+    def close(self):
+        self.item_exporter.close()
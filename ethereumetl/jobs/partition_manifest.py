@@ -0,0 +1,80 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger('PartitionManifest')
+
+
+# Records the stages of an export_all partition that are completed, with the sizes of the files they wrote and
+# the number of rows of each item type, so that a rerun skips them. The manifest is a JSON file that is replaced
+# atomically after each completed stage, so it's never partially written even if the process is killed.
+class PartitionManifest:
+    def __init__(self, path, output_dir):
+        self.path = path
+        self.output_dir = output_dir
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                self.stages = json.load(file).get('stages', {})
+        except FileNotFoundError:
+            self.stages = {}
+        return self
+
+    def is_stage_complete(self, stage):
+        """A stage is not complete if any of its files is missing or has a different size than when it was written"""
+        stage_info = self.stages.get(stage)
+        if stage_info is None:
+            return False
+        for file, size in stage_info['files'].items():
+            path = os.path.join(self.output_dir, file)
+            if not os.path.isfile(path) or os.path.getsize(path) != size:
+                logger.info('{} of stage {} was changed after the stage was completed'.format(path, stage))
+                return False
+        return True
+
+    def complete_stage(self, stage, files, row_counts):
+        with self._lock:
+            self.stages[stage] = {
+                'files': {os.path.relpath(file, self.output_dir): os.path.getsize(file) for file in files},
+                'row_counts': row_counts,
+                'completed_at': int(time.time()),
+            }
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # The temporary file is synced to disk before it replaces the manifest
+        tmp_path = '{}.{}.tmp'.format(self.path, uuid.uuid4().hex)
+        with open(tmp_path, 'w') as file:
+            json.dump({'stages': self.stages}, file, indent=2, sort_keys=True)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
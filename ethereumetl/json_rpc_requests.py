@@ -40,6 +40,23 @@ def generate_trace_block_by_number_json_rpc(block_numbers):
         )
 
 
+def generate_trace_block_json_rpc(block_numbers):
+    for idx, block_number in enumerate(block_numbers):
+        yield generate_json_rpc(
+            method='trace_block',
+            params=[hex(block_number)],
+            request_id=idx
+        )
+
+
+def generate_trace_filter_json_rpc(from_block, to_block, request_id=1):
+    return generate_json_rpc(
+        method='trace_filter',
+        params=[{'fromBlock': hex(from_block), 'toBlock': hex(to_block)}],
+        request_id=request_id
+    )
+
+
 def generate_get_receipt_json_rpc(transaction_hashes):
     for idx, transaction_hash in enumerate(transaction_hashes):
         yield generate_json_rpc(
@@ -49,6 +66,15 @@ def generate_get_receipt_json_rpc(transaction_hashes):
         )
 
 
+def generate_get_block_receipts_json_rpc(block_numbers):
+    for idx, block_number in enumerate(block_numbers):
+        yield generate_json_rpc(
+            method='eth_getBlockReceipts',
+            params=[hex(block_number)],
+            request_id=idx
+        )
+
+
 def generate_get_code_json_rpc(contract_addresses, block='latest'):
     for idx, contract_address in enumerate(contract_addresses):
         yield generate_json_rpc(
@@ -58,6 +84,31 @@ def generate_get_code_json_rpc(contract_addresses, block='latest'):
         )
 
 
+def generate_eth_call_json_rpc(calls, block='latest'):
+    for idx, (to_address, data) in enumerate(calls):
+        yield generate_json_rpc(
+            method='eth_call',
+            params=[{'to': to_address, 'data': data}, hex(block) if isinstance(block, int) else block],
+            request_id=idx
+        )
+
+
+def generate_get_logs_json_rpc(from_block, to_block, topics=None, addresses=None, request_id=1):
+    filter_params = {
+        'fromBlock': hex(from_block),
+        'toBlock': hex(to_block),
+    }
+    if topics:
+        filter_params['topics'] = topics
+    if addresses:
+        filter_params['address'] = addresses
+    return generate_json_rpc(
+        method='eth_getLogs',
+        params=[filter_params],
+        request_id=request_id
+    )
+
+
 def generate_json_rpc(method, params, request_id=1):
     return {
         'jsonrpc': '2.0',
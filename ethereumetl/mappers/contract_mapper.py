@@ -22,6 +22,7 @@
 
 
 from ethereumetl.domain.contract import EthContract
+from ethereumetl.service.contract_standards import get_contract_standard_flags
 
 
 class EthContractMapper(object):
@@ -34,12 +35,14 @@ class EthContractMapper(object):
         return contract
 
     def contract_to_dict(self, contract):
-        return {
+        contract_dict = {
             'type': 'contract',
             'address': contract.address,
             'bytecode': contract.bytecode,
             'function_sighashes': contract.function_sighashes,
-            'is_erc20': contract.is_erc20,
-            'is_erc721': contract.is_erc721,
-            'block_number': contract.block_number
         }
+        # One flag for each registered contract standard
+        for flag in get_contract_standard_flags():
+            contract_dict[flag] = getattr(contract, flag, False)
+        contract_dict['block_number'] = contract.block_number
+        return contract_dict
@@ -23,6 +23,7 @@
 
 from ethereumetl.domain.trace import EthTrace
 from ethereumetl.mainnet_daofork_state_changes import DAOFORK_BLOCK_NUMBER
+from ethereumetl.service.geth_call_tree_flattener import flatten_geth_call_tree
 from ethereumetl.utils import hex_to_dec, to_normalized_address
 
 
@@ -86,11 +87,8 @@ class EthTraceMapper(object):
         traces = []
 
         for tx_index, tx_trace in enumerate(transaction_traces):
-            traces.extend(self._iterate_transaction_trace(
-                block_number,
-                tx_index,
-                tx_trace,
-            ))
+            for call, trace_address, status in flatten_geth_call_tree(tx_trace):
+                traces.append(self._geth_call_to_trace(block_number, tx_index, call, trace_address, status))
 
         return traces
 
@@ -124,26 +122,26 @@ class EthTraceMapper(object):
 
         return trace
 
-    def _iterate_transaction_trace(self, block_number, tx_index, tx_trace, trace_address=[]):
+    def _geth_call_to_trace(self, block_number, tx_index, call, trace_address, status):
         trace = EthTrace()
 
         trace.block_number = block_number
         trace.transaction_index = tx_index
 
-        trace.from_address = to_normalized_address(tx_trace.get('from'))
-        trace.to_address = to_normalized_address(tx_trace.get('to'))
+        trace.from_address = to_normalized_address(call.get('from'))
+        trace.to_address = to_normalized_address(call.get('to'))
 
-        trace.input = tx_trace.get('input')
-        trace.output = tx_trace.get('output')
+        trace.input = call.get('input')
+        trace.output = call.get('output')
 
-        trace.value = hex_to_dec(tx_trace.get('value'))
-        trace.gas = hex_to_dec(tx_trace.get('gas'))
-        trace.gas_used = hex_to_dec(tx_trace.get('gasUsed'))
+        trace.value = hex_to_dec(call.get('value'))
+        trace.gas = hex_to_dec(call.get('gas'))
+        trace.gas_used = hex_to_dec(call.get('gasUsed'))
 
-        trace.error = tx_trace.get('error')
+        trace.error = call.get('error')
 
         # lowercase for compatibility with parity traces
-        trace.trace_type = tx_trace.get('type').lower()
+        trace.trace_type = call.get('type').lower()
 
         if trace.trace_type == 'selfdestruct':
             # rename to suicide for compatibility with parity traces
@@ -152,22 +150,11 @@ class EthTraceMapper(object):
             trace.call_type = trace.trace_type
             trace.trace_type = 'call'
 
-        result = [trace]
-
-        calls = tx_trace.get('calls', [])
-
-        trace.subtraces = len(calls)
+        trace.subtraces = len(call.get('calls') or ())
         trace.trace_address = trace_address
+        trace.status = status
 
-        for call_index, call_trace in enumerate(calls):
-            result.extend(self._iterate_transaction_trace(
-                block_number,
-                tx_index,
-                call_trace,
-                trace_address + [call_index]
-            ))
-
-        return result
+        return trace
 
     def trace_to_dict(self, trace):
         return {
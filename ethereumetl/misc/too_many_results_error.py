@@ -0,0 +1,2 @@
+class TooManyResultsError(ValueError):
+    pass
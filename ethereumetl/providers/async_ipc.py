@@ -0,0 +1,76 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import asyncio
+
+from ethereumetl.providers.ipc import JsonRpcResponseBuffer
+
+DEFAULT_MAX_CONNECTIONS = 10
+RECV_BUFFER_SIZE = 65536
+
+
+# Asyncio counterpart of BatchIPCProvider. Keeps a pool of up to max_connections IPC connections,
+# each carrying one batch request at a time.
+class AsyncBatchIPCProvider:
+    def __init__(self, ipc_path, timeout=10, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.ipc_path = ipc_path
+        self.timeout = timeout
+        self._max_connections = max_connections
+        self._idle_connections = []
+        self._connection_slots = None
+
+    async def make_batch_request_async(self, text):
+        request = text.encode('utf-8')
+        # The semaphore has to be created on the event loop it's used on
+        if self._connection_slots is None:
+            self._connection_slots = asyncio.Semaphore(self._max_connections)
+
+        async with self._connection_slots:
+            if self._idle_connections:
+                reader, writer = self._idle_connections.pop()
+            else:
+                reader, writer = await asyncio.open_unix_connection(self.ipc_path)
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await asyncio.wait_for(read_json_rpc_response(reader), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            self._idle_connections.append((reader, writer))
+            return response
+
+    async def close(self):
+        while self._idle_connections:
+            _, writer = self._idle_connections.pop()
+            writer.close()
+
+
+async def read_json_rpc_response(reader):
+    response_buffer = JsonRpcResponseBuffer(RECV_BUFFER_SIZE)
+    while not response_buffer.is_complete():
+        chunk = await reader.read(RECV_BUFFER_SIZE)
+        if not chunk:
+            raise ConnectionError('IPC connection closed before a complete response was received')
+        response_buffer.append(chunk)
+    return response_buffer.decode()
@@ -0,0 +1,67 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+
+from blockchainetl.json_codec import json_loads_rpc_response
+
+DEFAULT_MAX_CONNECTIONS = 10
+
+
+# Asyncio counterpart of BatchHTTPProvider. Batch requests share a pool of up to max_connections keep-alive
+# connections, so many requests can be in flight without a thread per request.
+# aiohttp is imported where it's used, this module is imported on the sync code paths too.
+class AsyncBatchHTTPProvider:
+    def __init__(self, endpoint_uri, request_kwargs=None, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.endpoint_uri = endpoint_uri
+        self._request_kwargs = request_kwargs or {}
+        self._max_connections = max_connections
+        self._session = None
+        self.logger = logging.getLogger('AsyncBatchHTTPProvider')
+
+    async def make_batch_request_async(self, text):
+        import aiohttp
+        self.logger.debug("Making request HTTP. URI: %s, Request: %s", self.endpoint_uri, text)
+        timeout = self._request_kwargs.get('timeout')
+        async with self._get_session().post(
+                self.endpoint_uri,
+                data=text.encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                timeout=aiohttp.ClientTimeout(total=timeout)) as raw_response:
+            raw_response.raise_for_status()
+            response = json_loads_rpc_response(await raw_response.read())
+        self.logger.debug("Getting response HTTP. URI: %s, Request: %s, Response: %s",
+                          self.endpoint_uri, text, response)
+        return response
+
+    # The session has to be created on the event loop it's used on
+    def _get_session(self):
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self._max_connections))
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -25,13 +25,28 @@ from urllib.parse import urlparse
 
 from web3 import IPCProvider, HTTPProvider
 
+from ethereumetl.providers.async_ipc import AsyncBatchIPCProvider
+from ethereumetl.providers.async_rpc import AsyncBatchHTTPProvider, DEFAULT_MAX_CONNECTIONS
 from ethereumetl.providers.ipc import BatchIPCProvider
+from ethereumetl.providers.multi import MultiEndpointProvider, split_provider_uris
 from ethereumetl.providers.rpc import BatchHTTPProvider
+from ethereumetl.providers.rpc_cache import CachingProvider
 
 DEFAULT_TIMEOUT = 60
 
 
-def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False):
+def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False, hedge_percentile=None, rpc_cache_dir=None):
+    """A comma separated list of URIs returns a MultiEndpointProvider that routes requests to the healthiest
+    endpoints and fails over between them. With rpc_cache_dir results for finalized blocks are cached on disk"""
+    if rpc_cache_dir is not None:
+        provider = get_provider_from_uri(uri_string, timeout=timeout, batch=batch, hedge_percentile=hedge_percentile)
+        return CachingProvider(provider, rpc_cache_dir)
+
+    uris = split_provider_uris(uri_string)
+    if len(uris) > 1:
+        providers = [get_provider_from_uri(uri, timeout=timeout, batch=batch) for uri in uris]
+        return MultiEndpointProvider(uris, providers, hedge_percentile=hedge_percentile)
+
     uri = urlparse(uri_string)
     if uri.scheme == 'file':
         if batch:
@@ -47,3 +62,16 @@ def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False):
     else:
         raise ValueError('Unknown uri scheme {}'.format(uri_string))
 
+
+def get_async_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS):
+    """Returns a batch provider with make_batch_request_async, for use with AsyncBatchWorkExecutor"""
+    if len(split_provider_uris(uri_string)) > 1:
+        raise ValueError('Multiple provider URIs are not supported by async providers {}'.format(uri_string))
+    uri = urlparse(uri_string)
+    if uri.scheme == 'file':
+        return AsyncBatchIPCProvider(uri.path, timeout=timeout, max_connections=max_connections)
+    elif uri.scheme == 'http' or uri.scheme == 'https':
+        request_kwargs = {'timeout': timeout}
+        return AsyncBatchHTTPProvider(uri_string, request_kwargs=request_kwargs, max_connections=max_connections)
+    else:
+        raise ValueError('Unknown uri scheme {}'.format(uri_string))
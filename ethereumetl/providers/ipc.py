@@ -21,63 +21,203 @@
 # SOFTWARE.
 
 
-import json
+import re
 import socket
+import threading
 
-from web3.providers.ipc import IPCProvider
+from web3.providers.ipc import IPCProvider, get_ipc_socket
 from web3._utils.threads import (
     Timeout,
 )
 
-try:
-    from json import JSONDecodeError
-except ImportError:
-    JSONDecodeError = ValueError
+from blockchainetl.json_codec import json_loads_rpc_response
+
+DEFAULT_RECV_BUFFER_SIZE = 1024 * 1024
+DEFAULT_MAX_IDLE_CONNECTIONS = 64
 
 
 # Mostly copied from web3.py/providers/ipc.py. Supports batch requests.
 # Will be removed once batch feature is added to web3.py https://github.com/ethereum/web3.py/issues/832
 # Also see this optimization https://github.com/ethereum/web3.py/pull/849
+# Batch requests take a socket from a connection pool shared by all providers with the same ipc_path,
+# so concurrent requests from different threads and jobs don't wait for each other.
 class BatchIPCProvider(IPCProvider):
     _socket = None
 
+    def __init__(self, ipc_path=None, timeout=10, recv_buffer_size=DEFAULT_RECV_BUFFER_SIZE, *args, **kwargs):
+        super(BatchIPCProvider, self).__init__(ipc_path, timeout, *args, **kwargs)
+        self.recv_buffer_size = recv_buffer_size
+        self._connection_pool = get_ipc_connection_pool(self.ipc_path)
+
     def make_batch_request(self, text):
         request = text.encode('utf-8')
-        with self._lock, self._socket as sock:
+        sock = self._connection_pool.acquire()
+        try:
             try:
                 sock.sendall(request)
             except BrokenPipeError:
-                # one extra attempt, then give up
-                sock = self._socket.reset()
+                # the pooled socket was closed by the node, one extra attempt on a new socket, then give up
+                self._connection_pool.discard(sock)
+                sock = self._connection_pool.connect()
                 sock.sendall(request)
+            response = self._receive_response(sock)
+        except BaseException:
+            # the socket may hold a partially read response so it can't be reused
+            self._connection_pool.discard(sock)
+            raise
+        self._connection_pool.release(sock)
+        return response
+
+    def _receive_response(self, sock):
+        response_buffer = JsonRpcResponseBuffer(self.recv_buffer_size)
+        with Timeout(self.timeout) as timeout:
+            while True:
+                try:
+                    received = response_buffer.receive(sock)
+                except socket.timeout:
+                    timeout.sleep(0)
+                    continue
+                if received == 0:
+                    raise ConnectionError('IPC connection closed before a complete response was received')
+                elif response_buffer.is_complete():
+                    return response_buffer.decode()
+
+
+# Keeps idle IPC sockets for reuse. A socket carries one request at a time and a new one is opened
+# when all sockets are busy, so the number of open sockets follows the number of concurrent workers.
+class IPCConnectionPool:
+    def __init__(self, ipc_path, max_idle_connections=DEFAULT_MAX_IDLE_CONNECTIONS):
+        self.ipc_path = ipc_path
+        self.max_idle_connections = max_idle_connections
+        self._idle_connections = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._idle_connections:
+                return self._idle_connections.pop()
+        return self.connect()
+
+    def connect(self):
+        return get_ipc_socket(self.ipc_path)
+
+    def release(self, sock):
+        with self._lock:
+            if len(self._idle_connections) < self.max_idle_connections:
+                self._idle_connections.append(sock)
+                return
+        self.discard(sock)
+
+    def discard(self, sock):
+        try:
+            sock.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            idle_connections = self._idle_connections
+            self._idle_connections = []
+        for sock in idle_connections:
+            self.discard(sock)
+
+
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+
+def get_ipc_connection_pool(ipc_path):
+    with _connection_pools_lock:
+        connection_pool = _connection_pools.get(ipc_path)
+        if connection_pool is None:
+            connection_pool = IPCConnectionPool(ipc_path)
+            _connection_pools[ipc_path] = connection_pool
+        return connection_pool
+
+
+# Accumulates a JSON RPC response read from a socket. Data is received directly into a preallocated
+# bytearray that grows geometrically, the end of the JSON document is detected incrementally
+# and the response is decoded exactly once.
+class JsonRpcResponseBuffer:
+    def __init__(self, recv_buffer_size=DEFAULT_RECV_BUFFER_SIZE):
+        self._recv_buffer_size = recv_buffer_size
+        self._buffer = bytearray(recv_buffer_size)
+        self._length = 0
+        self._scanner = JsonDocumentScanner()
+        self._document_end = None
+
+    def receive(self, sock):
+        free_space = len(self._buffer) - self._length
+        if free_space < self._recv_buffer_size:
+            self._buffer += bytes(max(len(self._buffer), self._recv_buffer_size))
+
+        if not hasattr(sock, 'recv_into'):
+            # Windows named pipes only support recv
+            data = sock.recv(self._recv_buffer_size)
+            self.append(data)
+            return len(data)
+
+        with memoryview(self._buffer) as view, view[self._length:] as free_view:
+            received = sock.recv_into(free_view)
+        self._append_received(received)
+        return received
+
+    def append(self, data):
+        # Used by readers that get their data as bytes chunks, e.g. asyncio streams
+        self._buffer[self._length:self._length + len(data)] = data
+        self._append_received(len(data))
+
+    def is_complete(self):
+        return self._document_end is not None
+
+    def decode(self):
+        if self._document_end is None:
+            raise ValueError('The JSON RPC response is not complete')
+        del self._buffer[self._document_end:]
+        return json_loads_rpc_response(self._buffer)
+
+    def _append_received(self, received):
+        self._length += received
+        if self._document_end is None:
+            self._document_end = self._scanner.scan(self._buffer, self._length)
+
+
+# A complete string, an opening quote of a string that is not fully received yet, or a bracket
+_JSON_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|"|[\[\]{}]', re.DOTALL)
+
+_OPENING_BRACKETS = frozenset(b'[{')
+_QUOTE = ord('"')
+
+
+# Finds the end of a JSON document by tracking the bracket depth outside of strings.
+# Scanning is incremental: every call resumes where the previous one stopped, and the regex skips whole strings
+# and everything that is not a bracket so only brackets are looked at in Python.
+class JsonDocumentScanner:
+    def __init__(self):
+        self._position = 0
+        self._depth = 0
 
-            raw_response = b""
-            with Timeout(self.timeout) as timeout:
-                while True:
-                    try:
-                        raw_response += sock.recv(4096)
-                    except socket.timeout:
-                        timeout.sleep(0)
-                        continue
-                    if raw_response == b"":
-                        timeout.sleep(0)
-                    elif has_valid_json_rpc_ending(raw_response):
-                        try:
-                            response = json.loads(raw_response.decode('utf-8'))
-                        except JSONDecodeError:
-                            timeout.sleep(0)
-                            continue
-                        else:
-                            return response
-                    else:
-                        timeout.sleep(0)
-                        continue
-
-
-# A valid JSON RPC response can only end in } or ] http://www.jsonrpc.org/specification
-def has_valid_json_rpc_ending(raw_response):
-    for valid_ending in [b"}\n", b"]\n"]:
-        if raw_response.endswith(valid_ending):
-            return True
-    else:
-        return False
+    def scan(self, buffer, end=None):
+        """Returns the offset right after the end of the JSON document or None if it's not complete yet."""
+        if end is None:
+            end = len(buffer)
+        depth = self._depth
+        for match in _JSON_TOKEN.finditer(buffer, self._position, end):
+            start = match.start()
+            if buffer[start] == _QUOTE:
+                if match.end() - start == 1:
+                    # The rest of the string hasn't been received yet, scan it again on the next call
+                    self._position = start
+                    self._depth = depth
+                    return None
+            elif buffer[start] in _OPENING_BRACKETS:
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    self._position = match.end()
+                    self._depth = depth
+                    return match.end()
+        self._position = end
+        self._depth = depth
+        return None
@@ -0,0 +1,190 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from web3.providers.base import BaseProvider
+
+# Smoothing factor for the latency and error rate moving averages
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW_SIZE = 100
+# Hedging is only enabled once an endpoint has this many latency samples
+MIN_HEDGE_SAMPLES = 20
+ERROR_COOLDOWN_SECONDS = 1
+MAX_ERROR_COOLDOWN_SECONDS = 60
+HEDGE_MAX_WORKERS = 32
+
+logger = logging.getLogger('MultiEndpointProvider')
+
+
+# Latency and error statistics of a single endpoint, shared by all providers in the process
+class EndpointHealth:
+    def __init__(self, uri):
+        self.uri = uri
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.unavailable_until = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW_SIZE)
+        self._lock = threading.Lock()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.latency = latency if self.latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+            self.error_rate = (1 - EWMA_ALPHA) * self.error_rate
+            self.consecutive_errors = 0
+            self._latencies.append(latency)
+
+    def record_error(self):
+        with self._lock:
+            self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+            self.consecutive_errors += 1
+            cooldown = min(ERROR_COOLDOWN_SECONDS * 2 ** (self.consecutive_errors - 1), MAX_ERROR_COOLDOWN_SECONDS)
+            self.unavailable_until = time.time() + cooldown
+
+    def is_available(self):
+        return self.unavailable_until <= time.time()
+
+    def score(self):
+        """Lower is better. Endpoints without latency samples score as fast so that they get tried"""
+        return (self.latency or 0) * (1 + 10 * self.error_rate) + self.error_rate
+
+    def latency_percentile(self, percentile):
+        with self._lock:
+            if len(self._latencies) < MIN_HEDGE_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(int(len(latencies) * percentile / 100), len(latencies) - 1)]
+
+
+_endpoint_health = {}
+_endpoint_health_lock = threading.Lock()
+_hedge_executor = None
+
+
+def get_endpoint_health(uri):
+    with _endpoint_health_lock:
+        if uri not in _endpoint_health:
+            _endpoint_health[uri] = EndpointHealth(uri)
+        return _endpoint_health[uri]
+
+
+def get_hedge_executor():
+    global _hedge_executor
+    with _endpoint_health_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS)
+        return _hedge_executor
+
+
+# Routes requests to several endpoints. Each request goes to the healthier of two randomly picked endpoints
+# (lower latency and error rate), failing over to the remaining endpoints on errors.
+# With hedge_percentile set, a request that is slower than the given latency percentile of its endpoint
+# is re-issued to a second endpoint and the first successful response is used.
+class MultiEndpointProvider(BaseProvider):
+    def __init__(self, uris, providers, hedge_percentile=None):
+        if len(uris) != len(providers) or len(uris) == 0:
+            raise ValueError('uris and providers must be non-empty and of the same length')
+        self.endpoint_uri = ','.join(uris)
+        self.hedge_percentile = hedge_percentile
+        self._endpoints = [(get_endpoint_health(uri), provider) for uri, provider in zip(uris, providers)]
+
+    def make_request(self, method, params):
+        return self._route(lambda provider: provider.make_request(method, params))
+
+    def make_batch_request(self, text):
+        return self._route(lambda provider: provider.make_batch_request(text))
+
+    def isConnected(self):
+        return any(provider.isConnected() for _, provider in self._endpoints)
+
+    def _route(self, request_func):
+        tried = []
+        while True:
+            endpoint = self._pick_endpoint(exclude=tried)
+            tried.append(endpoint)
+            try:
+                if self.hedge_percentile is not None:
+                    return self._hedged_request(endpoint, request_func, tried)
+                return execute_on_endpoint(endpoint, request_func)
+            except Exception:
+                if len(tried) >= len(self._endpoints):
+                    raise
+                logger.warning('Request to {} failed, failing over to another endpoint.'.format(endpoint[0].uri),
+                               exc_info=True)
+
+    def _hedged_request(self, endpoint, request_func, tried):
+        hedge_delay = endpoint[0].latency_percentile(self.hedge_percentile)
+        if hedge_delay is None or len(tried) >= len(self._endpoints):
+            return execute_on_endpoint(endpoint, request_func)
+
+        executor = get_hedge_executor()
+        futures = [executor.submit(execute_on_endpoint, endpoint, request_func)]
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            hedge_endpoint = self._pick_endpoint(exclude=tried)
+            tried.append(hedge_endpoint)
+            logger.debug('Request to {} is slower than {}s, hedging to {}.'.format(
+                endpoint[0].uri, hedge_delay, hedge_endpoint[0].uri))
+            futures.append(executor.submit(execute_on_endpoint, hedge_endpoint, request_func))
+
+        pending = futures
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [future for future in done if future.exception() is None]
+            if len(succeeded) > 0:
+                return succeeded[0].result()
+            if len(pending) == 0:
+                # Raises the exception of the failed request
+                return done.pop().result()
+
+    def _pick_endpoint(self, exclude):
+        candidates = [endpoint for endpoint in self._endpoints if endpoint not in exclude]
+        available = [endpoint for endpoint in candidates if endpoint[0].is_available()]
+        if len(available) == 0:
+            # All endpoints are cooling down after errors, use the one that recovers first
+            return min(candidates, key=lambda endpoint: endpoint[0].unavailable_until)
+        # Power of two choices: spreads the load while preferring healthy endpoints
+        sample = random.sample(available, min(2, len(available)))
+        return min(sample, key=lambda endpoint: endpoint[0].score())
+
+
+def execute_on_endpoint(endpoint, request_func):
+    health, provider = endpoint
+    start_time = time.time()
+    try:
+        result = request_func(provider)
+    except Exception:
+        health.record_error()
+        raise
+    health.record_success(time.time() - start_time)
+    return result
+
+
+def split_provider_uris(uri_string):
+    return [uri.strip() for uri in uri_string.split(',') if uri.strip()]
@@ -22,7 +22,11 @@
 
 
 from web3 import HTTPProvider
-from web3._utils.request import make_post_request
+from web3._utils.request import make_post_request, _get_session
+
+from blockchainetl.json_codec import iter_json_array_items, json_loads_rpc_response
+
+STREAMING_CHUNK_SIZE = 1024 * 1024
 
 
 # Mostly copied from web3.py/providers/rpc.py. Supports batch requests.
@@ -43,3 +47,27 @@ class BatchHTTPProvider(HTTPProvider):
                           "Request: %s, Response: %s",
                           self.endpoint_uri, text, response)
         return response
+
+    def make_batch_request_iter(self, text):
+        """Yields the response items as they are received, so that only one of them is held in memory
+        instead of the whole response, e.g. for debug_traceBlockByNumber responses of large blocks"""
+        self.logger.debug("Making streaming request HTTP. URI: %s, Request: %s",
+                          self.endpoint_uri, text)
+        request_kwargs = dict(self.get_request_kwargs())
+        request_kwargs.setdefault('timeout', 10)
+        session = _get_session(self.endpoint_uri)
+        with session.post(self.endpoint_uri, data=text.encode('utf-8'), stream=True, **request_kwargs) as response:
+            response.raise_for_status()
+            for response_item in iter_json_array_items(response.iter_content(chunk_size=STREAMING_CHUNK_SIZE)):
+                yield response_item
+
+    def decode_rpc_response(self, raw_response):
+        return json_loads_rpc_response(raw_response)
+
+
+def make_batch_request_iter(batch_web3_provider, text):
+    """Streams the response if the provider supports it, other providers return the whole response at once"""
+    if hasattr(batch_web3_provider, 'make_batch_request_iter'):
+        return batch_web3_provider.make_batch_request_iter(text)
+    response = batch_web3_provider.make_batch_request(text)
+    return iter(response) if isinstance(response, list) else iter([response])
@@ -0,0 +1,218 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from web3.providers.base import BaseProvider
+
+from blockchainetl.json_codec import json_dumps_compact, json_loads, json_loads_rpc_response
+from ethereumetl.utils import hex_to_dec
+
+# Used when the node doesn't support the "finalized" block tag
+DEFAULT_FINALITY_CONFIRMATIONS = 64
+FINALIZED_BLOCK_REFRESH_SECONDS = 60
+
+logger = logging.getLogger('CachingProvider')
+
+
+def _block_param(index):
+    def get_block_number(params, result):
+        return params[index] if len(params) > index else None
+    return get_block_number
+
+
+def _filter_to_block(params, result):
+    return params[0].get('toBlock') if len(params) > 0 and isinstance(params[0], dict) else None
+
+
+def _result_block_number(field):
+    def get_block_number(params, result):
+        return result.get(field) if isinstance(result, dict) else None
+    return get_block_number
+
+
+# Methods whose results don't change once a block is finalized, mapped to a function that returns the number
+# of the block the result depends on, from the request params or from the result
+CACHEABLE_METHODS = {
+    'eth_getBlockByNumber': _block_param(0),
+    'eth_getBlockReceipts': _block_param(0),
+    'eth_getBlockTransactionCountByNumber': _block_param(0),
+    'debug_traceBlockByNumber': _block_param(0),
+    'trace_block': _block_param(0),
+    'trace_replayBlockTransactions': _block_param(0),
+    'eth_getCode': _block_param(1),
+    'eth_getBalance': _block_param(1),
+    'eth_call': _block_param(1),
+    'eth_getLogs': _filter_to_block,
+    'trace_filter': _filter_to_block,
+    'eth_getBlockByHash': _result_block_number('number'),
+    'eth_getTransactionByHash': _result_block_number('blockNumber'),
+    'eth_getTransactionReceipt': _result_block_number('blockNumber'),
+}
+
+
+# On-disk store of JSON RPC results. Entries are content addressed by the hash of the method and params
+# and are only written for finalized blocks, so they never have to be invalidated.
+class RpcCache:
+    def __init__(self, cache_dir, finality_confirmations=DEFAULT_FINALITY_CONFIRMATIONS):
+        self.cache_dir = cache_dir
+        self.finality_confirmations = finality_confirmations
+        self.finalized_block = None
+        self._finalized_block_refreshed_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, method, params):
+        path = self._get_path(method, params)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as file:
+                return json_loads_rpc_response(file.read())
+        except FileNotFoundError:
+            return None
+
+    def put(self, method, params, result, provider):
+        path = self._get_path(method, params)
+        if path is None or result is None:
+            return False
+        block_number = _to_block_number(CACHEABLE_METHODS[method](params, result))
+        if block_number is None or not self._is_finalized(block_number, provider):
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so that concurrent readers never see a partial entry
+        tmp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        with open(tmp_path, 'w') as file:
+            file.write(json_dumps_compact(result))
+        os.replace(tmp_path, path)
+        return True
+
+    def _get_path(self, method, params):
+        """Returns None for requests that can't be cached"""
+        if method not in CACHEABLE_METHODS:
+            return None
+        try:
+            request_json = json.dumps([method, params], sort_keys=True, separators=(',', ':'))
+        except TypeError:
+            return None
+        key = hashlib.sha256(request_json.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, method, key[:2], key + '.json')
+
+    def _is_finalized(self, block_number, provider):
+        if self.finalized_block is not None and block_number <= self.finalized_block:
+            return True
+        with self._lock:
+            if time.time() - self._finalized_block_refreshed_at >= FINALIZED_BLOCK_REFRESH_SECONDS:
+                self.finalized_block = self._get_finalized_block(provider)
+                self._finalized_block_refreshed_at = time.time()
+                logger.info('Caching RPC results for blocks up to finalized block {}'.format(self.finalized_block))
+        return self.finalized_block is not None and block_number <= self.finalized_block
+
+    def _get_finalized_block(self, provider):
+        response = provider.make_request('eth_getBlockByNumber', ['finalized', False])
+        if isinstance(response.get('result'), dict):
+            return hex_to_dec(response['result']['number'])
+        # The node doesn't support the "finalized" block tag
+        response = provider.make_request('eth_blockNumber', [])
+        if response.get('result') is None:
+            raise ValueError('Failed to get the latest block number: {}'.format(response.get('error')))
+        return hex_to_dec(response['result']) - self.finality_confirmations
+
+
+_rpc_caches = {}
+_rpc_caches_lock = threading.Lock()
+
+
+def get_rpc_cache(cache_dir):
+    with _rpc_caches_lock:
+        if cache_dir not in _rpc_caches:
+            _rpc_caches[cache_dir] = RpcCache(cache_dir)
+        return _rpc_caches[cache_dir]
+
+
+# Serves requests from an RpcCache and records the results of cacheable requests for finalized blocks.
+# Batch requests only send the requests missing from the cache to the wrapped provider.
+class CachingProvider(BaseProvider):
+    def __init__(self, provider, cache_dir):
+        self._provider = provider
+        self._cache = get_rpc_cache(cache_dir)
+        self.endpoint_uri = getattr(provider, 'endpoint_uri', None) or getattr(provider, 'ipc_path', None)
+
+    def make_request(self, method, params):
+        result = self._cache.get(method, params)
+        if result is not None:
+            return {'jsonrpc': '2.0', 'id': 1, 'result': result}
+
+        response = self._provider.make_request(method, params)
+        if isinstance(response, dict) and 'error' not in response:
+            self._cache.put(method, params, response.get('result'), self._provider)
+        return response
+
+    def make_batch_request(self, text):
+        requests = json_loads(text)
+        responses = [self._get_cached_response(request) for request in requests]
+        missed_requests = [request for request, response in zip(requests, responses) if response is None]
+        if not missed_requests:
+            return responses
+
+        missed_text = text if len(missed_requests) == len(requests) else json_dumps_compact(missed_requests)
+        missed_responses = self._provider.make_batch_request(missed_text)
+        if not isinstance(missed_responses, list):
+            # an error for the whole batch
+            return missed_responses
+
+        missed_responses_by_id = {response.get('id'): response for response in missed_responses}
+        for request in missed_requests:
+            response = missed_responses_by_id.get(request.get('id'))
+            if response is not None and 'error' not in response:
+                self._cache.put(request['method'], request.get('params', []), response.get('result'), self._provider)
+
+        if len(missed_requests) == len(requests):
+            return missed_responses
+        return [response if response is not None else missed_responses_by_id.get(request.get('id'))
+                for request, response in zip(requests, responses)
+                if response is not None or request.get('id') in missed_responses_by_id]
+
+    def isConnected(self):
+        return self._provider.isConnected()
+
+    def _get_cached_response(self, request):
+        result = self._cache.get(request['method'], request.get('params', []))
+        if result is None:
+            return None
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+
+
+def _to_block_number(block):
+    if isinstance(block, int):
+        return block
+    if isinstance(block, str) and block.startswith('0x'):
+        return hex_to_dec(block)
+    # block tags such as "latest"
+    return None
@@ -0,0 +1,75 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import os
+import struct
+import time
+
+from ethereumetl.service.graph_operations import Point, PointIndex
+
+# Blocks that are older than this are not expected to be reorganized, only their timestamps are saved
+FINALIZED_BLOCK_AGE_SECONDS = 60 * 60
+
+# Little-endian block number and timestamp
+RECORD = struct.Struct('<qq')
+
+logger = logging.getLogger('BlockTimestampIndex')
+
+
+# Block number to timestamp index that is saved to a file, so that block ranges for dates and timestamps are found
+# without requests to the node once the blocks around them were requested. Blocks are appended to the file
+# as 16 byte records when they are added.
+class BlockTimestampIndex(PointIndex):
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._file = None
+
+    def open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.isfile(self.path):
+            with open(self.path, 'rb') as file:
+                content = file.read()
+            # A record can be partially written if the process was killed
+            complete_length = len(content) - len(content) % RECORD.size
+            for block_number, timestamp in RECORD.iter_unpack(content[:complete_length]):
+                super().add(Point(block_number, timestamp))
+            logger.info('Loaded {} blocks from {}'.format(len(self), self.path))
+            if complete_length != len(content):
+                with open(self.path, 'r+b') as file:
+                    file.truncate(complete_length)
+        self._file = open(self.path, 'ab')
+        return self
+
+    def add(self, point):
+        added = super().add(point)
+        if added and self._file is not None and point.y <= time.time() - FINALIZED_BLOCK_AGE_SECONDS:
+            self._file.write(RECORD.pack(point.x, point.y))
+            self._file.flush()
+        return added
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,155 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import re
+from collections import OrderedDict
+
+from eth_utils import function_signature_to_4byte_selector
+
+# https://eips.ethereum.org/EIPS/eip-1167, the 20 bytes in the middle are the implementation address
+MINIMAL_PROXY_BYTECODE_PATTERN = re.compile(
+    r'^(0x)?363d3d373d3d3d363d73[0-9a-f]{40}5af43d82803e903d91602b57fd5bf3$', re.IGNORECASE)
+
+
+def get_function_sighash(signature):
+    return '0x' + function_signature_to_4byte_selector(signature).hex()
+
+
+def get_function_sighashes(signatures):
+    return frozenset(get_function_sighash(signature) for signature in signatures)
+
+
+# A contract standard detected from the function sighashes in the contract's dispatcher. The sighashes are
+# computed once when the standard is defined, so classifying a contract is a few set operations.
+class ContractStandard(object):
+    def __init__(self, name, required_signatures, any_of_signatures=()):
+        """any_of_signatures is a list of signature groups, the contract has to implement one signature of each"""
+        self.name = name
+        self.required_sighashes = get_function_sighashes(required_signatures)
+        self.any_of_sighashes = [get_function_sighashes(signatures) for signatures in any_of_signatures]
+
+    @property
+    def flag(self):
+        """The name of the contract field"""
+        return 'is_' + self.name
+
+    def matches(self, sighashes, bytecode=None):
+        """sighashes is a set of the contract's function sighashes"""
+        return self.required_sighashes <= sighashes and \
+            all(not any_of_sighashes.isdisjoint(sighashes) for any_of_sighashes in self.any_of_sighashes)
+
+
+# Proxies forward calls to an implementation contract. EIP-1167 minimal proxies have no functions of their own
+# and are detected by their bytecode.
+class ProxyContractStandard(ContractStandard):
+    def matches(self, sighashes, bytecode=None):
+        if bytecode is not None and MINIMAL_PROXY_BYTECODE_PATTERN.match(bytecode):
+            return True
+        return super(ProxyContractStandard, self).matches(sighashes, bytecode)
+
+
+_contract_standards = OrderedDict()
+
+
+def register_contract_standard(contract_standard):
+    _contract_standards[contract_standard.name] = contract_standard
+
+
+def unregister_contract_standard(name):
+    _contract_standards.pop(name, None)
+
+
+def get_contract_standards():
+    return list(_contract_standards.values())
+
+
+def get_contract_standard(name):
+    return _contract_standards[name]
+
+
+def get_contract_standard_flags():
+    return [contract_standard.flag for contract_standard in _contract_standards.values()]
+
+
+def classify_contract(function_sighashes, bytecode=None):
+    """Returns a dict of contract standard flags e.g. {'is_erc20': True, 'is_erc721': False, ...}"""
+    sighashes = frozenset(function_sighashes)
+    return OrderedDict((contract_standard.flag, contract_standard.matches(sighashes, bytecode))
+                       for contract_standard in _contract_standards.values())
+
+
+# https://github.com/ethereum/EIPs/blob/master/EIPS/eip-20.md
+# https://github.com/OpenZeppelin/openzeppelin-solidity/blob/master/contracts/token/ERC20/ERC20.sol
+ERC20_SIGNATURES = [
+    'totalSupply()',
+    'balanceOf(address)',
+    'transfer(address,uint256)',
+    'transferFrom(address,address,uint256)',
+    'approve(address,uint256)',
+    'allowance(address,address)',
+]
+
+register_contract_standard(ContractStandard('erc20', ERC20_SIGNATURES))
+
+# https://github.com/ethereum/EIPs/blob/master/EIPS/eip-721.md
+# https://github.com/OpenZeppelin/openzeppelin-solidity/blob/master/contracts/token/ERC721/ERC721Basic.sol
+# Doesn't check the below ERC721 methods to match CryptoKitties contract
+# getApproved(uint256)
+# setApprovalForAll(address,bool)
+# isApprovedForAll(address,address)
+# transferFrom(address,address,uint256)
+# safeTransferFrom(address,address,uint256)
+# safeTransferFrom(address,address,uint256,bytes)
+register_contract_standard(ContractStandard(
+    'erc721',
+    ['balanceOf(address)', 'ownerOf(uint256)', 'approve(address,uint256)'],
+    [['transfer(address,uint256)', 'transferFrom(address,address,uint256)']]))
+
+# https://eips.ethereum.org/EIPS/eip-1155
+register_contract_standard(ContractStandard('erc1155', [
+    'safeTransferFrom(address,address,uint256,uint256,bytes)',
+    'safeBatchTransferFrom(address,address,uint256[],uint256[],bytes)',
+    'balanceOf(address,uint256)',
+    'balanceOfBatch(address[],uint256[])',
+    'setApprovalForAll(address,bool)',
+    'isApprovedForAll(address,address)',
+]))
+
+# https://eips.ethereum.org/EIPS/eip-4626, vaults are ERC20 tokens of their shares
+register_contract_standard(ContractStandard('erc4626', ERC20_SIGNATURES + [
+    'asset()',
+    'totalAssets()',
+    'convertToShares(uint256)',
+    'convertToAssets(uint256)',
+    'deposit(uint256,address)',
+    'mint(uint256,address)',
+    'withdraw(uint256,address,address)',
+    'redeem(uint256,address,address)',
+]))
+
+# https://eips.ethereum.org/EIPS/eip-897 and upgradeable proxies that expose their implementation
+# e.g. https://github.com/OpenZeppelin/openzeppelin-contracts/blob/v4.9.0/contracts/proxy/transparent/TransparentUpgradeableProxy.sol
+register_contract_standard(ProxyContractStandard(
+    'proxy',
+    ['implementation()'],
+    [['proxyType()', 'upgradeTo(address)', 'upgradeToAndCall(address,bytes)']]))
@@ -19,55 +19,104 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from eth_utils import function_signature_to_4byte_selector
+import threading
+from collections import OrderedDict
 
-from ethereum_dasm.evmdasm import EvmCode, Contract
+from eth_utils import keccak
+
+from ethereumetl.service.contract_standards import classify_contract, get_contract_standard
+
+# Function sighashes of this many distinct bytecodes are kept in memory. Minimal proxies and factory clones
+# deploy the same bytecode many times.
+DEFAULT_SIGHASHES_CACHE_SIZE = 100000
+
+JUMPDEST = 0x5b
+PUSH1 = 0x60
+PUSH4 = 0x63
+PUSH32 = 0x7f
 
 
 class EthContractService:
+    def __init__(self, sighashes_cache=None):
+        self._sighashes_cache = sighashes_cache if sighashes_cache is not None else get_sighashes_cache()
 
     def get_function_sighashes(self, bytecode):
         bytecode = clean_bytecode(bytecode)
-        if bytecode is not None:
-            evm_code = EvmCode(contract=Contract(bytecode=bytecode), static_analysis=False, dynamic_analysis=False)
-            evm_code.disassemble(bytecode)
-            basic_blocks = evm_code.basicblocks
-            if basic_blocks and len(basic_blocks) > 0:
-                init_block = basic_blocks[0]
-                instructions = init_block.instructions
-                push4_instructions = [inst for inst in instructions if inst.name == 'PUSH4']
-                return sorted(list(set('0x' + inst.operand for inst in push4_instructions)))
-            else:
-                return []
-        else:
+        if bytecode is None:
             return []
 
-    # https://github.com/ethereum/EIPs/blob/master/EIPS/eip-20.md
-    # https://github.com/OpenZeppelin/openzeppelin-solidity/blob/master/contracts/token/ERC20/ERC20.sol
+        code = bytes.fromhex(bytecode.replace('0x', ''))
+        code_hash = keccak(code)
+        sighashes = self._sighashes_cache.get(code_hash)
+        if sighashes is None:
+            sighashes = tuple(sorted(set('0x' + operand.hex() for operand in get_dispatcher_push4_operands(code))))
+            self._sighashes_cache.put(code_hash, sighashes)
+        return list(sighashes)
+
+    def classify_contract(self, function_sighashes, bytecode=None):
+        """Returns a dict with a flag for each registered contract standard e.g. {'is_erc20': True, ...}"""
+        return classify_contract(function_sighashes, bytecode)
+
     def is_erc20_contract(self, function_sighashes):
-        c = ContractWrapper(function_sighashes)
-        return c.implements('totalSupply()') and \
-               c.implements('balanceOf(address)') and \
-               c.implements('transfer(address,uint256)') and \
-               c.implements('transferFrom(address,address,uint256)') and \
-               c.implements('approve(address,uint256)') and \
-               c.implements('allowance(address,address)')
-
-    # https://github.com/ethereum/EIPs/blob/master/EIPS/eip-721.md
-    # https://github.com/OpenZeppelin/openzeppelin-solidity/blob/master/contracts/token/ERC721/ERC721Basic.sol
-    # Doesn't check the below ERC721 methods to match CryptoKitties contract
-    # getApproved(uint256)
-    # setApprovalForAll(address,bool)
-    # isApprovedForAll(address,address)
-    # transferFrom(address,address,uint256)
-    # safeTransferFrom(address,address,uint256)
-    # safeTransferFrom(address,address,uint256,bytes)
+        return get_contract_standard('erc20').matches(frozenset(function_sighashes))
+
     def is_erc721_contract(self, function_sighashes):
-        c = ContractWrapper(function_sighashes)
-        return c.implements('balanceOf(address)') and \
-               c.implements('ownerOf(uint256)') and \
-               c.implements_any_of('transfer(address,uint256)', 'transferFrom(address,address,uint256)') and \
-               c.implements('approve(address,uint256)')
+        return get_contract_standard('erc721').matches(frozenset(function_sighashes))
+
+
+def get_dispatcher_push4_operands(code):
+    """Returns the PUSH4 operands in the first basic block of code, i.e. before the first JUMPDEST.
+    The function dispatcher of Solidity and Vyper contracts compares the call's sighash against them."""
+    operands = []
+    code_length = len(code)
+    pc = 0
+    while pc < code_length:
+        opcode = code[pc]
+        if opcode == JUMPDEST:
+            break
+        if PUSH1 <= opcode <= PUSH32:
+            operand_end = pc + 2 + opcode - PUSH1
+            # A PUSH truncated by the end of the code is not a valid instruction
+            if opcode == PUSH4 and operand_end <= code_length:
+                operands.append(code[pc + 1:operand_end])
+            pc = operand_end
+        else:
+            pc += 1
+    return operands
+
+
+# A thread-safe LRU cache of function sighashes keyed by the keccak hash of the bytecode
+class SighashesCache:
+    def __init__(self, max_size=DEFAULT_SIGHASHES_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code_hash):
+        with self._lock:
+            sighashes = self._entries.get(code_hash)
+            if sighashes is not None:
+                self._entries.move_to_end(code_hash)
+            return sighashes
+
+    def put(self, code_hash, sighashes):
+        with self._lock:
+            self._entries[code_hash] = sighashes
+            self._entries.move_to_end(code_hash)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_sighashes_cache = None
+_sighashes_cache_lock = threading.Lock()
+
+
+def get_sighashes_cache():
+    global _sighashes_cache
+    with _sighashes_cache_lock:
+        if _sighashes_cache is None:
+            _sighashes_cache = SighashesCache()
+        return _sighashes_cache
 
 
 def clean_bytecode(bytecode):
@@ -77,19 +126,3 @@ def clean_bytecode(bytecode):
         return bytecode[2:]
     else:
         return bytecode
-
-
-def get_function_sighash(signature):
-    return '0x' + function_signature_to_4byte_selector(signature).hex()
-
-
-class ContractWrapper:
-    def __init__(self, sighashes):
-        self.sighashes = sighashes
-
-    def implements(self, function_signature):
-        sighash = get_function_sighash(function_signature)
-        return sighash in self.sighashes
-
-    def implements_any_of(self, *function_signatures):
-        return any(self.implements(function_signature) for function_signature in function_signatures)
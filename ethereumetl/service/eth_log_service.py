@@ -0,0 +1,96 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+
+from blockchainetl.json_codec import json_dumps_compact
+from ethereumetl.json_rpc_requests import generate_get_logs_json_rpc
+from ethereumetl.misc.too_many_results_error import TooManyResultsError
+from ethereumetl.utils import rpc_response_to_result
+
+# The block range of the next request is doubled when a response has fewer logs than this
+SPARSE_LOGS_COUNT = 1000
+
+# Substrings of the errors nodes and providers return when eth_getLogs matches too many logs or blocks, e.g.
+# "query returned more than 10000 results", "Log response size exceeded", "exceed maximum block range: 5000".
+# Other errors about block ranges, e.g. "invalid block range params", must not be retried with a smaller range
+TOO_MANY_RESULTS_ERROR_MESSAGES = ['query returned more than', 'response size exceeded', 'block range is too large',
+                                   'exceed maximum block range', 'limited to']
+# https://github.com/ethereum/EIPs/blob/master/EIPS/eip-1474.md#error-codes
+LIMIT_EXCEEDED_ERROR_CODE = -32005
+
+logger = logging.getLogger('EthLogService')
+
+
+class EthLogService(object):
+    def __init__(self, batch_web3_provider):
+        self._batch_web3_provider = batch_web3_provider
+        # Shared by all threads so that the range learned in one batch is used in the next ones
+        self._block_range = None
+
+    def get_logs(self, from_block, to_block, topics=None, addresses=None):
+        """Returns the logs as JSON RPC dicts. The block range is requested with eth_getLogs in as few requests
+        as the node allows: the range is bisected when the node rejects a request for matching too many logs
+        and grows again when the logs are sparse"""
+        logs = []
+        block_range = self._block_range or (to_block - from_block + 1)
+        start_block = from_block
+        while start_block <= to_block:
+            end_block = min(start_block + block_range - 1, to_block)
+            try:
+                range_logs = self._get_logs_for_range(start_block, end_block, topics, addresses)
+            except TooManyResultsError:
+                if start_block == end_block:
+                    raise
+                block_range = (end_block - start_block + 1) // 2
+                logger.debug('Too many logs in blocks {}-{}, reducing the block range to {}'.format(
+                    start_block, end_block, block_range))
+                continue
+
+            logs.extend(range_logs)
+            start_block = end_block + 1
+            if len(range_logs) < SPARSE_LOGS_COUNT:
+                block_range = block_range * 2
+
+        self._block_range = block_range
+        return logs
+
+    def _get_logs_for_range(self, from_block, to_block, topics, addresses):
+        request = generate_get_logs_json_rpc(from_block, to_block, topics=topics, addresses=addresses)
+        response = self._batch_web3_provider.make_batch_request(json_dumps_compact([request]))
+        response_item = response[0] if isinstance(response, list) else response
+        if is_too_many_results_error(response_item.get('error')):
+            raise TooManyResultsError('Too many logs in blocks {}-{}: {}'.format(
+                from_block, to_block, response_item.get('error')))
+        return rpc_response_to_result(response_item)
+
+
+def is_too_many_results_error(error):
+    if error is None:
+        return False
+    message = (error.get('message') or '').lower()
+    if 'rate' in message:
+        # e.g. "project ID request rate exceeded" which has the same error code
+        return False
+    return error.get('code') == LIMIT_EXCEEDED_ERROR_CODE or \
+        any(error_message in message for error_message in TOO_MANY_RESULTS_ERROR_MESSAGES)
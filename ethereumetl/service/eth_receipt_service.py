@@ -0,0 +1,247 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+import threading
+
+from blockchainetl.json_codec import json_dumps_compact
+from ethereumetl.json_rpc_requests import generate_get_receipt_json_rpc, generate_get_block_receipts_json_rpc, \
+    generate_get_block_by_number_json_rpc, generate_json_rpc
+from ethereumetl.misc.retriable_value_error import RetriableValueError
+from ethereumetl.utils import batch_iterator, hex_to_dec, rpc_response_batch_to_results_by_id
+
+# Most nodes cap the number of requests in a single JSON RPC batch (geth defaults to 1000)
+DEFAULT_RECEIPTS_BATCH_SIZE = 500
+# eth_getBlockReceipts responses are large, a few blocks per batch keep them well under response size limits
+DEFAULT_BLOCK_RECEIPTS_BATCH_SIZE = 20
+
+# Error codes and messages of nodes that don't implement eth_getBlockReceipts, e.g.
+# "the method eth_getBlockReceipts does not exist/is not available"
+METHOD_NOT_SUPPORTED_ERROR_CODES = [-32601, -32602]
+METHOD_NOT_SUPPORTED_ERROR_MESSAGES = ['does not exist', 'not found', 'not supported', 'unsupported', 'not available']
+
+# Results of eth_getBlockReceipts probing, keyed by provider endpoint
+_block_receipts_support = {}
+_block_receipts_support_lock = threading.Lock()
+
+logger = logging.getLogger('EthReceiptService')
+
+
+# The request logic is written as generators that yield JSON RPC batches and receive their results,
+# so that the same logic can be driven by both sync and async (make_batch_request_async) providers.
+class EthReceiptService(object):
+    def __init__(
+            self,
+            batch_web3_provider,
+            receipts_batch_size=DEFAULT_RECEIPTS_BATCH_SIZE,
+            block_receipts_batch_size=DEFAULT_BLOCK_RECEIPTS_BATCH_SIZE,
+            use_block_receipts=None):
+        """use_block_receipts=None probes the node for eth_getBlockReceipts support"""
+        self._batch_web3_provider = batch_web3_provider
+        self._receipts_batch_size = receipts_batch_size
+        self._block_receipts_batch_size = block_receipts_batch_size
+        self._use_block_receipts = use_block_receipts
+
+    def get_receipts(self, transaction_hashes):
+        """Returns receipt JSON dicts in the same order as transaction_hashes"""
+        return self._execute(self._get_receipts(transaction_hashes))
+
+    async def get_receipts_async(self, transaction_hashes):
+        return await self._execute_async(self._get_receipts(transaction_hashes))
+
+    def get_block_receipts(self, block_numbers):
+        """Returns a list of receipt JSON dicts for each of block_numbers, in the same order"""
+        return self._execute(self._get_block_receipts(block_numbers, self.is_block_receipts_supported()))
+
+    async def get_block_receipts_async(self, block_numbers):
+        supported = await self.is_block_receipts_supported_async()
+        return await self._execute_async(self._get_block_receipts(block_numbers, supported))
+
+    def get_transaction_receipts(self, block_results):
+        """Returns receipt JSON dicts for all transactions in block_results (eth_getBlockByNumber with
+        transactions), in the same order as the transactions"""
+        supported = has_transactions(block_results) and self.is_block_receipts_supported()
+        return self._execute(self._get_transaction_receipts(block_results, supported))
+
+    async def get_transaction_receipts_async(self, block_results):
+        supported = has_transactions(block_results) and await self.is_block_receipts_supported_async()
+        return await self._execute_async(self._get_transaction_receipts(block_results, supported))
+
+    def is_block_receipts_supported(self):
+        if self._use_block_receipts is None:
+            provider_key = get_provider_key(self._batch_web3_provider)
+            with _block_receipts_support_lock:
+                supported = _block_receipts_support.get(provider_key)
+                if supported is None:
+                    supported = self._probe_block_receipts()
+                    _cache_block_receipts_support(provider_key, supported)
+            if supported is None:
+                # The probe failed, e.g. timed out, it's repeated for the next blocks
+                return False
+            self._use_block_receipts = supported
+        return self._use_block_receipts
+
+    async def is_block_receipts_supported_async(self):
+        if self._use_block_receipts is None:
+            provider_key = get_provider_key(self._batch_web3_provider)
+            supported = _block_receipts_support.get(provider_key)
+            if supported is None:
+                supported = await self._probe_block_receipts_async()
+                _cache_block_receipts_support(provider_key, supported)
+            if supported is None:
+                return False
+            self._use_block_receipts = supported
+        return self._use_block_receipts
+
+    def _get_receipts(self, transaction_hashes):
+        receipts = []
+        for transaction_hashes_batch in batch_iterator(transaction_hashes, self._receipts_batch_size):
+            receipts_rpc = list(generate_get_receipt_json_rpc(transaction_hashes_batch))
+            receipts.extend((yield receipts_rpc))
+        return receipts
+
+    def _get_block_receipts(self, block_numbers, block_receipts_supported):
+        block_numbers = list(block_numbers)
+        if block_receipts_supported:
+            block_receipts = []
+            for block_numbers_batch in batch_iterator(block_numbers, self._block_receipts_batch_size):
+                block_receipts_rpc = list(generate_get_block_receipts_json_rpc(block_numbers_batch))
+                block_receipts.extend((yield block_receipts_rpc))
+            return block_receipts
+
+        # Fall back to reading transaction hashes from blocks and requesting receipts one by one
+        blocks_rpc = list(generate_get_block_by_number_json_rpc(block_numbers, False))
+        blocks = (yield blocks_rpc) if blocks_rpc else []
+        receipts = iter((yield from self._get_receipts(
+            [tx_hash for block in blocks for tx_hash in block['transactions']])))
+        return [[next(receipts) for _ in block['transactions']] for block in blocks]
+
+    def _get_transaction_receipts(self, block_results, block_receipts_supported):
+        transactions = [tx for result in block_results for tx in result.get('transactions', []) if isinstance(tx, dict)]
+        if not block_receipts_supported:
+            return (yield from self._get_receipts([tx['hash'] for tx in transactions]))
+
+        block_numbers = [hex_to_dec(result['number']) for result in block_results if result.get('transactions')]
+        block_receipts = yield from self._get_block_receipts(block_numbers, True)
+        receipts_by_hash = {receipt['transactionHash']: receipt for receipts in block_receipts for receipt in receipts}
+        if any(tx['hash'] not in receipts_by_hash for tx in transactions):
+            raise RetriableValueError('eth_getBlockReceipts did not return receipts for all transactions.')
+        return [receipts_by_hash[tx['hash']] for tx in transactions]
+
+    def _execute(self, requests):
+        try:
+            rpc = next(requests)
+            while True:
+                rpc = requests.send(self._make_batch_request(rpc))
+        except StopIteration as e:
+            return e.value
+
+    async def _execute_async(self, requests):
+        try:
+            rpc = next(requests)
+            while True:
+                rpc = requests.send(await self._make_batch_request_async(rpc))
+        except StopIteration as e:
+            return e.value
+
+    def _make_batch_request(self, rpc):
+        response = self._batch_web3_provider.make_batch_request(json_dumps_compact(rpc))
+        return results_in_request_order(rpc, response)
+
+    async def _make_batch_request_async(self, rpc):
+        response = await self._batch_web3_provider.make_batch_request_async(json_dumps_compact(rpc))
+        return results_in_request_order(rpc, response)
+
+    def _probe_block_receipts(self):
+        """Returns None if the node didn't answer whether it supports eth_getBlockReceipts"""
+        try:
+            response = self._batch_web3_provider.make_batch_request(json_dumps_compact(BLOCK_RECEIPTS_PROBE_RPC))
+        except Exception as e:
+            logger.warning('eth_getBlockReceipts probe failed: {}'.format(e))
+            return None
+        return get_block_receipts_probe_result(response)
+
+    async def _probe_block_receipts_async(self):
+        try:
+            response = await self._batch_web3_provider.make_batch_request_async(
+                json_dumps_compact(BLOCK_RECEIPTS_PROBE_RPC))
+        except Exception as e:
+            logger.warning('eth_getBlockReceipts probe failed: {}'.format(e))
+            return None
+        return get_block_receipts_probe_result(response)
+
+
+BLOCK_RECEIPTS_PROBE_RPC = [generate_json_rpc(method='eth_getBlockReceipts', params=[hex(0)], request_id=0)]
+
+
+def get_block_receipts_probe_result(response):
+    """Returns False only if the node rejected the method, None for other errors, e.g. rate limits"""
+    response_item = response[0] if isinstance(response, list) and len(response) > 0 else response
+    if not isinstance(response_item, dict):
+        logger.warning('Unexpected eth_getBlockReceipts probe response: {}'.format(response))
+        return None
+    error = response_item.get('error')
+    if error is not None and not is_method_not_supported_error(error):
+        logger.warning('eth_getBlockReceipts probe failed: {}'.format(error))
+        return None
+    supported = error is None and isinstance(response_item.get('result'), list)
+    log_block_receipts_support(supported)
+    return supported
+
+
+def is_method_not_supported_error(error):
+    if not isinstance(error, dict):
+        return False
+    if error.get('code') in METHOD_NOT_SUPPORTED_ERROR_CODES:
+        return True
+    message = (error.get('message') or '').lower()
+    return any(error_message in message for error_message in METHOD_NOT_SUPPORTED_ERROR_MESSAGES)
+
+
+def log_block_receipts_support(supported):
+    logger.info('eth_getBlockReceipts is {}supported, fetching receipts {}.'.format(
+        '' if supported else 'not ', 'by block' if supported else 'by transaction hash'))
+
+
+def results_in_request_order(rpc, response):
+    results_by_id = rpc_response_batch_to_results_by_id(response)
+    results = []
+    for request in rpc:
+        result = results_by_id.get(request['id'])
+        if result is None:
+            raise RetriableValueError('No response for request {} in batch response.'.format(request))
+        results.append(result)
+    return results
+
+
+def has_transactions(block_results):
+    return any(result.get('transactions') for result in block_results)
+
+
+def get_provider_key(provider):
+    return getattr(provider, 'endpoint_uri', None) or getattr(provider, 'ipc_path', None)
+
+
+def _cache_block_receipts_support(provider_key, supported):
+    if provider_key is not None and supported is not None:
+        _block_receipts_support[provider_key] = supported
@@ -23,18 +23,33 @@
 
 from datetime import datetime, timezone
 
+from blockchainetl.json_codec import json_dumps_compact
+from ethereumetl.json_rpc_requests import generate_get_block_by_number_json_rpc
 from ethereumetl.service.graph_operations import GraphOperations, OutOfBoundsError, Point
+from ethereumetl.utils import batch_iterator, hex_to_dec, rpc_response_batch_to_results
+
+# The number of blocks requested in one JSON RPC batch when the block ranges for several dates are found
+BLOCK_BATCH_SIZE = 100
 
 
 class EthService(object):
-    def __init__(self, web3):
-        graph = BlockTimestampGraph(web3)
-        self._graph_operations = GraphOperations(graph)
+    def __init__(self, web3, batch_web3_provider=None, block_timestamp_index=None):
+        """block_timestamp_index caches the blocks requested from the node, e.g. a BlockTimestampIndex.
+        With batch_web3_provider the blocks for several dates are requested in batches"""
+        graph = BlockTimestampGraph(web3, batch_web3_provider)
+        self._graph_operations = GraphOperations(graph, block_timestamp_index)
 
     def get_block_range_for_date(self, date):
-        start_datetime = datetime.combine(date, datetime.min.time().replace(tzinfo=timezone.utc))
-        end_datetime = datetime.combine(date, datetime.max.time().replace(tzinfo=timezone.utc))
-        return self.get_block_range_for_timestamps(start_datetime.timestamp(), end_datetime.timestamp())
+        return self.get_block_range_for_timestamps(*get_timestamp_range_for_date(date))
+
+    def get_block_ranges_for_dates(self, dates):
+        """Yields get_block_range_for_date for each date. The blocks bounding all the dates are found first,
+        in one pass over the dates"""
+        timestamp_ranges = [get_timestamp_range_for_date(date) for date in dates]
+        self._graph_operations.prefetch_bounds_for_y_coordinates(
+            int(timestamp) for timestamp_range in timestamp_ranges for timestamp in timestamp_range)
+        for timestamp_range in timestamp_ranges:
+            yield self.get_block_range_for_timestamps(*timestamp_range)
 
     def get_block_range_for_timestamps(self, start_timestamp, end_timestamp):
         start_timestamp = int(start_timestamp)
@@ -65,9 +80,16 @@ class EthService(object):
         return start_block, end_block
 
 
+def get_timestamp_range_for_date(date):
+    start_datetime = datetime.combine(date, datetime.min.time().replace(tzinfo=timezone.utc))
+    end_datetime = datetime.combine(date, datetime.max.time().replace(tzinfo=timezone.utc))
+    return start_datetime.timestamp(), end_datetime.timestamp()
+
+
 class BlockTimestampGraph(object):
-    def __init__(self, web3):
+    def __init__(self, web3, batch_web3_provider=None):
         self._web3 = web3
+        self._batch_web3_provider = batch_web3_provider
 
     def get_first_point(self):
         # Ignore the genesis block as its timestamp is 0
@@ -79,6 +101,18 @@ class BlockTimestampGraph(object):
     def get_point(self, x):
         return block_to_point(self._web3.eth.getBlock(x))
 
+    def get_points(self, xs):
+        if self._batch_web3_provider is None:
+            return [self.get_point(x) for x in xs]
+
+        points = []
+        for block_numbers in batch_iterator(xs, BLOCK_BATCH_SIZE):
+            blocks_rpc = list(generate_get_block_by_number_json_rpc(block_numbers, False))
+            response = self._batch_web3_provider.make_batch_request(json_dumps_compact(blocks_rpc))
+            for block in rpc_response_batch_to_results(response):
+                points.append(Point(hex_to_dec(block['number']), hex_to_dec(block['timestamp'])))
+        return points
+
 
 def block_to_point(block):
     return Point(block.number, block.timestamp)
@@ -20,74 +20,189 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import logging
+import threading
 
-from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from eth_abi.encoding import TupleEncoder
+from eth_utils import function_signature_to_4byte_selector
+from web3._utils.abi import build_default_registry
 
+from blockchainetl.json_codec import json_dumps_compact
 from ethereumetl.domain.token import EthToken
-from ethereumetl.erc20_abi import ERC20_ABI, ERC20_ABI_ALTERNATIVE_1
+from ethereumetl.json_rpc_requests import generate_eth_call_json_rpc, generate_get_code_json_rpc
+from ethereumetl.service.eth_receipt_service import get_provider_key
+from ethereumetl.utils import batch_iterator, rpc_response_to_result
+
+# https://github.com/mds1/multicall, deployed at the same address on mainnet and most other chains
+MULTICALL3_ADDRESS = '0xca11bde05977b3631167028862be2a173976ca11'
+# Most nodes cap the number of requests in a single JSON RPC batch (geth defaults to 1000)
+DEFAULT_ETH_CALL_BATCH_SIZE = 500
+# The number of calls aggregated in one aggregate3 call. The calls share the eth_call gas cap and each of them
+# can use up to 63/64 of the remaining gas, so a call that exhausts its gas, e.g. a fallback function of an old token
+# that throws, leaves little gas to the calls after it. The calls that failed in aggregate3 are made again with eth_calls
+DEFAULT_MULTICALL_SIZE = 200
+
+# The token functions and the return types they are decoded with, in the fallback order of ERC20_ABI and
+# ERC20_ABI_ALTERNATIVE_1. Each function is called once and its result is decoded with each of its return types.
+SYMBOL_CANDIDATES = [('symbol()', 'string'), ('SYMBOL()', 'string'), ('symbol()', 'bytes32'), ('SYMBOL()', 'bytes32')]
+NAME_CANDIDATES = [('name()', 'string'), ('NAME()', 'string'), ('name()', 'bytes32'), ('NAME()', 'bytes32')]
+DECIMALS_CANDIDATES = [('decimals()', 'uint8'), ('DECIMALS()', 'uint8')]
+TOTAL_SUPPLY_CANDIDATES = [('totalSupply()', 'uint256')]
+
+TOKEN_FUNCTIONS = ['symbol()', 'SYMBOL()', 'name()', 'NAME()', 'decimals()', 'DECIMALS()', 'totalSupply()']
+# The functions that return the same token field
+TOKEN_FUNCTION_GROUPS = [['symbol()', 'SYMBOL()'], ['name()', 'NAME()'], ['decimals()', 'DECIMALS()'], ['totalSupply()']]
+TOKEN_FUNCTION_SELECTORS = {
+    function: '0x' + function_signature_to_4byte_selector(function).hex() for function in TOKEN_FUNCTIONS
+}
+
+# The same decoders web3 uses for contract function results, built once
+_abi_registry = build_default_registry()
+_RESULT_DECODERS = {
+    abi_type: TupleDecoder(decoders=[_abi_registry.get_decoder(abi_type)])
+    for abi_type in ['string', 'bytes32', 'uint8', 'uint256']
+}
+_AGGREGATE3_SELECTOR = function_signature_to_4byte_selector('aggregate3((address,bool,bytes)[])')
+_AGGREGATE3_ENCODER = TupleEncoder(encoders=[_abi_registry.get_encoder('(address,bool,bytes)[]')])
+_AGGREGATE3_DECODER = TupleDecoder(decoders=[_abi_registry.get_decoder('(bool,bytes)[]')])
+
+# Messages of the errors eth_calls fail with when the call fails in the EVM, e.g. the token doesn't implement the function
+EXECUTION_ERROR_MESSAGES = ['revert', 'invalid opcode', 'invalid jump', 'out of gas', 'stack underflow',
+                            'stack limit reached', 'write protection']
+# The JSON RPC error code geth uses for reverted eth_calls
+EXECUTION_REVERTED_ERROR_CODE = 3
+
+# Results of Multicall3 probing, keyed by provider endpoint
+_multicall_support = {}
+_multicall_support_lock = threading.Lock()
 
 logger = logging.getLogger('eth_token_service')
 
 
+# Token metadata is resolved for many tokens at a time: all the candidate calls of all tokens go in one JSON RPC
+# batch of eth_calls, or in aggregate3 calls to Multicall3 when it's deployed.
 class EthTokenService(object):
-    def __init__(self, web3, function_call_result_transformer=None):
-        self._web3 = web3
+    def __init__(
+            self,
+            batch_web3_provider,
+            function_call_result_transformer=None,
+            eth_call_batch_size=DEFAULT_ETH_CALL_BATCH_SIZE,
+            multicall_size=DEFAULT_MULTICALL_SIZE,
+            use_multicall=None):
+        """use_multicall=None probes the node for the Multicall3 contract"""
+        self._batch_web3_provider = batch_web3_provider
         self._function_call_result_transformer = function_call_result_transformer
+        self._eth_call_batch_size = eth_call_batch_size
+        self._multicall_size = multicall_size
+        self._use_multicall = use_multicall
 
     def get_token(self, token_address):
-        checksum_address = self._web3.toChecksumAddress(token_address)
-        contract = self._web3.eth.contract(
-            address=checksum_address, abi=ERC20_ABI)
-        contract_alternative_1 = self._web3.eth.contract(
-            address=checksum_address, abi=ERC20_ABI_ALTERNATIVE_1)
-
-        symbol = self._get_first_result(
-            contract.functions.symbol(),
-            contract.functions.SYMBOL(),
-            contract_alternative_1.functions.symbol(),
-            contract_alternative_1.functions.SYMBOL(),
-        )
-        if isinstance(symbol, bytes):
-            symbol = self._bytes_to_string(symbol)
-
-        name = self._get_first_result(
-            contract.functions.name(),
-            contract.functions.NAME(),
-            contract_alternative_1.functions.name(),
-            contract_alternative_1.functions.NAME(),
-        )
-        if isinstance(name, bytes):
-            name = self._bytes_to_string(name)
-
-        decimals = self._get_first_result(
-            contract.functions.decimals(), contract.functions.DECIMALS())
-        total_supply = self._get_first_result(contract.functions.totalSupply())
-
-        token = EthToken()
-        token.address = token_address
-        token.symbol = symbol
-        token.name = name
-        token.decimals = decimals
-        token.total_supply = total_supply
-
-        return token
-
-    def _get_first_result(self, *funcs):
-        for func in funcs:
-            result = self._call_contract_function(func)
+        return self.get_tokens([token_address])[0]
+
+    def get_tokens(self, token_addresses):
+        """Returns EthToken objects in the same order as token_addresses"""
+        token_addresses = list(token_addresses)
+        calls = [(token_address, TOKEN_FUNCTION_SELECTORS[function])
+                 for token_address in token_addresses for function in TOKEN_FUNCTIONS]
+        if len(calls) == 0:
+            return []
+
+        if self.is_multicall_supported():
+            results = self._multicall(calls)
+            # The fields that none of the calls in aggregate3 returned may be resolved with eth_calls,
+            # the calls could have failed for the lack of gas
+            failed_call_indexes = get_failed_field_call_indexes(len(token_addresses), results)
+            if failed_call_indexes:
+                logger.debug('Making {} calls that failed in aggregate3 with eth_calls'.format(
+                    len(failed_call_indexes)))
+                failed_call_results = self._eth_calls([calls[index] for index in failed_call_indexes])
+                for index, result in zip(failed_call_indexes, failed_call_results):
+                    results[index] = result
+        else:
+            results = self._eth_calls(calls)
+        return self._to_tokens(token_addresses, results)
+
+    def is_multicall_supported(self):
+        if self._use_multicall is None:
+            provider_key = get_provider_key(self._batch_web3_provider)
+            with _multicall_support_lock:
+                supported = _multicall_support.get(provider_key)
+                if supported is None:
+                    supported = self._probe_multicall()
+                    if provider_key is not None:
+                        _multicall_support[provider_key] = supported
+            self._use_multicall = supported
+        return self._use_multicall
+
+    def _eth_calls(self, calls):
+        """Returns the results of calls as bytes, or None for the calls that failed"""
+        results = []
+        for calls_batch in batch_iterator(calls, self._eth_call_batch_size):
+            results.extend(self._make_batch_request(list(generate_eth_call_json_rpc(calls_batch))))
+        return [hex_to_bytes(result) for result in results]
+
+    def _multicall(self, calls):
+        multicall_batches = list(batch_iterator(calls, self._multicall_size))
+        aggregate3_calls = [(MULTICALL3_ADDRESS, encode_aggregate3_call(calls_batch))
+                            for calls_batch in multicall_batches]
+
+        results = []
+        for calls_batch, aggregate3_result in zip(multicall_batches, self._eth_calls(aggregate3_calls)):
+            if aggregate3_result is None:
+                logger.debug('aggregate3 call failed, falling back to eth_calls for {} calls'.format(len(calls_batch)))
+                results.extend(self._eth_calls(calls_batch))
+            else:
+                results.extend(decode_aggregate3_result(aggregate3_result))
+        return results
+
+    def _make_batch_request(self, rpc):
+        response = self._batch_web3_provider.make_batch_request(json_dumps_compact(rpc))
+        responses_by_id = {response_item.get('id'): response_item for response_item in response}
+        return [get_call_result(responses_by_id.get(request['id'], {})) for request in rpc]
+
+    def _probe_multicall(self):
+        try:
+            code = self._make_batch_request(list(generate_get_code_json_rpc([MULTICALL3_ADDRESS])))[0]
+            supported = code is not None and code != '0x'
+        except Exception as e:
+            logger.debug('Multicall3 probe failed: {}'.format(e))
+            supported = False
+        logger.info('Multicall3 is {}deployed, fetching token metadata with {}.'.format(
+            '' if supported else 'not ', 'aggregate3 calls' if supported else 'eth_calls'))
+        return supported
+
+    def _to_tokens(self, token_addresses, results):
+        tokens = []
+        for index, token_address in enumerate(token_addresses):
+            results_by_function = dict(zip(
+                TOKEN_FUNCTIONS, results[index * len(TOKEN_FUNCTIONS):(index + 1) * len(TOKEN_FUNCTIONS)]))
+
+            token = EthToken()
+            token.address = token_address
+            token.symbol = self._bytes_to_string(self._get_first_result(results_by_function, SYMBOL_CANDIDATES))
+            token.name = self._bytes_to_string(self._get_first_result(results_by_function, NAME_CANDIDATES))
+            token.decimals = self._get_first_result(results_by_function, DECIMALS_CANDIDATES)
+            token.total_supply = self._get_first_result(results_by_function, TOTAL_SUPPLY_CANDIDATES)
+            tokens.append(token)
+        return tokens
+
+    def _get_first_result(self, results_by_function, candidates):
+        for function, abi_type in candidates:
+            result = self._decode_result(results_by_function[function], abi_type)
             if result is not None:
                 return result
         return None
 
-    def _call_contract_function(self, func):
-        # BadFunctionCallOutput exception happens if the token doesn't implement a particular function
-        # or was self-destructed
-        # OverflowError exception happens if the return type of the function doesn't match the expected type
-        result = call_contract_function(
-            func=func,
-            ignore_errors=(BadFunctionCallOutput, OverflowError,
-                           ValueError, ContractLogicError),
-            default_value=None)
+    def _decode_result(self, data, abi_type):
+        # Decoding fails if the token doesn't implement a particular function, was self-destructed
+        # or the return type of the function doesn't match the expected type
+        result = None
+        if data:
+            try:
+                result = _RESULT_DECODERS[abi_type](ContextFramesBytesIO(data))[0]
+            except Exception:
+                logger.debug('Failed to decode {} from {}. This exception can be safely ignored.'.format(
+                    abi_type, data.hex()), exc_info=True)
 
         if self._function_call_result_transformer is not None:
             return self._function_call_result_transformer(result)
@@ -95,7 +210,7 @@ class EthTokenService(object):
             return result
 
     def _bytes_to_string(self, b, ignore_errors=True):
-        if b is None:
+        if not isinstance(b, bytes):
             return b
 
         try:
@@ -113,14 +228,46 @@ class EthTokenService(object):
         return b
 
 
-def call_contract_function(func, ignore_errors, default_value=None):
-    try:
-        result = func.call()
-        return result
-    except Exception as ex:
-        if type(ex) in ignore_errors:
-            logger.debug('An exception occurred in function {} of contract {}. '.format(func.fn_name, func.address)
-                         + 'This exception can be safely ignored.', exc_info=True)
-            return default_value
-        else:
-            raise ex
+def get_call_result(response):
+    """Returns None if the call failed in the EVM and raises for other errors, e.g. rate limits or timeouts,
+    so that a token is not taken for a contract without metadata because of a transient error"""
+    error = response.get('error')
+    if response.get('result') is None and error is not None and is_execution_error(error):
+        # Errors, e.g. reverts, are expected for functions the token doesn't implement
+        return None
+    return rpc_response_to_result(response)
+
+
+def is_execution_error(error):
+    if error.get('code') == EXECUTION_REVERTED_ERROR_CODE:
+        return True
+    message = (error.get('message') or '').lower()
+    return any(execution_error_message in message for execution_error_message in EXECUTION_ERROR_MESSAGES)
+
+
+def get_failed_field_call_indexes(token_count, results):
+    """Returns the indexes of the calls for the token fields for which all the calls failed"""
+    failed_call_indexes = []
+    for token_index in range(token_count):
+        for functions in TOKEN_FUNCTION_GROUPS:
+            call_indexes = [token_index * len(TOKEN_FUNCTIONS) + TOKEN_FUNCTIONS.index(function)
+                            for function in functions]
+            if all(results[call_index] is None for call_index in call_indexes):
+                failed_call_indexes.extend(call_indexes)
+    return failed_call_indexes
+
+
+def encode_aggregate3_call(calls):
+    aggregate3_calls = [(to_address, True, hex_to_bytes(data)) for to_address, data in calls]
+    return '0x' + (_AGGREGATE3_SELECTOR + _AGGREGATE3_ENCODER([aggregate3_calls])).hex()
+
+
+def decode_aggregate3_result(data):
+    return [return_data if success else None
+            for success, return_data in _AGGREGATE3_DECODER(ContextFramesBytesIO(data))[0]]
+
+
+def hex_to_bytes(hex_string):
+    if hex_string is None:
+        return None
+    return bytes.fromhex(hex_string[2:] if hex_string.startswith('0x') else hex_string)
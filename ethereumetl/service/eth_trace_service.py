@@ -0,0 +1,122 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+import threading
+from collections import defaultdict
+
+from blockchainetl.json_codec import json_dumps_compact
+from ethereumetl.enumeration.trace_mode import TraceMode
+from ethereumetl.json_rpc_requests import generate_trace_block_json_rpc, generate_trace_filter_json_rpc
+from ethereumetl.misc.too_many_results_error import TooManyResultsError
+from ethereumetl.service.eth_log_service import is_too_many_results_error
+from ethereumetl.service.eth_receipt_service import get_provider_key, results_in_request_order
+from ethereumetl.utils import rpc_response_to_result
+
+# Results of trace mode probing, keyed by provider endpoint
+_trace_modes = {}
+_trace_modes_lock = threading.Lock()
+
+logger = logging.getLogger('EthTraceService')
+
+
+class EthTraceService(object):
+    def __init__(self, batch_web3_provider, trace_mode=None):
+        """trace_mode=None probes the node for the supported TraceMode"""
+        self._batch_web3_provider = batch_web3_provider
+        self._trace_mode = trace_mode
+
+    def get_block_traces(self, block_numbers):
+        """Returns a list of trace JSON dicts for each of block_numbers, in the same order"""
+        block_numbers = list(block_numbers)
+        if len(block_numbers) == 0:
+            return []
+
+        trace_mode = self.get_trace_mode(probe_block_number=block_numbers[0])
+        if trace_mode == TraceMode.FILTER:
+            return self._get_block_traces_by_filter(block_numbers)
+        elif trace_mode == TraceMode.BLOCK:
+            return self._make_batch_request(list(generate_trace_block_json_rpc(block_numbers)))
+        else:
+            return [self._make_batch_request(list(generate_trace_block_json_rpc([block_number])))[0]
+                    for block_number in block_numbers]
+
+    def get_trace_mode(self, probe_block_number=0):
+        if self._trace_mode is None:
+            provider_key = get_provider_key(self._batch_web3_provider)
+            with _trace_modes_lock:
+                trace_mode = _trace_modes.get(provider_key)
+                if trace_mode is None:
+                    trace_mode = self._probe_trace_mode(probe_block_number)
+                    if provider_key is not None:
+                        _trace_modes[provider_key] = trace_mode
+            self._trace_mode = trace_mode
+        return self._trace_mode
+
+    def _get_block_traces_by_filter(self, block_numbers):
+        traces_by_block = defaultdict(list)
+        for trace in self._get_traces_for_range(min(block_numbers), max(block_numbers)):
+            traces_by_block[trace.get('blockNumber')].append(trace)
+        return [traces_by_block[block_number] for block_number in block_numbers]
+
+    def _get_traces_for_range(self, from_block, to_block):
+        request = generate_trace_filter_json_rpc(from_block, to_block)
+        response = self._batch_web3_provider.make_batch_request(json_dumps_compact([request]))
+        response_item = response[0] if isinstance(response, list) else response
+        if not is_too_many_results_error(response_item.get('error')):
+            return rpc_response_to_result(response_item)
+        if from_block == to_block:
+            raise TooManyResultsError('Too many traces in block {}: {}'.format(from_block, response_item.get('error')))
+
+        middle_block = (from_block + to_block) // 2
+        logger.debug('Too many traces in blocks {}-{}, splitting the range at {}'.format(
+            from_block, to_block, middle_block))
+        return self._get_traces_for_range(from_block, middle_block) + \
+            self._get_traces_for_range(middle_block + 1, to_block)
+
+    def _make_batch_request(self, rpc):
+        response = self._batch_web3_provider.make_batch_request(json_dumps_compact(rpc))
+        return results_in_request_order(rpc, response)
+
+    def _probe_trace_mode(self, block_number):
+        # Batched trace_block is preferred as its results are per block and never truncated by response limits,
+        # trace_filter is tried next. Both are probed on the same block.
+        probes = [
+            (TraceMode.BLOCK, lambda: self._make_batch_request(
+                list(generate_trace_block_json_rpc([block_number, block_number])))),
+            (TraceMode.FILTER, lambda: [self._get_traces_for_range(block_number, block_number)]),
+        ]
+        trace_mode = TraceMode.SINGLE
+        for probe_trace_mode, probe in probes:
+            try:
+                if is_trace_probe_successful(probe()):
+                    trace_mode = probe_trace_mode
+                    break
+            except Exception as e:
+                logger.debug('{} trace mode probe failed: {}'.format(probe_trace_mode, e))
+        logger.info('Using {} trace mode.'.format(trace_mode))
+        return trace_mode
+
+
+def is_trace_probe_successful(results):
+    return all(isinstance(result, list) for result in results)
@@ -0,0 +1,54 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Geth callTracer returns a tree of calls for each transaction. The tree is walked with an explicit stack so that
+# deep call stacks don't hit the recursion limit.
+
+
+def flatten_geth_call_tree(transaction_trace):
+    """Yields (call, trace_address, status) for each call in the tree in the order of parity traces,
+    i.e. parents before their children. status is 0 if the call or any of its parents failed"""
+    stack = [(transaction_trace, [], 1)]
+    while stack:
+        call, trace_address, parent_status = stack.pop()
+        status = get_trace_status(call.get('error'), parent_status)
+        yield call, trace_address, status
+
+        calls = call.get('calls')
+        if calls:
+            # Pushed in reverse so that the first child is popped first
+            for call_index in range(len(calls) - 1, -1, -1):
+                stack.append((calls[call_index], trace_address + [call_index], status))
+
+
+def get_trace_status(error, parent_status=1):
+    # if a parent trace failed the child trace failed also
+    if parent_status == 0 or (error is not None and len(error) > 0):
+        return 0
+    return 1
+
+
+def is_contract_creation(call, status):
+    """True if the call created a contract that exists after the transaction"""
+    # CREATE vs CREATE2: https://blog.cotten.io/ethereums-eip-1014-create-2-d17b1a184498
+    return status == 1 and call.get('type', '').lower() in ('create', 'create2') and len(call.get('to') or '') > 0
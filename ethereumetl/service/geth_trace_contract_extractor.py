@@ -0,0 +1,59 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from ethereumetl.domain.contract import EthContract
+from ethereumetl.service.eth_contract_service import EthContractService
+from ethereumetl.service.geth_call_tree_flattener import flatten_geth_call_tree, is_contract_creation
+
+
+class EthGethTraceContractExtractor(object):
+    def __init__(self, contract_service=None):
+        self.contract_service = contract_service or EthContractService()
+
+    def extract_contracts(self, geth_trace):
+        """geth_trace is a dict with block_number and transaction_traces, as exported by ExportGethTracesJob"""
+        block_number = geth_trace['block_number']
+        contracts = []
+
+        # Geth returns traces as a tree starting with the top-level transactions
+        for transaction_trace in geth_trace['transaction_traces']:
+            for call, trace_address, status in flatten_geth_call_tree(transaction_trace):
+                if is_contract_creation(call, status):
+                    contracts.append(self._call_to_contract(call, block_number))
+
+        return contracts
+
+    def _call_to_contract(self, call, block_number):
+        contract = EthContract()
+        contract.address = call['to']
+        contract.block_number = block_number
+
+        bytecode = call.get('output')
+        contract.bytecode = bytecode
+
+        function_sighashes = self.contract_service.get_function_sighashes(bytecode)
+        contract.function_sighashes = function_sighashes
+        for flag, value in self.contract_service.classify_contract(function_sighashes, bytecode).items():
+            setattr(contract, flag, value)
+
+        return contract
@@ -21,19 +21,27 @@
 # SOFTWARE.
 
 
+from array import array
+from bisect import bisect_left
+
 from ethereumetl.utils import pairwise
 
+# The points around the interpolated x coordinate are requested at this fraction of the bounds
+# when the bounds for several y coordinates are found at once
+PREFETCH_SPAN_DIVISOR = 32
+
 
 class GraphOperations(object):
-    def __init__(self, graph):
-        """x axis on the graph must be integers, y value must increase strictly monotonically with increase of x"""
+    def __init__(self, graph, point_index=None):
+        """x axis on the graph must be integers, y value must increase strictly monotonically with increase of x.
+        point_index caches the points requested from the graph, it can be shared or persistent"""
         self._graph = graph
-        self._cached_points = []
+        self._cached_points = point_index if point_index is not None else PointIndex()
 
     def get_bounds_for_y_coordinate(self, y):
         """given the y coordinate, outputs a pair of x coordinates for closest points that bound the y coordinate.
         Left and right bounds are equal in case given y is equal to one of the points y coordinate"""
-        initial_bounds = find_best_bounds(y, self._cached_points)
+        initial_bounds = self._cached_points.find_bounds(y)
         if initial_bounds is None:
             initial_bounds = self._get_first_point(), self._get_last_point()
 
@@ -86,22 +94,89 @@ class GraphOperations(object):
 
             return self._get_bounds_for_y_coordinate_recursive(y, *bounds)
 
+    def prefetch_bounds_for_y_coordinates(self, ys):
+        """Finds the bounds for all the y coordinates at once, so that get_bounds_for_y_coordinate returns them
+        from the cache. The points of each step of the search are requested from the graph in one call"""
+        ys = sorted(set(ys))
+        if any(self._cached_points.find_bounds(y) is None for y in ys):
+            self._get_first_point()
+            self._get_last_point()
+
+        previous_spans = {}
+        while True:
+            xs = set()
+            for y in ys:
+                bounds = self._cached_points.find_bounds(y)
+                if bounds is None:
+                    # Out of bounds, it's raised by get_bounds_for_y_coordinate
+                    continue
+                start, end = bounds
+                span = end.x - start.x
+                if start.y == y or end.y == y or span <= 1:
+                    continue
+
+                previous_span = previous_spans.get(y)
+                if previous_span is not None and span > previous_span // 2:
+                    # The interpolation didn't narrow down the bounds, fall back to the binary search
+                    xs.add((start.x + end.x) // 2)
+                else:
+                    # The points on both sides of the estimation bound y closely if the graph is close to linear
+                    estimation_x = interpolate(start, end, y)
+                    delta = max(1, span // PREFETCH_SPAN_DIVISOR)
+                    for x in (estimation_x - delta, estimation_x, estimation_x + delta):
+                        xs.add(bound(x, (start.x, end.x)))
+                previous_spans[y] = span
+
+            if not xs:
+                break
+            for point in self._graph.get_points(sorted(xs)):
+                self._cached_points.add(point)
+
     def _get_point(self, x):
         point = self._graph.get_point(x)
-        self._cached_points.append(point)
+        self._cached_points.add(point)
         return point
 
     def _get_first_point(self):
         point = self._graph.get_first_point()
-        self._cached_points.append(point)
+        self._cached_points.add(point)
         return point
 
     def _get_last_point(self):
         point = self._graph.get_last_point()
-        self._cached_points.append(point)
+        self._cached_points.add(point)
         return point
 
 
+# Points sorted by the x coordinate, and so by the y coordinate, in compact arrays
+class PointIndex(object):
+    def __init__(self):
+        self._xs = array('q')
+        self._ys = array('q')
+
+    def add(self, point):
+        """Returns False if there is a point with the same x coordinate already"""
+        index = bisect_left(self._xs, point.x)
+        if index < len(self._xs) and self._xs[index] == point.x:
+            return False
+        self._xs.insert(index, point.x)
+        self._ys.insert(index, point.y)
+        return True
+
+    def find_bounds(self, y):
+        """Same as find_best_bounds for the points in the index, the bounds are equal if a point has the y coordinate"""
+        index = bisect_left(self._ys, y)
+        if index < len(self._ys) and self._ys[index] == y:
+            point = Point(self._xs[index], self._ys[index])
+            return point, point
+        if index == 0 or index == len(self._ys):
+            return None
+        return Point(self._xs[index - 1], self._ys[index - 1]), Point(self._xs[index], self._ys[index])
+
+    def __len__(self):
+        return len(self._xs)
+
+
 def find_best_bounds(y, points):
     sorted_points = sorted(points, key=lambda point: point.y)
     for point1, point2 in pairwise(sorted_points):
@@ -0,0 +1,142 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from ethereumetl.domain.token import EthToken
+
+DEFAULT_MAX_MEMORY_ENTRIES = 100000
+# Stored instead of NULL for tokens requested without a block number, NULLs are distinct in a primary key
+NO_BLOCK_NUMBER = -1
+
+_CREATE_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS tokens (
+    address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    symbol TEXT,
+    name TEXT,
+    decimals INTEGER,
+    total_supply TEXT,
+    PRIMARY KEY (address, block_number)
+)'''
+
+
+# Token metadata resolved from the node, keyed by token address and the block number the token was exported for.
+# Entries are kept in SQLite with an LRU in memory in front of it. Addresses that turned out not to be tokens
+# are stored too (all metadata is NULL), so that they aren't queried again either.
+class TokenMetadataCache:
+    def __init__(self, path, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self._memory_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The connection is shared by all threads, access is serialized with self._lock
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        # WAL lets parallel export processes read while another one writes
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(_CREATE_TABLE_SQL)
+        self._connection.commit()
+
+    def get_tokens(self, keys):
+        """keys is a list of (address, block_number) tuples. Returns EthToken objects in the same order,
+        None for the keys that are not cached"""
+        keys = [_normalize_key(key) for key in keys]
+        rows = {}
+        with self._lock:
+            for key in keys:
+                row = self._memory_cache.get(key)
+                if row is not None:
+                    self._memory_cache.move_to_end(key)
+                else:
+                    row = self._connection.execute(
+                        'SELECT symbol, name, decimals, total_supply FROM tokens '
+                        'WHERE address = ? AND block_number = ?', key).fetchone()
+                    if row is not None:
+                        self._remember(key, row)
+                rows[key] = row
+        return [row_to_token(key, rows[key]) if rows[key] is not None else None for key in keys]
+
+    def put_tokens(self, keys_and_tokens):
+        """keys_and_tokens is a list of ((address, block_number), EthToken) tuples"""
+        rows = []
+        with self._lock:
+            for key, token in keys_and_tokens:
+                key = _normalize_key(key)
+                row = token_to_row(token)
+                self._remember(key, row)
+                rows.append(key + row)
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO tokens (address, block_number, symbol, name, decimals, total_supply) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _remember(self, key, row):
+        self._memory_cache[key] = row
+        self._memory_cache.move_to_end(key)
+        if len(self._memory_cache) > self.max_memory_entries:
+            self._memory_cache.popitem(last=False)
+
+
+_token_metadata_caches = {}
+_token_metadata_caches_lock = threading.Lock()
+
+
+def get_token_metadata_cache(path):
+    with _token_metadata_caches_lock:
+        if path not in _token_metadata_caches:
+            _token_metadata_caches[path] = TokenMetadataCache(path)
+        return _token_metadata_caches[path]
+
+
+def _normalize_key(key):
+    address, block_number = key
+    return address.lower(), NO_BLOCK_NUMBER if block_number is None else int(block_number)
+
+
+def token_to_row(token):
+    # total_supply doesn't fit into an SQLite INTEGER
+    total_supply = str(token.total_supply) if token.total_supply is not None else None
+    return token.symbol, token.name, token.decimals, total_supply
+
+
+def row_to_token(key, row):
+    symbol, name, decimals, total_supply = row
+    token = EthToken()
+    token.address = key[0]
+    token.symbol = symbol
+    token.name = name
+    token.decimals = decimals
+    token.total_supply = int(total_supply) if total_supply is not None else None
+    token.block_number = key[1] if key[1] != NO_BLOCK_NUMBER else None
+    return token
@@ -22,14 +22,13 @@
 
 from collections import defaultdict
 
+from ethereumetl.service.geth_call_tree_flattener import get_trace_status
+
 
 def calculate_trace_statuses(traces):
     # set default values
     for trace in traces:
-        if trace.error is not None and len(trace.error) > 0:
-            trace.status = 0
-        else:
-            trace.status = 1
+        trace.status = get_trace_status(trace.error)
 
     # group by transaction
     grouped_transaction_traces = defaultdict(list)
@@ -47,22 +46,13 @@ def calculate_trace_statuses(traces):
 def calculate_trace_statuses_for_single_transaction(all_traces):
     """O(n * log(n))"""
     sorted_traces = sorted(all_traces, key=lambda trace: len(trace.trace_address or []))
-    indexed_traces = {trace_address_to_str(trace.trace_address): trace for trace in sorted_traces}
+    indexed_traces = {tuple(trace.trace_address or ()): trace for trace in sorted_traces}
 
-    # if a parent trace failed the child trace set failed also. Because of the sorting order all parent trace statuses
-    # are calculated before child trace statuses.
+    # Because of the sorting order all parent trace statuses are calculated before child trace statuses.
     for trace in sorted_traces:
-        if len(trace.trace_address) > 0:
-            parent_trace = indexed_traces.get(trace_address_to_str(trace.trace_address[:-1]))
+        if trace.trace_address:
+            parent_trace = indexed_traces.get(tuple(trace.trace_address[:-1]))
             if parent_trace is None:
                 raise ValueError('A parent trace for trace with trace_address {} in transaction {} is not found'
                                  .format(trace.trace_address, trace.transaction_hash))
-            if parent_trace.status == 0:
-                trace.status = 0
-
-
-def trace_address_to_str(trace_address):
-    if trace_address is None or len(trace_address) == 0:
-        return ''
-
-    return ','.join([str(address_point) for address_point in trace_address])
+            trace.status = get_trace_status(trace.error, parent_trace.status)
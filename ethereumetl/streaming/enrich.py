@@ -24,37 +24,69 @@
 import itertools
 from collections import defaultdict
 
+from ethereumetl.service.contract_standards import get_contract_standard_flags
+
+
+# Items grouped by the value of a field. Built once and shared by the lookups and joins on that field
+# instead of scanning the items for every lookup.
+class ItemIndex(object):
+    def __init__(self, items, key_field):
+        self.key_field = key_field
+        self._items_by_key = defaultdict(list)
+        for item in items:
+            self._items_by_key[item.get(key_field)].append(item)
+
+    def get(self, key):
+        """Returns the list of items with the key, empty if there are none"""
+        return self._items_by_key.get(key, [])
+
+    def get_first(self, key, default=None):
+        items = self._items_by_key.get(key)
+        return items[0] if items else default
+
+    def keys(self):
+        return self._items_by_key.keys()
+
+
+def index_items(items, key_field):
+    """Returns items if it's already an ItemIndex on key_field"""
+    if isinstance(items, ItemIndex) and items.key_field == key_field:
+        return items
+    return ItemIndex(items, key_field)
+
+
+def field_list_to_dict(field_list):
+    result_dict = {}
+    for field in field_list:
+        if isinstance(field, tuple):
+            result_dict[field[0]] = field[1]
+        else:
+            result_dict[field] = field
+    return result_dict
+
 
 def join(left, right, join_fields, left_fields, right_fields):
+    """left and right are lists of items or ItemIndex built on the join field"""
     left_join_field, right_join_field = join_fields
 
-    def field_list_to_dict(field_list):
-        result_dict = {}
-        for field in field_list:
-            if isinstance(field, tuple):
-                result_dict[field[0]] = field[1]
-            else:
-                result_dict[field] = field
-        return result_dict
-
     left_fields_as_dict = field_list_to_dict(left_fields)
     right_fields_as_dict = field_list_to_dict(right_fields)
 
-    left_map = defaultdict(list)
-    for item in left: left_map[item[left_join_field]].append(item)
+    left_index = index_items(left, left_join_field)
+    right_index = index_items(right, right_join_field)
 
-    right_map = defaultdict(list)
-    for item in right: right_map[item[right_join_field]].append(item)
+    for key in left_index.keys():
+        for left_item, right_item in itertools.product(left_index.get(key), right_index.get(key)):
+            yield join_items(left_item, right_item, left_fields_as_dict, right_fields_as_dict)
 
-    for key in left_map.keys():
-        for left_item, right_item in itertools.product(left_map[key], right_map[key]):
-            result_item = {}
-            for src_field, dst_field in left_fields_as_dict.items():
-                result_item[dst_field] = left_item.get(src_field)
-            for src_field, dst_field in right_fields_as_dict.items():
-                result_item[dst_field] = right_item.get(src_field)
 
-            yield result_item
+def join_items(left_item, right_item, left_fields_as_dict, right_fields_as_dict):
+    result_item = {}
+    for src_field, dst_field in left_fields_as_dict.items():
+        result_item[dst_field] = left_item.get(src_field)
+    for src_field, dst_field in right_fields_as_dict.items():
+        result_item[dst_field] = right_item.get(src_field)
+    return result_item
 
 
 def enrich_transactions(transactions, receipts):
@@ -93,23 +125,29 @@ def enrich_transactions(transactions, receipts):
     return result
 
 
+LOG_FIELDS = [
+    'type',
+    'log_index',
+    'transaction_hash',
+    'transaction_index',
+    'address',
+    'data',
+    'topics',
+    'block_number'
+]
+
+# The fields items are enriched with when joined on their block
+BLOCK_FIELDS = [
+    ('timestamp', 'block_timestamp'),
+    ('hash', 'block_hash'),
+]
+
+
 def enrich_logs(blocks, logs):
     result = list(join(
         logs, blocks, ('block_number', 'number'),
-        [
-            'type',
-            'log_index',
-            'transaction_hash',
-            'transaction_index',
-            'address',
-            'data',
-            'topics',
-            'block_number'
-        ],
-        [
-            ('timestamp', 'block_timestamp'),
-            ('hash', 'block_hash'),
-        ]))
+        LOG_FIELDS,
+        BLOCK_FIELDS))
 
     if len(result) != len(logs):
         raise ValueError('The number of logs is wrong ' + str(result))
@@ -185,8 +223,7 @@ def enrich_contracts(blocks, contracts):
             'address',
             'bytecode',
             'function_sighashes',
-            'is_erc20',
-            'is_erc721',
+        ] + get_contract_standard_flags() + [
             'block_number'
         ],
         [
@@ -221,3 +258,12 @@ def enrich_tokens(blocks, tokens):
         raise ValueError('The number of tokens is wrong ' + str(result))
 
     return result
+
+
+_LOG_FIELDS_AS_DICT = field_list_to_dict(LOG_FIELDS)
+_BLOCK_FIELDS_AS_DICT = field_list_to_dict(BLOCK_FIELDS)
+
+
+def enrich_log(block, log):
+    """Same as enrich_logs for a single log, for logs that are enriched as they are exported"""
+    return join_items(log, block, _LOG_FIELDS_AS_DICT, _BLOCK_FIELDS_AS_DICT)
@@ -2,18 +2,19 @@ import logging
 
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
+from blockchainetl.json_codec import json_dumps_compact
 from ethereumetl.enumeration.entity_type import EntityType
 from ethereumetl.jobs.export_blocks_job import ExportBlocksJob
-from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
 from ethereumetl.jobs.export_traces_job import ExportTracesJob
 from ethereumetl.jobs.extract_contracts_job import ExtractContractsJob
 from ethereumetl.jobs.extract_token_transfers_job import ExtractTokenTransfersJob
 from ethereumetl.jobs.extract_tokens_job import ExtractTokensJob
+from ethereumetl.json_rpc_requests import generate_get_block_by_number_json_rpc
 from ethereumetl.streaming.enrich import enrich_transactions, enrich_logs, enrich_token_transfers, enrich_traces, \
-    enrich_contracts, enrich_tokens
+    enrich_contracts, enrich_tokens, ItemIndex
 from ethereumetl.streaming.eth_item_id_calculator import EthItemIdCalculator
 from ethereumetl.streaming.eth_item_timestamp_calculator import EthItemTimestampCalculator
-from ethereumetl.thread_local_proxy import ThreadLocalProxy
+from ethereumetl.utils import hex_to_dec, rpc_response_batch_to_results
 from ethereumetl.web3_utils import build_web3
 
 
@@ -24,12 +25,14 @@ class EthStreamerAdapter:
             item_exporter=ConsoleItemExporter(),
             batch_size=100,
             max_workers=5,
-            entity_types=tuple(EntityType.ALL_FOR_STREAMING)):
+            entity_types=tuple(EntityType.ALL_FOR_STREAMING),
+            token_metadata_cache=None):
         self.batch_web3_provider = batch_web3_provider
         self.item_exporter = item_exporter
         self.batch_size = batch_size
         self.max_workers = max_workers
         self.entity_types = entity_types
+        self.token_metadata_cache = token_metadata_cache
         self.item_id_calculator = EthItemIdCalculator()
         self.item_timestamp_calculator = EthItemTimestampCalculator()
 
@@ -41,15 +44,17 @@ class EthStreamerAdapter:
         return int(w3.eth.getBlock("latest").number)
 
     def export_all(self, start_block, end_block):
-        # Export blocks and transactions
-        blocks, transactions = [], []
-        if self._should_export(EntityType.BLOCK) or self._should_export(EntityType.TRANSACTION):
-            blocks, transactions = self._export_blocks_and_transactions(start_block, end_block)
-
-        # Export receipts and logs
-        receipts, logs = [], []
-        if self._should_export(EntityType.RECEIPT) or self._should_export(EntityType.LOG):
-            receipts, logs = self._export_receipts_and_logs(transactions)
+        self.export_items(self.fetch_all(start_block, end_block))
+
+    def fetch_all(self, start_block, end_block):
+        """Returns the enriched items of the blocks, in the order they are exported. Blocks are returned even if
+        they are not exported, the streamer checks their hashes to detect chain reorganizations"""
+        # Export blocks, transactions, receipts and logs in a single fetch stage
+        blocks, transactions, receipts, logs = [], [], [], []
+        if self._should_export(EntityType.BLOCK) or self._should_export(EntityType.TRANSACTION) \
+                or self._should_export(EntityType.RECEIPT) or self._should_export(EntityType.LOG):
+            blocks, transactions, receipts, logs = self._export_blocks_transactions_receipts_and_logs(
+                start_block, end_block)
 
         # Extract token transfers
         token_transfers = []
@@ -71,23 +76,22 @@ class EthStreamerAdapter:
         if self._should_export(EntityType.TOKEN):
             tokens = self._extract_tokens(contracts)
 
-        enriched_blocks = blocks \
-            if EntityType.BLOCK in self.entity_types else []
+        # The index is shared by the enrichments that join on the blocks
+        blocks_index = ItemIndex(blocks, 'number')
+        enriched_blocks = blocks
         enriched_transactions = enrich_transactions(transactions, receipts) \
             if EntityType.TRANSACTION in self.entity_types else []
-        enriched_logs = enrich_logs(blocks, logs) \
+        enriched_logs = enrich_logs(blocks_index, logs) \
             if EntityType.LOG in self.entity_types else []
-        enriched_token_transfers = enrich_token_transfers(blocks, token_transfers) \
+        enriched_token_transfers = enrich_token_transfers(blocks_index, token_transfers) \
             if EntityType.TOKEN_TRANSFER in self.entity_types else []
-        enriched_traces = enrich_traces(blocks, traces) \
+        enriched_traces = enrich_traces(blocks_index, traces) \
             if EntityType.TRACE in self.entity_types else []
-        enriched_contracts = enrich_contracts(blocks, contracts) \
+        enriched_contracts = enrich_contracts(blocks_index, contracts) \
             if EntityType.CONTRACT in self.entity_types else []
-        enriched_tokens = enrich_tokens(blocks, tokens) \
+        enriched_tokens = enrich_tokens(blocks_index, tokens) \
             if EntityType.TOKEN in self.entity_types else []
 
-        logging.info('Exporting with ' + type(self.item_exporter).__name__)
-
         all_items = \
             sort_by(enriched_blocks, 'number') + \
             sort_by(enriched_transactions, ('block_number', 'transaction_index')) + \
@@ -100,40 +104,49 @@ class EthStreamerAdapter:
         self.calculate_item_ids(all_items)
         self.calculate_item_timestamps(all_items)
 
-        self.item_exporter.export_items(all_items)
+        return all_items
 
-    def _export_blocks_and_transactions(self, start_block, end_block):
-        blocks_and_transactions_item_exporter = InMemoryItemExporter(item_types=['block', 'transaction'])
-        blocks_and_transactions_job = ExportBlocksJob(
+    def export_items(self, items):
+        if EntityType.BLOCK not in self.entity_types:
+            items = [item for item in items if item.get('type') != 'block']
+        logging.info('Exporting with ' + type(self.item_exporter).__name__)
+        self.item_exporter.export_items(items)
+
+    def get_block_hashes(self, block_numbers):
+        blocks_rpc = list(generate_get_block_by_number_json_rpc(block_numbers, False))
+        response = self.batch_web3_provider.make_batch_request(json_dumps_compact(blocks_rpc))
+        return {hex_to_dec(block['number']): block['hash'] for block in rpc_response_batch_to_results(response)}
+
+    def create_block_retraction_items(self, blocks):
+        """Items that tell the outputs to delete the items of the orphaned blocks"""
+        items = [{
+            'type': 'block_retraction',
+            'block_number': number,
+            'block_hash': block_hash,
+        } for number, block_hash, _ in blocks]
+        self.calculate_item_ids(items)
+        return items
+
+    def _export_blocks_transactions_receipts_and_logs(self, start_block, end_block):
+        exporter = InMemoryItemExporter(item_types=['block', 'transaction', 'receipt', 'log'])
+        job = ExportBlocksJob(
             start_block=start_block,
             end_block=end_block,
             batch_size=self.batch_size,
             batch_web3_provider=self.batch_web3_provider,
             max_workers=self.max_workers,
-            item_exporter=blocks_and_transactions_item_exporter,
-            export_blocks=self._should_export(EntityType.BLOCK),
-            export_transactions=self._should_export(EntityType.TRANSACTION)
-        )
-        blocks_and_transactions_job.run()
-        blocks = blocks_and_transactions_item_exporter.get_items('block')
-        transactions = blocks_and_transactions_item_exporter.get_items('transaction')
-        return blocks, transactions
-
-    def _export_receipts_and_logs(self, transactions):
-        exporter = InMemoryItemExporter(item_types=['receipt', 'log'])
-        job = ExportReceiptsJob(
-            transaction_hashes_iterable=(transaction['hash'] for transaction in transactions),
-            batch_size=self.batch_size,
-            batch_web3_provider=self.batch_web3_provider,
-            max_workers=self.max_workers,
             item_exporter=exporter,
+            export_blocks=self._should_export(EntityType.BLOCK),
+            export_transactions=self._should_export(EntityType.TRANSACTION),
             export_receipts=self._should_export(EntityType.RECEIPT),
             export_logs=self._should_export(EntityType.LOG)
         )
         job.run()
+        blocks = exporter.get_items('block')
+        transactions = exporter.get_items('transaction')
         receipts = exporter.get_items('receipt')
         logs = exporter.get_items('log')
-        return receipts, logs
+        return blocks, transactions, receipts, logs
 
     def _extract_token_transfers(self, logs):
         exporter = InMemoryItemExporter(item_types=['token_transfer'])
@@ -152,7 +165,7 @@ class EthStreamerAdapter:
             start_block=start_block,
             end_block=end_block,
             batch_size=self.batch_size,
-            web3=ThreadLocalProxy(lambda: build_web3(self.batch_web3_provider)),
+            batch_web3_provider=self.batch_web3_provider,
             max_workers=self.max_workers,
             item_exporter=exporter
         )
@@ -176,9 +189,10 @@ class EthStreamerAdapter:
         exporter = InMemoryItemExporter(item_types=['token'])
         job = ExtractTokensJob(
             contracts_iterable=contracts,
-            web3=ThreadLocalProxy(lambda: build_web3(self.batch_web3_provider)),
+            batch_web3_provider=self.batch_web3_provider,
             max_workers=self.max_workers,
-            item_exporter=exporter
+            item_exporter=exporter,
+            token_metadata_cache=self.token_metadata_cache
         )
         job.run()
         tokens = exporter.get_items('token')
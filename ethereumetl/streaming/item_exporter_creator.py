@@ -45,6 +45,7 @@ def create_item_exporter(output):
                 'trace': output + '.traces',
                 'contract': output + '.contracts',
                 'token': output + '.tokens',
+                'block_retraction': output + '.block_retractions',
             },
             message_attributes=('item_id', 'item_timestamp'),
             batch_max_bytes=1024 * 1024 * 5,
@@ -53,14 +54,19 @@ def create_item_exporter(output):
             enable_message_ordering=enable_message_ordering)
     elif item_exporter_type == ItemExporterType.POSTGRES:
         from blockchainetl.jobs.exporters.postgres_item_exporter import PostgresItemExporter
-        from blockchainetl.streaming.postgres_utils import create_insert_statement_for_table
+        from blockchainetl.streaming.postgres_utils import create_insert_statement_for_table, \
+            create_delete_statements_for_block_hash
         from blockchainetl.jobs.exporters.converters.unix_timestamp_item_converter import UnixTimestampItemConverter
         from blockchainetl.jobs.exporters.converters.int_to_decimal_item_converter import IntToDecimalItemConverter
         from blockchainetl.jobs.exporters.converters.list_field_item_converter import ListFieldItemConverter
-        from ethereumetl.streaming.postgres_tables import BLOCKS, TRANSACTIONS, LOGS, TOKEN_TRANSFERS, TRACES, TOKENS, CONTRACTS
+        from ethereumetl.streaming.postgres_tables import BLOCKS, TRANSACTIONS, LOGS, TOKEN_TRANSFERS, TRACES, TOKENS, \
+            CONTRACT_CREATIONS as CONTRACTS
 
         item_exporter = PostgresItemExporter(
             output, item_type_to_insert_stmt_mapping={
+                # Items of orphaned blocks are deleted before the items of the blocks that replaced them are inserted
+                'block_retraction': create_delete_statements_for_block_hash(
+                    BLOCKS, [TRANSACTIONS, LOGS, TOKEN_TRANSFERS, TRACES, CONTRACTS]),
                 'block': create_insert_statement_for_table(BLOCKS),
                 'transaction': create_insert_statement_for_table(TRANSACTIONS),
                 'log': create_insert_statement_for_table(LOGS),
@@ -87,6 +93,7 @@ def create_item_exporter(output):
             'trace': 'traces',
             'contract': 'contracts',
             'token': 'tokens',
+            'block_retraction': 'block_retractions',
         })
 
     else:
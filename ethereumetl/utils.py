@@ -72,6 +72,10 @@ def rpc_response_batch_to_results(response):
         yield rpc_response_to_result(response_item)
 
 
+def rpc_response_batch_to_results_by_id(response):
+    return {response_item.get('id'): rpc_response_to_result(response_item) for response_item in response}
+
+
 def rpc_response_to_result(response):
     result = response.get('result')
     if result is None:
@@ -110,6 +114,10 @@ def split_to_batches(start_incl, end_incl, batch_size):
         yield batch_start, batch_end
 
 
+def batch_iterator(iterable, batch_size):
+    return dynamic_batch_iterator(iterable, lambda: batch_size)
+
+
 def dynamic_batch_iterator(iterable, batch_size_getter):
     batch = []
     batch_size = batch_size_getter()
@@ -39,7 +39,6 @@ setup(
         # TODO: This has to be removed when "ModuleNotFoundError: No module named 'eth_utils.toolz'" is fixed at eth-abi
         'python-dateutil>=2.8.0,<3',
         'click==8.1.2',
-        'ethereum-dasm==0.1.5',
         'base58',
         'requests'
     ],
@@ -55,6 +54,12 @@ setup(
             # that's why  we lock the version here
             'libcst==0.3.21'
         ],
+        'orjson': [
+            'orjson>=3.6,<4'
+        ],
+        'async': [
+            'aiohttp>=3.7.4.post0,<4'
+        ],
         'dev': [
             'pytest~=4.3.0'
         ]
@@ -0,0 +1,55 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from blockchainetl.jobs.exporters.buffered_item_exporter import BufferedItemExporter
+from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
+
+
+class CountingItemExporter(InMemoryItemExporter):
+    def __init__(self, item_types):
+        super().__init__(item_types)
+        self.export_items_calls = 0
+        self.closed = False
+
+    def export_items(self, items):
+        self.export_items_calls += 1
+        for item in items:
+            self.export_item(item)
+
+    def close(self):
+        self.closed = True
+
+
+def test_buffered_item_exporter_flushes_full_buffers_and_the_rest_on_close():
+    item_exporter = CountingItemExporter(item_types=['block'])
+    buffered_exporter = BufferedItemExporter(item_exporter, buffer_size=2)
+    buffered_exporter.open()
+    buffered_exporter.export_items([{'type': 'block', 'number': number} for number in range(5)])
+
+    assert item_exporter.export_items_calls == 2
+    assert len(item_exporter.get_items('block')) == 4
+
+    buffered_exporter.close()
+
+    assert item_exporter.closed
+    assert item_exporter.export_items_calls == 3
+    assert [block['number'] for block in item_exporter.get_items('block')] == [0, 1, 2, 3, 4]
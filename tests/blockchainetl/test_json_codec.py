@@ -0,0 +1,87 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+from decimal import Decimal
+from json import JSONEncoder
+
+import pytest
+
+import blockchainetl.json_codec
+from blockchainetl.exporters import EncodeDecimal
+from blockchainetl.json_codec import iter_json_array_items, json_dumps, json_dumps_bytes, json_loads
+
+ITEMS = [
+    {},
+    {'type': 'transaction', 'hash': '0x' + 'a' * 64, 'nonce': 1, 'to_address': None, 'value': 10 ** 18},
+    {'type': 'log', 'topics': ['0x' + 'b' * 64, '0x' + 'c' * 64], 'data': '0x'},
+    {'topics': []},
+    {'value': 10 ** 24},
+    {'value': -2 ** 70},
+    {'name': 'Token, with: separators'},
+    {'name': 'Non-ASCII tökén'},
+    {'name': 'Control \x01\x1f\x7f \\ " characters'},
+    {'decimals': Decimal('1.123456789')},
+    {'nested': {'a': [1, 2]}},
+    {'floats': [1.5, 1e16]},
+]
+
+
+@pytest.fixture(params=[True, False], ids=['orjson', 'json'])
+def codec(request, monkeypatch):
+    if request.param:
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(blockchainetl.json_codec, 'orjson', None)
+
+
+@pytest.mark.parametrize('item', ITEMS)
+def test_json_dumps(codec, item):
+    encoder = JSONEncoder(default=EncodeDecimal)
+    assert json_dumps(item, encoder) == encoder.encode(item)
+    assert json_dumps_bytes(item, encoder) == encoder.encode(item).encode('utf-8')
+
+
+@pytest.mark.parametrize('item', ITEMS)
+def test_json_loads(codec, item):
+    data = json.dumps(item, default=str)
+    assert json_loads(data) == json.loads(data)
+    assert json_loads(data.encode('utf-8')) == json.loads(data)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1024])
+def test_iter_json_array_items(codec, chunk_size):
+    items = ITEMS[:4] + ITEMS[6:9] + [{'output': 'escaped \\" quote ] } , ['}, [1, [2, {}]], 'string', 1, None, []]
+    data = json.dumps(items, indent=1, ensure_ascii=False).encode('utf-8')
+    chunks = (data[start:start + chunk_size] for start in range(0, len(data), chunk_size))
+    assert list(iter_json_array_items(chunks)) == items
+
+
+def test_iter_json_array_items_not_array(codec):
+    assert list(iter_json_array_items([' {"error": ', '{"code": -32000}}'])) == [{'error': {'code': -32000}}]
+    assert list(iter_json_array_items(['[', ' ]'])) == []
+
+
+def test_iter_json_array_items_truncated(codec):
+    with pytest.raises(ValueError):
+        list(iter_json_array_items(['[{"id": 1}, {"id"']))
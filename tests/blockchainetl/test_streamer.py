@@ -0,0 +1,185 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import pytest
+
+from blockchainetl.streaming.block_hash_ring_buffer import BlockHashRingBuffer
+from blockchainetl.streaming.reorg_too_deep_error import ReorgTooDeepError
+from blockchainetl.streaming.streamer import Streamer, read_last_synced_block
+from blockchainetl.streaming.streamer_adapter_stub import StreamerAdapterStub
+
+
+class MockStreamerAdapter(StreamerAdapterStub):
+    def __init__(self, current_block, failing_exports=0):
+        self.current_block = current_block
+        self.failing_exports = failing_exports
+        self.fetched_ranges = []
+        self.exported_ranges = []
+
+    def get_current_block_number(self):
+        return self.current_block
+
+    def fetch_all(self, start_block, end_block):
+        self.fetched_ranges.append((start_block, end_block))
+        return [(start_block, end_block)]
+
+    def export_items(self, items):
+        if self.failing_exports > 0:
+            self.failing_exports -= 1
+            raise ValueError('Export failed')
+        self.exported_ranges.extend(items)
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_streamer(tmpdir, pipeline):
+    last_synced_block_file = str(tmpdir.join('last_synced_block.txt'))
+    adapter = MockStreamerAdapter(current_block=100)
+    streamer = Streamer(
+        blockchain_streamer_adapter=adapter,
+        last_synced_block_file=last_synced_block_file,
+        start_block=1,
+        end_block=35,
+        block_batch_size=10,
+        retry_errors=False,
+        pipeline=pipeline)
+    streamer.stream()
+
+    assert adapter.exported_ranges == [(1, 10), (11, 20), (21, 30), (31, 35)]
+    assert read_last_synced_block(last_synced_block_file) == 35
+
+
+def test_streamer_pipeline_fetches_again_after_failed_export(tmpdir):
+    last_synced_block_file = str(tmpdir.join('last_synced_block.txt'))
+    adapter = MockStreamerAdapter(current_block=100, failing_exports=1)
+    streamer = Streamer(
+        blockchain_streamer_adapter=adapter,
+        last_synced_block_file=last_synced_block_file,
+        start_block=1,
+        end_block=30,
+        period_seconds=0,
+        block_batch_size=10,
+        pipeline=True)
+    streamer.stream()
+
+    # The export of 1-10 fails when 11-20 is fetched, both are fetched again
+    assert adapter.fetched_ranges == [(1, 10), (11, 20), (1, 10), (11, 20), (21, 30)]
+    assert adapter.exported_ranges == [(1, 10), (11, 20), (21, 30)]
+    assert read_last_synced_block(last_synced_block_file) == 30
+
+
+def build_chain(start_block, end_block, branch, parent_hash):
+    chain = {}
+    for number in range(start_block, end_block + 1):
+        block_hash = '{}{}'.format(branch, number)
+        chain[number] = (block_hash, parent_hash)
+        parent_hash = block_hash
+    return chain
+
+
+class MockReorgStreamerAdapter(StreamerAdapterStub):
+    """Blocks 1-40 of branch a, replaced from block 18 with branch b after block 20 is fetched"""
+
+    def __init__(self):
+        self.chain = build_chain(1, 40, 'a', 'a0')
+        self.exported_items = []
+
+    def get_current_block_number(self):
+        return 40
+
+    def fetch_all(self, start_block, end_block):
+        items = [{'type': 'block', 'number': number, 'hash': self.chain[number][0], 'parent_hash': self.chain[number][1]}
+                 for number in range(start_block, end_block + 1)]
+        if end_block == 20:
+            self.chain.update(build_chain(18, 40, 'b', 'a17'))
+        return items
+
+    def get_block_hashes(self, block_numbers):
+        return {number: self.chain[number][0] for number in block_numbers}
+
+    def export_items(self, items):
+        self.exported_items.extend(items)
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_streamer_retracts_orphaned_blocks(tmpdir, pipeline):
+    adapter = MockReorgStreamerAdapter()
+    streamer = Streamer(
+        blockchain_streamer_adapter=adapter,
+        last_synced_block_file=str(tmpdir.join('last_synced_block.txt')),
+        start_block=1,
+        end_block=30,
+        block_batch_size=10,
+        retry_errors=False,
+        pipeline=pipeline,
+        max_reorg_depth=5)
+    streamer.stream()
+
+    exported = [(item['type'], item.get('hash') or item.get('block_hash')) for item in adapter.exported_items]
+    assert exported == [('block', 'a{}'.format(number)) for number in range(1, 21)] + \
+        [('block_retraction', 'a{}'.format(number)) for number in range(18, 21)] + \
+        [('block', 'b{}'.format(number)) for number in range(18, 31)]
+
+
+def test_streamer_fails_on_reorg_deeper_than_buffer(tmpdir):
+    adapter = MockReorgStreamerAdapter()
+    streamer = Streamer(
+        blockchain_streamer_adapter=adapter,
+        last_synced_block_file=str(tmpdir.join('last_synced_block.txt')),
+        start_block=1,
+        end_block=30,
+        block_batch_size=10,
+        retry_errors=False,
+        max_reorg_depth=2)
+    with pytest.raises(ValueError):
+        streamer.stream()
+    assert read_last_synced_block(str(tmpdir.join('last_synced_block.txt'))) == 20
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_streamer_stops_on_reorg_deeper_than_buffer_when_retrying_errors(tmpdir, pipeline):
+    adapter = MockReorgStreamerAdapter()
+    streamer = Streamer(
+        blockchain_streamer_adapter=adapter,
+        last_synced_block_file=str(tmpdir.join('last_synced_block.txt')),
+        start_block=1,
+        end_block=30,
+        period_seconds=0,
+        block_batch_size=10,
+        retry_errors=True,
+        pipeline=pipeline,
+        max_reorg_depth=2)
+    with pytest.raises(ReorgTooDeepError):
+        streamer.stream()
+
+
+def test_block_hash_ring_buffer():
+    block_hashes = BlockHashRingBuffer(3)
+    block_hashes.add_blocks([(1, 'a1', 'a0'), (2, 'a2', 'a1'), (3, 'a3', 'a2'), (4, 'a4', 'a3')])
+    assert block_hashes.get_block_numbers() == [2, 3, 4]
+    assert block_hashes.get_hash(1) is None
+    assert block_hashes.is_continued_by([(5, 'a5', 'a4')])
+    assert not block_hashes.is_continued_by([(5, 'b5', 'b4')])
+
+    assert block_hashes.rewind(2) == [(3, 'a3', 'a2'), (4, 'a4', 'a3')]
+    block_hashes.add_blocks([(3, 'b3', 'a2')])
+    assert block_hashes.get_block_numbers() == [2, 3]
+    assert block_hashes.get_hash(3) == 'b3'
@@ -3,6 +3,7 @@ import os
 from web3 import HTTPProvider
 
 from ethereumetl.providers.rpc import BatchHTTPProvider
+from tests.ethereumetl.job.mock_async_batch_web3_provider import MockAsyncBatchWeb3Provider
 from tests.ethereumetl.job.mock_batch_web3_provider import MockBatchWeb3Provider
 from tests.ethereumetl.job.mock_web3_provider import MockWeb3Provider
 
@@ -15,6 +16,10 @@ def get_web3_provider(provider_type, read_resource_lambda=None, batch=False):
             provider = MockBatchWeb3Provider(read_resource_lambda)
         else:
             provider = MockWeb3Provider(read_resource_lambda)
+    elif provider_type == 'mock_async':
+        if read_resource_lambda is None:
+            raise ValueError('read_resource_lambda must not be None for provider type mock_async')
+        provider = MockAsyncBatchWeb3Provider(read_resource_lambda)
     elif provider_type == 'infura':
         provider_url = os.environ.get('PROVIDER_URL', 'https://mainnet.infura.io/v3/7aef3f0cd1f64408b163814b22cc643c')
         if batch:
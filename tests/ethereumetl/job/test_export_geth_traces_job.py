@@ -20,6 +20,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import json
+
 import pytest
 
 from ethereumetl.web3_utils import build_web3
@@ -45,6 +47,8 @@ def read_resource(resource_group, file_name):
     (1011973, 1011973, 'block_with_suicide', 'mock'),
     (1000000, 1000000, 'block_with_subtraces', 'mock'),
     (1000895, 1000895, 'block_with_error', 'mock'),
+    (1000690, 1000690, 'block_with_create', 'mock_async'),
+    (1000000, 1000000, 'block_with_subtraces', 'mock_async'),
 ])
 def test_export_geth_traces_job(tmpdir, start_block, end_block, resource_group, web3_provider_type):
     traces_output_file = str(tmpdir.join('actual_geth_traces.json'))
@@ -62,3 +66,33 @@ def test_export_geth_traces_job(tmpdir, start_block, end_block, resource_group,
     compare_lines_ignore_order(
         read_resource(resource_group, 'geth_traces.json'), read_file(traces_output_file)
     )
+
+
+class StreamFailingBatchWeb3Provider(object):
+    """Streams blocks without transactions, the first stream is dropped after the first block"""
+
+    def __init__(self):
+        self.streams = 0
+
+    def make_batch_request_iter(self, text):
+        self.streams += 1
+        for index, request in enumerate(json.loads(text)):
+            if self.streams == 1 and index == 1:
+                raise OSError('Connection reset by peer')
+            yield {'jsonrpc': '2.0', 'id': request['id'], 'result': []}
+
+
+def test_export_geth_traces_job_stream_failing_mid_batch(tmpdir):
+    traces_output_file = str(tmpdir.join('actual_geth_traces.json'))
+
+    job = ExportGethTracesJob(
+        start_block=1, end_block=3, batch_size=3,
+        batch_web3_provider=StreamFailingBatchWeb3Provider(),
+        max_workers=1,
+        item_exporter=geth_traces_item_exporter(traces_output_file),
+    )
+    job.run()
+
+    # The block exported before the stream failed is not exported again when the batch is retried
+    block_numbers = [json.loads(line)['block_number'] for line in read_file(traces_output_file).splitlines()]
+    assert sorted(block_numbers) == [1, 2, 3]
@@ -22,7 +22,6 @@
 
 
 import pytest
-from ethereumetl.web3_utils import build_web3
 
 import tests.resources
 from ethereumetl.jobs.export_token_transfers_job import ExportTokenTransfersJob
@@ -46,8 +45,8 @@ def test_export_token_transfers_job(tmpdir, start_block, end_block, batch_size,
 
     job = ExportTokenTransfersJob(
         start_block=start_block, end_block=end_block, batch_size=batch_size,
-        web3=ThreadLocalProxy(
-            lambda: build_web3(get_web3_provider(web3_provider_type, lambda file: read_resource(resource_group, file)))
+        batch_web3_provider=ThreadLocalProxy(
+            lambda: get_web3_provider(web3_provider_type, lambda file: read_resource(resource_group, file), batch=True)
         ),
         item_exporter=token_transfers_item_exporter(output_file),
         max_workers=5
@@ -21,12 +21,14 @@
 # SOFTWARE.
 
 
+import json
+
 import pytest
-from ethereumetl.web3_utils import build_web3
 
 import tests.resources
 from ethereumetl.jobs.export_tokens_job import ExportTokensJob
 from ethereumetl.jobs.exporters.tokens_item_exporter import tokens_item_exporter
+from ethereumetl.service.token_metadata_cache import TokenMetadataCache
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
 from tests.ethereumetl.job.helpers import get_web3_provider
 from tests.helpers import compare_lines_ignore_order, read_file, skip_if_slow_tests_disabled
@@ -50,8 +52,8 @@ def test_export_tokens_job(tmpdir, token_addresses, resource_group, web3_provide
 
     job = ExportTokensJob(
         token_addresses_iterable=token_addresses,
-        web3=ThreadLocalProxy(
-            lambda: build_web3(get_web3_provider(web3_provider_type, lambda file: read_resource(resource_group, file)))
+        batch_web3_provider=ThreadLocalProxy(
+            lambda: get_web3_provider(web3_provider_type, lambda file: read_resource(resource_group, file), batch=True)
         ),
         item_exporter=tokens_item_exporter(output_file),
         max_workers=5
@@ -61,3 +63,63 @@ def test_export_tokens_job(tmpdir, token_addresses, resource_group, web3_provide
     compare_lines_ignore_order(
         read_resource(resource_group, 'expected_tokens.csv'), read_file(output_file)
     )
+
+
+def test_export_tokens_job_with_token_metadata_cache(tmpdir):
+    token_metadata_cache = TokenMetadataCache(str(tmpdir.join('tokens.sqlite')))
+    resource_group = 'token_with_alternative_return_type'
+    providers = [
+        get_web3_provider('mock', lambda file: read_resource(resource_group, file), batch=True),
+        # Cached tokens must not be requested from the node
+        get_web3_provider('mock', lambda file: read_resource('missing', file), batch=True),
+    ]
+
+    for index, provider in enumerate(providers):
+        output_file = str(tmpdir.join('tokens_{}.csv'.format(index)))
+        job = ExportTokensJob(
+            token_addresses_iterable=['0x86fa049857e0209aa7d9e616f7eb3b3b78ecfdb0'],
+            batch_web3_provider=provider,
+            item_exporter=tokens_item_exporter(output_file),
+            max_workers=5,
+            token_metadata_cache=token_metadata_cache
+        )
+        job.run()
+
+        compare_lines_ignore_order(
+            read_resource(resource_group, 'expected_tokens.csv'), read_file(output_file)
+        )
+
+
+# Fails the first batch of eth_calls with a rate limit error
+class RateLimitedOnceWeb3Provider:
+    def __init__(self, delegate):
+        self.delegate = delegate
+        self.rate_limited = False
+
+    def make_batch_request(self, text):
+        requests = json.loads(text)
+        if not self.rate_limited and requests[0]['method'] == 'eth_call':
+            self.rate_limited = True
+            return [{'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32005, 'message': 'rate limit exceeded'}}
+                    for request in requests]
+        return self.delegate.make_batch_request(text)
+
+
+def test_export_tokens_job_does_not_cache_tokens_resolved_during_errors(tmpdir):
+    token_metadata_cache = TokenMetadataCache(str(tmpdir.join('tokens.sqlite')))
+    resource_group = 'token_with_alternative_return_type'
+    output_file = str(tmpdir.join('tokens.csv'))
+
+    job = ExportTokensJob(
+        token_addresses_iterable=['0x86fa049857e0209aa7d9e616f7eb3b3b78ecfdb0'],
+        batch_web3_provider=RateLimitedOnceWeb3Provider(
+            get_web3_provider('mock', lambda file: read_resource(resource_group, file), batch=True)),
+        item_exporter=tokens_item_exporter(output_file),
+        max_workers=1,
+        token_metadata_cache=token_metadata_cache
+    )
+    job.run()
+
+    compare_lines_ignore_order(read_resource(resource_group, 'expected_tokens.csv'), read_file(output_file))
+    [token] = token_metadata_cache.get_tokens([('0x86fa049857e0209aa7d9e616f7eb3b3b78ecfdb0', None)])
+    assert token.symbol is not None
@@ -22,9 +22,8 @@
 
 import pytest
 
-from ethereumetl.web3_utils import build_web3
-
 import tests.resources
+from ethereumetl.enumeration.trace_mode import TraceMode
 from ethereumetl.jobs.export_traces_job import ExportTracesJob
 from ethereumetl.jobs.exporters.traces_item_exporter import traces_item_exporter
 from ethereumetl.thread_local_proxy import ThreadLocalProxy
@@ -38,23 +37,26 @@ def read_resource(resource_group, file_name):
     return tests.resources.read_resource([RESOURCE_GROUP, resource_group], file_name)
 
 
-@pytest.mark.parametrize("start_block,end_block,resource_group,web3_provider_type", [
-    (0, 0, 'block_without_transactions', 'mock'),
-    (1000690, 1000690, 'block_with_create', 'mock'),
-    (1011973, 1011973, 'block_with_suicide', 'mock'),
-    (1000000, 1000000, 'block_with_subtraces', 'mock'),
-    (1000895, 1000895, 'block_with_error', 'mock'),
+@pytest.mark.parametrize("start_block,end_block,resource_group,web3_provider_type,trace_mode", [
+    (0, 0, 'block_without_transactions', 'mock', None),
+    (1000690, 1000690, 'block_with_create', 'mock', None),
+    (1011973, 1011973, 'block_with_suicide', 'mock', None),
+    (1000000, 1000000, 'block_with_subtraces', 'mock', None),
+    (1000895, 1000895, 'block_with_error', 'mock', None),
+    (1000895, 1000895, 'block_with_error', 'mock', TraceMode.SINGLE),
+    (1000000, 1000000, 'block_with_subtraces', 'mock', TraceMode.FILTER),
 ])
-def test_export_traces_job(tmpdir, start_block, end_block, resource_group, web3_provider_type):
+def test_export_traces_job(tmpdir, start_block, end_block, resource_group, web3_provider_type, trace_mode):
     traces_output_file = str(tmpdir.join('actual_traces.csv'))
 
     job = ExportTracesJob(
         start_block=start_block, end_block=end_block, batch_size=1,
-        web3=ThreadLocalProxy(
-            lambda: build_web3(get_web3_provider(web3_provider_type, lambda file: read_resource(resource_group, file)))
+        batch_web3_provider=ThreadLocalProxy(
+            lambda: get_web3_provider(web3_provider_type, lambda file: read_resource(resource_group, file), batch=True)
         ),
         max_workers=5,
         item_exporter=traces_item_exporter(traces_output_file),
+        trace_mode=trace_mode,
     )
     job.run()
 
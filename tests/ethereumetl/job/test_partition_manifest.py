@@ -0,0 +1,52 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+
+from ethereumetl.jobs.partition_manifest import PartitionManifest
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+def test_partition_manifest(tmpdir):
+    output_dir = str(tmpdir)
+    manifest_file = os.path.join(output_dir, '_manifests', 'manifest_00000000_00000099.json')
+    blocks_file = os.path.join(output_dir, 'blocks', 'blocks_00000000_00000099.csv')
+    write_file(blocks_file, 'number\n0\n1\n')
+
+    manifest = PartitionManifest(manifest_file, output_dir).load()
+    assert not manifest.is_stage_complete('blocks_and_receipts')
+    manifest.complete_stage('blocks_and_receipts', [blocks_file], {'block': 2})
+
+    loaded_manifest = PartitionManifest(manifest_file, output_dir).load()
+    assert loaded_manifest.is_stage_complete('blocks_and_receipts')
+    assert loaded_manifest.stages['blocks_and_receipts']['row_counts'] == {'block': 2}
+    assert not loaded_manifest.is_stage_complete('token_transfers')
+    assert os.listdir(os.path.dirname(manifest_file)) == ['manifest_00000000_00000099.json']
+
+    # A file that was changed after the stage was completed is exported again
+    write_file(blocks_file, 'number\n0\n')
+    assert not loaded_manifest.is_stage_complete('blocks_and_receipts')
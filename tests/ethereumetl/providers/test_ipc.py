@@ -0,0 +1,114 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ethereumetl.providers.ipc import BatchIPCProvider, JsonDocumentScanner, JsonRpcResponseBuffer
+
+RESPONSE = [
+    {'jsonrpc': '2.0', 'id': 0, 'result': {'input': '0x', 'output': 'brackets ]}[{ and \\"quotes\\" in strings'}},
+    {'jsonrpc': '2.0', 'id': 1, 'result': [{'calls': [{'to': '0x' + '1' * 40}]}, '\\']},
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 4096])
+def test_json_document_scanner(chunk_size):
+    document = json.dumps(RESPONSE).encode('utf-8') + b'\n'
+
+    scanner = JsonDocumentScanner()
+    buffer = bytearray()
+    document_end = None
+    for offset in range(0, len(document), chunk_size):
+        buffer += document[offset:offset + chunk_size]
+        document_end = scanner.scan(buffer)
+        if document_end is not None:
+            break
+
+    assert document_end == len(document) - 1
+
+
+@pytest.mark.parametrize('recv_buffer_size', [3, 64, 65536])
+def test_json_rpc_response_buffer(recv_buffer_size):
+    reader, writer = socket.socketpair()
+    with reader, writer:
+        writer.sendall(json.dumps(RESPONSE).encode('utf-8') + b'\n')
+        writer.shutdown(socket.SHUT_WR)
+
+        response_buffer = JsonRpcResponseBuffer(recv_buffer_size)
+        while not response_buffer.is_complete():
+            assert response_buffer.receive(reader) > 0
+
+    assert response_buffer.decode() == RESPONSE
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='requires unix sockets')
+def test_batch_ipc_provider_concurrent_requests(tmpdir):
+    ipc_path = str(tmpdir.join('node.ipc'))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(ipc_path)
+    server.listen(16)
+    threading.Thread(target=serve_slow_node, args=(server,), daemon=True).start()
+
+    provider = BatchIPCProvider(ipc_path)
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(provider.make_batch_request, ['[{{"id": {}}}]'.format(i) for i in range(8)]))
+    elapsed = time.time() - start_time
+
+    assert responses == [[{'id': i, 'result': '0x0'}] for i in range(8)]
+    # requests are not serialized on a single socket
+    assert elapsed < 8 * SLOW_NODE_DELAY_SECONDS / 2
+    server.close()
+
+
+SLOW_NODE_DELAY_SECONDS = 0.2
+
+
+def serve_slow_node(server):
+    def handle(connection):
+        with connection:
+            request_buffer = bytearray()
+            while True:
+                data = connection.recv(4096)
+                if not data:
+                    return
+                request_buffer += data
+                request = json.loads(request_buffer)
+                request_buffer.clear()
+                time.sleep(SLOW_NODE_DELAY_SECONDS)
+                response = [{'id': item['id'], 'result': '0x0'} for item in request]
+                connection.sendall(json.dumps(response).encode('utf-8') + b'\n')
+
+    while True:
+        try:
+            connection, _ = server.accept()
+        except OSError:
+            return
+        threading.Thread(target=handle, args=(connection,), daemon=True).start()
@@ -0,0 +1,94 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import uuid
+
+import pytest
+
+from ethereumetl.providers.multi import MultiEndpointProvider, MIN_HEDGE_SAMPLES
+
+
+class FakeBatchProvider:
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.request_count = 0
+
+    def make_batch_request(self, text):
+        self.request_count += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError('{} is down'.format(self.name))
+        return self.name
+
+
+def build_provider(providers, hedge_percentile=None):
+    # Endpoint health is shared per URI across the process, unique URIs isolate the tests
+    uris = ['http://{}-{}'.format(provider.name, uuid.uuid4()) for provider in providers]
+    return MultiEndpointProvider(uris, providers, hedge_percentile=hedge_percentile)
+
+
+def test_failover():
+    down = FakeBatchProvider('down', fail=True)
+    up = FakeBatchProvider('up')
+    provider = build_provider([down, up])
+
+    assert [provider.make_batch_request('[]') for _ in range(10)] == ['up'] * 10
+    # The failed endpoint is cooling down and is not retried right away
+    assert down.request_count == 1
+
+
+def test_all_endpoints_failing():
+    provider = build_provider([FakeBatchProvider('down1', fail=True), FakeBatchProvider('down2', fail=True)])
+
+    with pytest.raises(ConnectionError):
+        provider.make_batch_request('[]')
+
+
+def test_healthier_endpoint_preferred():
+    fast = FakeBatchProvider('fast')
+    slow = FakeBatchProvider('slow', delay=0.01)
+    provider = build_provider([fast, slow])
+
+    for _ in range(50):
+        provider.make_batch_request('[]')
+
+    assert fast.request_count > slow.request_count
+
+
+def test_hedged_request():
+    primary = FakeBatchProvider('primary', delay=0.001)
+    secondary = FakeBatchProvider('secondary')
+    provider = build_provider([primary, secondary], hedge_percentile=50)
+    primary_endpoint, secondary_endpoint = provider._endpoints
+    for _ in range(MIN_HEDGE_SAMPLES):
+        primary_endpoint[0].record_success(0.001)
+    # Make the primary endpoint look healthier and then lag
+    secondary_endpoint[0].record_success(1)
+    primary.delay = 0.5
+
+    start_time = time.time()
+    assert provider.make_batch_request('[]') == 'secondary'
+    assert time.time() - start_time < 0.5
@@ -0,0 +1,78 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+
+from ethereumetl.json_rpc_requests import generate_get_block_by_number_json_rpc, generate_get_receipt_json_rpc
+from ethereumetl.providers.rpc_cache import CachingProvider
+
+FINALIZED_BLOCK = 100
+
+
+class FakeNodeProvider:
+    def __init__(self):
+        self.requests = []
+
+    def make_request(self, method, params):
+        if method == 'eth_getBlockByNumber' and params[0] == 'finalized':
+            return {'jsonrpc': '2.0', 'id': 1, 'result': {'number': hex(FINALIZED_BLOCK)}}
+        return {'jsonrpc': '2.0', 'id': 1, 'result': self._get_result(method, params)}
+
+    def make_batch_request(self, text):
+        requests = json.loads(text)
+        self.requests.extend(requests)
+        return [{'jsonrpc': '2.0', 'id': request['id'], 'result': self._get_result(request['method'], request['params'])}
+                for request in requests]
+
+    @staticmethod
+    def _get_result(method, params):
+        if method == 'eth_getTransactionReceipt':
+            transaction_hash = params[0]
+            return {'transactionHash': transaction_hash, 'blockNumber': hex(int(transaction_hash, 16))}
+        return {'number': params[0]}
+
+
+def test_caching_provider_caches_finalized_blocks(tmpdir):
+    node = FakeNodeProvider()
+    provider = CachingProvider(node, str(tmpdir))
+    text = json.dumps(list(generate_get_block_by_number_json_rpc([99, 100, 101], False)))
+
+    first_responses = provider.make_batch_request(text)
+    assert len(node.requests) == 3
+
+    # Another provider with the same cache directory, e.g. in a re-run, only requests the block that isn't finalized
+    second_responses = CachingProvider(node, str(tmpdir)).make_batch_request(text)
+    assert [request['params'][0] for request in node.requests[3:]] == [hex(101)]
+    assert second_responses == first_responses
+
+
+def test_caching_provider_caches_by_result_block_number(tmpdir):
+    node = FakeNodeProvider()
+    provider = CachingProvider(node, str(tmpdir))
+    text = json.dumps(list(generate_get_receipt_json_rpc([hex(50), hex(150)])))
+
+    provider.make_batch_request(text)
+    responses = provider.make_batch_request(text)
+
+    assert [request['params'][0] for request in node.requests] == [hex(50), hex(150), hex(150)]
+    assert [response['result']['transactionHash'] for response in responses] == [hex(50), hex(150)]
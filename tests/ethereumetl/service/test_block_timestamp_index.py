@@ -0,0 +1,105 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import random
+from datetime import date, timedelta
+
+from ethereumetl.service.block_timestamp_index import BlockTimestampIndex
+from ethereumetl.service.eth_service import EthService, get_timestamp_range_for_date
+from ethereumetl.service.graph_operations import GraphOperations, Point
+
+GENESIS_TIMESTAMP = 1438269973
+
+
+class MockBlockTimestampGraph(object):
+    """Blocks with block times that change over time, like on the mainnet"""
+
+    def __init__(self, block_count):
+        random.seed(1)
+        self.timestamps = [GENESIS_TIMESTAMP]
+        for block_number in range(1, block_count):
+            block_time = 12 if block_number > block_count // 2 else random.randint(1, 30)
+            self.timestamps.append(self.timestamps[-1] + block_time)
+        self.requested_points = 0
+        self.get_points_calls = 0
+
+    def get_first_point(self):
+        return self.get_point(1)
+
+    def get_last_point(self):
+        return self.get_point(len(self.timestamps) - 1)
+
+    def get_point(self, x):
+        self.requested_points += 1
+        return Point(x, self.timestamps[x])
+
+    def get_points(self, xs):
+        self.get_points_calls += 1
+        return [self.get_point(x) for x in xs]
+
+
+class MockEthService(EthService):
+    def __init__(self, graph, block_timestamp_index=None):
+        self._graph_operations = GraphOperations(graph, block_timestamp_index)
+
+
+DATES = [date(2015, 8, 1) + timedelta(days=day) for day in range(60)]
+
+
+def test_get_block_ranges_for_dates():
+    graph = MockBlockTimestampGraph(400000)
+    expected_block_ranges = [MockEthService(graph).get_block_range_for_date(d) for d in DATES]
+
+    graph.requested_points = 0
+    eth_service = MockEthService(graph)
+    assert list(eth_service.get_block_ranges_for_dates(DATES)) == expected_block_ranges
+    assert graph.get_points_calls <= 10
+
+    # The bounds of all dates are cached
+    graph.requested_points = 0
+    assert [eth_service.get_block_range_for_date(d) for d in DATES] == expected_block_ranges
+    assert graph.requested_points == 0
+
+
+def test_block_timestamp_index(tmpdir):
+    index_file = str(tmpdir.join('block_timestamps.bin'))
+    graph = MockBlockTimestampGraph(400000)
+
+    block_timestamp_index = BlockTimestampIndex(index_file).open()
+    expected_block_ranges = list(MockEthService(graph, block_timestamp_index).get_block_ranges_for_dates(DATES))
+    block_timestamp_index.close()
+
+    # A partially written record is dropped
+    with open(index_file, 'ab') as file:
+        file.write(b'\x01\x02')
+
+    graph.requested_points = 0
+    block_timestamp_index = BlockTimestampIndex(index_file).open()
+    eth_service = MockEthService(graph, block_timestamp_index)
+    assert list(eth_service.get_block_ranges_for_dates(DATES)) == expected_block_ranges
+    block_timestamp_index.close()
+    assert graph.requested_points == 0
+    assert len(BlockTimestampIndex(index_file).open()) == len(block_timestamp_index)
+
+
+def test_get_timestamp_range_for_date():
+    assert get_timestamp_range_for_date(date(2015, 8, 1)) == (1438387200, 1438473599.999999)
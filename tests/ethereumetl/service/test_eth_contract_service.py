@@ -22,8 +22,11 @@
 
 
 import pytest
+from eth_utils import keccak
 
-from ethereumetl.service.eth_contract_service import EthContractService
+from ethereumetl.service.contract_standards import ContractStandard, get_contract_standard_flags, \
+    get_function_sighash, register_contract_standard, unregister_contract_standard
+from ethereumetl.service.eth_contract_service import EthContractService, SighashesCache
 
 
 @pytest.mark.parametrize("bytecode,expected_sighashes,is_erc20,is_erc721", [
@@ -66,3 +69,56 @@ def test_get_function_sighashes(bytecode, expected_sighashes, is_erc20, is_erc72
     assert expected_sighashes == sighashes
     assert eth_contract_service.is_erc20_contract(sighashes) == is_erc20
     assert eth_contract_service.is_erc721_contract(sighashes) == is_erc721
+
+
+@pytest.mark.parametrize("bytecode,expected_sighashes", [
+    # PUSH2 data containing JUMPDEST and PUSH4 opcodes is skipped
+    ('0x615b6363aabbccdd', ['0xaabbccdd']),
+    # PUSH4 operands after the first JUMPDEST are not in the dispatcher
+    ('0x6311111111005b6322222222', ['0x11111111']),
+    # PUSH4 truncated by the end of the code
+    ('0x6311111111632222', ['0x11111111']),
+    ('0x', []),
+])
+def test_get_function_sighashes_scanner(bytecode, expected_sighashes):
+    assert EthContractService().get_function_sighashes(bytecode) == expected_sighashes
+
+
+def test_get_function_sighashes_cache():
+    sighashes_cache = SighashesCache(max_size=1)
+    eth_contract_service = EthContractService(sighashes_cache)
+
+    assert eth_contract_service.get_function_sighashes('0x6311111111') == ['0x11111111']
+    assert sighashes_cache.get(keccak(bytes.fromhex('6311111111'))) == ('0x11111111',)
+    eth_contract_service.get_function_sighashes('0x6322222222')
+    assert sighashes_cache.get(keccak(bytes.fromhex('6311111111'))) is None
+
+
+ERC1155_SIGHASHES = [
+    '0x00fdd58e', '0x01ffc9a7', '0x0e89341c', '0x2eb2c2d6', '0x4e1273f4', '0xa22cb465', '0xe985e9c5', '0xf242432a'
+]
+MINIMAL_PROXY_BYTECODE = \
+    '0x363d3d373d3d3d363d73bebebebebebebebebebebebebebebebebebebebe5af43d82803e903d91602b57fd5bf3'
+
+
+@pytest.mark.parametrize("function_sighashes,bytecode,expected_flags", [
+    (ERC1155_SIGHASHES, None, {'is_erc1155'}),
+    (['0x095ea7b3', '0x18160ddd', '0x23b872dd', '0x70a08231', '0xa9059cbb', '0xdd62ed3e'], None, {'is_erc20'}),
+    (['0x5c60da1b', '0x3659cfe6'], None, {'is_proxy'}),
+    ([], MINIMAL_PROXY_BYTECODE, {'is_proxy'}),
+    (['0x5c60da1b'], None, set()),
+])
+def test_classify_contract(function_sighashes, bytecode, expected_flags):
+    flags = EthContractService().classify_contract(function_sighashes, bytecode)
+    assert list(flags.keys()) == get_contract_standard_flags()
+    assert {flag for flag, value in flags.items() if value} == expected_flags
+
+
+def test_register_contract_standard():
+    register_contract_standard(ContractStandard('test_standard', ['foo()']))
+    try:
+        assert 'is_test_standard' in get_contract_standard_flags()
+        assert EthContractService().classify_contract([get_function_sighash('foo()')])['is_test_standard']
+    finally:
+        unregister_contract_standard('test_standard')
+    assert 'is_test_standard' not in get_contract_standard_flags()
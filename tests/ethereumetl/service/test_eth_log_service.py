@@ -0,0 +1,93 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+
+import pytest
+
+from ethereumetl.misc.retriable_value_error import RetriableValueError
+from ethereumetl.misc.too_many_results_error import TooManyResultsError
+from ethereumetl.service.eth_log_service import EthLogService, SPARSE_LOGS_COUNT
+
+
+# Returns one log per block in dense blocks and rejects requests matching more than max_logs logs
+class FakeLogsProvider:
+    def __init__(self, dense_blocks, max_logs):
+        self.dense_blocks = dense_blocks
+        self.max_logs = max_logs
+        self.requested_ranges = []
+
+    def make_batch_request(self, text):
+        [request] = json.loads(text)
+        from_block = int(request['params'][0]['fromBlock'], 16)
+        to_block = int(request['params'][0]['toBlock'], 16)
+        self.requested_ranges.append((from_block, to_block))
+
+        logs = [{'blockNumber': hex(block)} for block in range(from_block, to_block + 1) if block in self.dense_blocks]
+        if len(logs) > self.max_logs:
+            error = {'code': -32005, 'message': 'query returned more than {} results'.format(self.max_logs)}
+            return [{'jsonrpc': '2.0', 'id': request['id'], 'error': error}]
+        return [{'jsonrpc': '2.0', 'id': request['id'], 'result': logs}]
+
+
+def test_get_logs_bisects_and_grows_block_range():
+    provider = FakeLogsProvider(dense_blocks=set(range(0, 4000)), max_logs=SPARSE_LOGS_COUNT)
+    eth_log_service = EthLogService(provider)
+
+    logs = eth_log_service.get_logs(0, 15999)
+
+    assert [log['blockNumber'] for log in logs] == [hex(block) for block in range(0, 4000)]
+    assert provider.requested_ranges == [
+        # rejected ranges are bisected
+        (0, 15999), (0, 7999), (0, 3999), (0, 1999),
+        (0, 999), (1000, 1999), (2000, 2999), (3000, 3999),
+        # the range grows again when logs are sparse
+        (4000, 4999), (5000, 6999), (7000, 10999), (11000, 15999),
+    ]
+
+
+def test_get_logs_too_many_results_in_single_block():
+    provider = FakeLogsProvider(dense_blocks={5}, max_logs=0)
+
+    with pytest.raises(TooManyResultsError):
+        EthLogService(provider).get_logs(0, 9)
+
+
+# Rejects all requests with the given error
+class FailingLogsProvider:
+    def __init__(self, error):
+        self.error = error
+        self.request_count = 0
+
+    def make_batch_request(self, text):
+        [request] = json.loads(text)
+        self.request_count += 1
+        return [{'jsonrpc': '2.0', 'id': request['id'], 'error': self.error}]
+
+
+def test_get_logs_does_not_bisect_on_invalid_block_range():
+    provider = FailingLogsProvider({'code': -32000, 'message': 'invalid block range params'})
+
+    with pytest.raises(RetriableValueError):
+        EthLogService(provider).get_logs(0, 9)
+    assert provider.request_count == 1
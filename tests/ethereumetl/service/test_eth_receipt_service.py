@@ -0,0 +1,136 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import asyncio
+
+import pytest
+
+import tests.resources
+from ethereumetl.service.eth_receipt_service import EthReceiptService
+from tests.ethereumetl.job.mock_async_batch_web3_provider import MockAsyncBatchWeb3Provider
+from tests.ethereumetl.job.mock_batch_web3_provider import MockBatchWeb3Provider
+
+RESOURCE_GROUP = 'test_eth_receipt_service'
+
+# Transactions in block 483920
+TRANSACTION_HASHES = [
+    '0x04cbcb236043d8fb7839e07bbc7f5eed692fb2ca55d897f1101eac3e3ad4fab8',
+    '0xcea6f89720cc1d2f46cc7a935463ae0b99dd5fad9c91bb7357de5421511cee49',
+    '0x463d53f0ad57677a3b430a007c1c31d15d62c37fab5eee598551697c297c235c',
+    '0x05287a561f218418892ab053adfb3d919860988b19458c570c5c30f51c146f02',
+]
+
+
+def read_resource(resource_group, file_name):
+    return tests.resources.read_resource([RESOURCE_GROUP, resource_group], file_name)
+
+
+class ReversingMockBatchWeb3Provider(MockBatchWeb3Provider):
+    def __init__(self, read_resource):
+        super().__init__(read_resource)
+        self.batch_request_count = 0
+
+    def make_batch_request(self, text):
+        self.batch_request_count += 1
+        return list(reversed(super().make_batch_request(text)))
+
+
+# Fails the first request as if the connection was reset
+class FailingOnceMockBatchWeb3Provider(ReversingMockBatchWeb3Provider):
+    endpoint_uri = 'http://failing-once.test'
+
+    def make_batch_request(self, text):
+        if self.batch_request_count == 0:
+            self.batch_request_count += 1
+            raise OSError('Connection reset by peer')
+        return super().make_batch_request(text)
+
+
+@pytest.mark.parametrize("receipts_batch_size,expected_batch_request_count", [
+    (1, 4),
+    (3, 2),
+    (500, 1),
+])
+def test_get_receipts(receipts_batch_size, expected_batch_request_count):
+    provider = ReversingMockBatchWeb3Provider(lambda file: read_resource('transaction_receipts', file))
+    receipt_service = EthReceiptService(provider, receipts_batch_size=receipts_batch_size)
+
+    receipts = receipt_service.get_receipts(TRANSACTION_HASHES)
+
+    assert [receipt['transactionHash'] for receipt in receipts] == TRANSACTION_HASHES
+    assert provider.batch_request_count == expected_batch_request_count
+
+
+def test_get_receipts_empty():
+    provider = ReversingMockBatchWeb3Provider(lambda file: read_resource('transaction_receipts', file))
+    receipt_service = EthReceiptService(provider)
+
+    assert receipt_service.get_receipts([]) == []
+    assert provider.batch_request_count == 0
+
+
+@pytest.mark.parametrize("resource_group,expected_block_receipts_supported,expected_batch_request_count", [
+    # the probe and a single eth_getBlockReceipts batch
+    ('block_receipts', True, 2),
+    # the failed probe, eth_getBlockByNumber and eth_getTransactionReceipt batches
+    ('transaction_receipts', False, 3),
+])
+def test_get_block_receipts(resource_group, expected_block_receipts_supported, expected_batch_request_count):
+    provider = ReversingMockBatchWeb3Provider(lambda file: read_resource(resource_group, file))
+    receipt_service = EthReceiptService(provider)
+
+    block_receipts = receipt_service.get_block_receipts([483920])
+
+    assert receipt_service.is_block_receipts_supported() == expected_block_receipts_supported
+    assert len(block_receipts) == 1
+    assert [receipt['transactionHash'] for receipt in block_receipts[0]] == TRANSACTION_HASHES
+    assert provider.batch_request_count == expected_batch_request_count
+
+
+@pytest.mark.parametrize("resource_group,expected_block_receipts_supported", [
+    ('block_receipts', True),
+    ('transaction_receipts', False),
+])
+def test_get_block_receipts_async(resource_group, expected_block_receipts_supported):
+    provider = MockAsyncBatchWeb3Provider(lambda file: read_resource(resource_group, file))
+    receipt_service = EthReceiptService(provider)
+
+    loop = asyncio.new_event_loop()
+    try:
+        block_receipts = loop.run_until_complete(receipt_service.get_block_receipts_async([483920]))
+    finally:
+        loop.close()
+
+    assert receipt_service.is_block_receipts_supported() == expected_block_receipts_supported
+    assert [receipt['transactionHash'] for receipt in block_receipts[0]] == TRANSACTION_HASHES
+
+
+def test_block_receipts_probe_is_repeated_after_transport_error():
+    provider = FailingOnceMockBatchWeb3Provider(lambda file: read_resource('block_receipts', file))
+    receipt_service = EthReceiptService(provider)
+
+    assert not receipt_service.is_block_receipts_supported()
+    assert receipt_service.is_block_receipts_supported()
+    # The probe result is cached once the node answered
+    assert EthReceiptService(provider).is_block_receipts_supported()
+    assert provider.batch_request_count == 2
@@ -0,0 +1,135 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+
+import pytest
+from eth_abi import decode_abi, encode_abi
+
+from ethereumetl.misc.retriable_value_error import RetriableValueError
+from ethereumetl.service.eth_token_service import EthTokenService, MULTICALL3_ADDRESS, TOKEN_FUNCTION_SELECTORS
+
+SELECTOR_FUNCTIONS = {selector: function for function, selector in TOKEN_FUNCTION_SELECTORS.items()}
+
+TOKEN_1 = '0x0000000000000000000000000000000000000001'
+TOKEN_2 = '0x0000000000000000000000000000000000000002'
+TOKEN_3 = '0x0000000000000000000000000000000000000003'
+
+# Function results by token. TOKEN_2 has a bytes32 symbol and no name, e.g. like EOS.
+TOKEN_FUNCTION_RESULTS = {
+    TOKEN_1: {
+        'symbol()': encode_abi(['string'], ['ABC']),
+        'name()': encode_abi(['string'], ['Token ABC']),
+        'decimals()': encode_abi(['uint8'], [18]),
+        'totalSupply()': encode_abi(['uint256'], [10 ** 27]),
+    },
+    TOKEN_2: {
+        'symbol()': encode_abi(['bytes32'], [b'EOS']),
+        'DECIMALS()': encode_abi(['uint8'], [6]),
+        'totalSupply()': encode_abi(['uint256'], [1]),
+    },
+    TOKEN_3: {
+        'symbol()': encode_abi(['string'], ['OLD']),
+        'name()': encode_abi(['string'], ['Old Token']),
+        'decimals()': encode_abi(['uint8'], [0]),
+        'totalSupply()': encode_abi(['uint256'], [100]),
+    },
+}
+# The fallback function of TOKEN_3 throws and uses all the gas it gets, e.g. like tokens compiled with Solidity < 0.4.10
+GAS_EXHAUSTING_TOKENS = {TOKEN_3}
+
+
+# Executes eth_calls to the tokens above and aggregate3 calls to Multicall3 if it's deployed
+class FakeTokensProvider:
+    def __init__(self, multicall_deployed, error=None):
+        self.multicall_deployed = multicall_deployed
+        # Returned for all eth_calls if set
+        self.error = error
+        self.eth_call_count = 0
+
+    def make_batch_request(self, text):
+        return [self._make_request(request) for request in json.loads(text)]
+
+    def _make_request(self, request):
+        if request['method'] == 'eth_getCode':
+            return {'jsonrpc': '2.0', 'id': request['id'], 'result': '0x6080' if self.multicall_deployed else '0x'}
+
+        self.eth_call_count += 1
+        if self.error is not None:
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': self.error}
+        call = request['params'][0]
+        if call['to'] == MULTICALL3_ADDRESS:
+            [calls] = decode_abi(['(address,bool,bytes)[]'], bytes.fromhex(call['data'][10:]))
+            results = []
+            gas_exhausted = False
+            for to_address, _, data in calls:
+                result = None if gas_exhausted else self._call(to_address, '0x' + data.hex())
+                # The calls after a call that exhausted its gas don't have enough gas left
+                gas_exhausted = gas_exhausted or (result is None and to_address in GAS_EXHAUSTING_TOKENS)
+                results.append(result)
+            result = encode_abi(['(bool,bytes)[]'], [[(result is not None, result or b'') for result in results]])
+        else:
+            result = self._call(call['to'], call['data'])
+        if result is None:
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': 3, 'message': 'execution reverted'}}
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': '0x' + result.hex()}
+
+    def _call(self, to_address, data):
+        return TOKEN_FUNCTION_RESULTS[to_address].get(SELECTOR_FUNCTIONS[data])
+
+
+@pytest.mark.parametrize('multicall_deployed,expected_eth_call_count', [
+    (True, 3),
+    (False, 14),
+])
+def test_get_tokens(multicall_deployed, expected_eth_call_count):
+    provider = FakeTokensProvider(multicall_deployed)
+
+    tokens = EthTokenService(provider).get_tokens([TOKEN_1, TOKEN_2])
+
+    assert [(token.address, token.symbol, token.name, token.decimals, token.total_supply) for token in tokens] == [
+        (TOKEN_1, 'ABC', 'Token ABC', 18, 10 ** 27),
+        (TOKEN_2, 'EOS' + '\x00' * 29, None, 6, 1),
+    ]
+    assert provider.eth_call_count == expected_eth_call_count
+
+
+def test_get_tokens_with_multicall_calls_that_run_out_of_gas():
+    provider = FakeTokensProvider(multicall_deployed=True)
+
+    tokens = EthTokenService(provider).get_tokens([TOKEN_3, TOKEN_1])
+
+    assert [(token.address, token.symbol, token.name, token.decimals, token.total_supply) for token in tokens] == [
+        (TOKEN_3, 'OLD', 'Old Token', 0, 100),
+        (TOKEN_1, 'ABC', 'Token ABC', 18, 10 ** 27),
+    ]
+    # aggregate3 and the calls for the fields that no call returned in it
+    assert provider.eth_call_count == 1 + 5 + 7
+
+
+@pytest.mark.parametrize('multicall_deployed', [True, False])
+def test_get_tokens_raises_on_rate_limit_errors(multicall_deployed):
+    provider = FakeTokensProvider(multicall_deployed, error={'code': -32005, 'message': 'rate limit exceeded'})
+
+    with pytest.raises(RetriableValueError):
+        EthTokenService(provider).get_tokens([TOKEN_1])
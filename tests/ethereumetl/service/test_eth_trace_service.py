@@ -0,0 +1,77 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+
+from ethereumetl.enumeration.trace_mode import TraceMode
+from ethereumetl.service.eth_trace_service import EthTraceService
+
+
+# Returns two traces per block. Batches of more than one trace_block request fail as in
+# https://github.com/paritytech/parity-ethereum/issues/9822 and trace_filter rejects ranges with more than max_traces
+class FakeTracesProvider:
+    def __init__(self, max_traces):
+        self.max_traces = max_traces
+        self.requested_ranges = []
+
+    def make_batch_request(self, text):
+        batch = json.loads(text)
+        if len(batch) > 1:
+            raise ValueError('Batched trace_block requests are not supported')
+        [request] = batch
+        if request['method'] == 'trace_block':
+            block_number = int(request['params'][0], 16)
+            return [{'jsonrpc': '2.0', 'id': request['id'], 'result': self._get_traces(block_number, block_number)}]
+
+        from_block = int(request['params'][0]['fromBlock'], 16)
+        to_block = int(request['params'][0]['toBlock'], 16)
+        self.requested_ranges.append((from_block, to_block))
+        traces = self._get_traces(from_block, to_block)
+        if len(traces) > self.max_traces:
+            error = {'code': -32005, 'message': 'too many traces'}
+            return [{'jsonrpc': '2.0', 'id': request['id'], 'error': error}]
+        return [{'jsonrpc': '2.0', 'id': request['id'], 'result': traces}]
+
+    def _get_traces(self, from_block, to_block):
+        return [{'blockNumber': block, 'traceAddress': [index]}
+                for block in range(from_block, to_block + 1) for index in range(2)]
+
+
+def test_get_block_traces_probes_trace_filter_and_splits_range():
+    provider = FakeTracesProvider(max_traces=4)
+    eth_trace_service = EthTraceService(provider)
+
+    block_traces = eth_trace_service.get_block_traces([10, 11, 12, 13])
+
+    assert eth_trace_service.get_trace_mode() == TraceMode.FILTER
+    assert block_traces == [provider._get_traces(block, block) for block in [10, 11, 12, 13]]
+    assert provider.requested_ranges == [(10, 10), (10, 13), (10, 11), (12, 13)]
+
+
+def test_get_block_traces_single():
+    provider = FakeTracesProvider(max_traces=4)
+
+    block_traces = EthTraceService(provider, trace_mode=TraceMode.SINGLE).get_block_traces([10, 11, 12])
+
+    assert block_traces == [provider._get_traces(block, block) for block in [10, 11, 12]]
+    assert provider.requested_ranges == []
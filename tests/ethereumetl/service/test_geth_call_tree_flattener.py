@@ -0,0 +1,67 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import sys
+
+from ethereumetl.service.geth_call_tree_flattener import flatten_geth_call_tree, is_contract_creation
+
+TRANSACTION_TRACE = {
+    'type': 'CALL',
+    'calls': [
+        {'type': 'CALL', 'error': 'execution reverted', 'calls': [
+            {'type': 'CREATE', 'to': '0x1111111111111111111111111111111111111111'},
+        ]},
+        {'type': 'CREATE2', 'to': '0x2222222222222222222222222222222222222222', 'calls': [
+            {'type': 'STATICCALL'},
+        ]},
+    ]
+}
+
+
+def test_flatten_geth_call_tree():
+    flattened = [(call['type'], trace_address, status)
+                 for call, trace_address, status in flatten_geth_call_tree(TRANSACTION_TRACE)]
+    assert flattened == [
+        ('CALL', [], 1),
+        ('CALL', [0], 0),
+        ('CREATE', [0, 0], 0),
+        ('CREATE2', [1], 1),
+        ('STATICCALL', [1, 0], 1),
+    ]
+
+
+def test_is_contract_creation():
+    created = [call['to'] for call, trace_address, status in flatten_geth_call_tree(TRANSACTION_TRACE)
+               if is_contract_creation(call, status)]
+    assert created == ['0x2222222222222222222222222222222222222222']
+
+
+def test_flatten_deep_geth_call_tree():
+    depth = sys.getrecursionlimit() * 2
+    transaction_trace = {'type': 'CALL'}
+    for _ in range(depth - 1):
+        transaction_trace = {'type': 'CALL', 'calls': [transaction_trace]}
+
+    flattened = list(flatten_geth_call_tree(transaction_trace))
+    assert len(flattened) == depth
+    assert flattened[-1][1] == [0] * (depth - 1)
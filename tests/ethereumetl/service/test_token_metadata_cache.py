@@ -0,0 +1,64 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from ethereumetl.domain.token import EthToken
+from ethereumetl.service.token_metadata_cache import TokenMetadataCache
+
+TOKEN_ADDRESS = '0x86fa049857e0209aa7d9e616f7eb3b3b78ecfdb0'
+NOT_TOKEN_ADDRESS = '0x0000000000000000000000000000000000000001'
+
+
+def build_token(address, symbol=None, name=None, decimals=None, total_supply=None):
+    token = EthToken()
+    token.address = address
+    token.symbol = symbol
+    token.name = name
+    token.decimals = decimals
+    token.total_supply = total_supply
+    return token
+
+
+def to_tuple(token):
+    if token is None:
+        return None
+    return token.address, token.symbol, token.name, token.decimals, token.total_supply, token.block_number
+
+
+def test_token_metadata_cache_persists_tokens_and_negative_entries(tmpdir):
+    path = str(tmpdir.join('tokens.sqlite'))
+    cache = TokenMetadataCache(path)
+    cache.put_tokens([
+        ((TOKEN_ADDRESS.upper(), 100), build_token(TOKEN_ADDRESS, 'EOS', '', 18, 10 ** 27)),
+        ((NOT_TOKEN_ADDRESS, None), build_token(NOT_TOKEN_ADDRESS)),
+    ])
+    cache.close()
+
+    # Reads go to SQLite when the in-memory cache is empty
+    tokens = TokenMetadataCache(path, max_memory_entries=1).get_tokens(
+        [(TOKEN_ADDRESS, 100), (TOKEN_ADDRESS, 101), (NOT_TOKEN_ADDRESS, None)])
+
+    assert [to_tuple(token) for token in tokens] == [
+        (TOKEN_ADDRESS, 'EOS', '', 18, 10 ** 27, 100),
+        None,
+        (NOT_TOKEN_ADDRESS, None, None, None, None, None),
+    ]
@@ -0,0 +1,52 @@
+# MIT License
+#
+# Copyright (c) 2018 Evgeny Medvedev, evge.medvedev@gmail.com
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from ethereumetl.streaming.enrich import ItemIndex, enrich_log, enrich_logs
+
+BLOCKS = [
+    {'type': 'block', 'number': 1, 'hash': '0x01', 'timestamp': 100},
+    {'type': 'block', 'number': 2, 'hash': '0x02', 'timestamp': 200},
+]
+LOGS = [
+    {'type': 'log', 'log_index': 0, 'transaction_hash': '0xaa', 'block_number': 2},
+    {'type': 'log', 'log_index': 0, 'transaction_hash': '0xbb', 'block_number': 1},
+]
+
+
+def test_item_index():
+    index = ItemIndex(BLOCKS, 'number')
+    assert index.get_first(2) is BLOCKS[1]
+    assert index.get_first(3) is None
+    assert index.get(1) == [BLOCKS[0]]
+    assert index.get(3) == []
+
+
+def test_enrich_logs_with_blocks_index():
+    enriched_logs = enrich_logs(ItemIndex(BLOCKS, 'number'), LOGS)
+    assert enriched_logs == enrich_logs(BLOCKS, LOGS)
+    assert [(log['block_hash'], log['block_timestamp']) for log in enriched_logs] == [('0x02', 200), ('0x01', 100)]
+
+
+def test_enrich_log():
+    enriched_logs = [enrich_log(BLOCKS[log['block_number'] - 1], log) for log in LOGS]
+    assert enriched_logs == enrich_logs(BLOCKS, LOGS)